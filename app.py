@@ -9,21 +9,22 @@ from dotenv import load_dotenv
 from event.GoogleSheetsManager import GoogleSheetsManager
 from shop.Mileage_shop import PersistentShopView
 from shop.Warn_shop import Warn_ShopCommands, Warn_ShopView
+from shop.catalog import catalog_service
 from commands.war import WarView, initialize_ongoing_war, WarCommand
 from commands.information import InfoChangeView, InfoCommands
 from log.logging import ServerLogger, VoiceLogger, MessageLogger, RoleLogger
+from log.dispatcher import log_dispatcher
+from log.audit_store import audit_store
+from log.log_setup import setup_logging
+from event.interaction_guard import interaction_guard
+from log.message_cache import message_cache
+from log.voice_sessions import voice_sessions
 from commands.attendance import AttendanceCommands
 import os
 import pytz
 
-# 로깅 설정
-logging.basicConfig(
-    filename='app.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
-logging.getLogger("discord").setLevel(logging.WARNING)
+# 로깅 설정 (logging_config.json, 파일 쓰기는 별도 스레드에서 처리)
+setup_logging()
 
 # 환경 변수 로드
 load_dotenv()
@@ -55,16 +56,17 @@ class PersistentViewManager:
             self.add_view(war_view)
             logging.info("WarView 등록 완료.")
 
-            shop_data = sheets_manager.get_values(sheet_name="상점", range_notation="J2:L100")
-            if shop_data:
-                shop_view = PersistentShopView(shop_data=shop_data)
-                self.add_view(shop_view)
-                logging.info("PersistentShopView 등록 완료.")
-            else:
-                logging.error("상점 데이터를 불러올 수 없습니다.")
+            # 상품 목록은 카탈로그 서비스의 현재 버전을 읽으므로 등록 시점에 데이터를 넘기지 않음
+            try:
+                await catalog_service.ensure_loaded()
+            except Exception as e:
+                logging.error(f"상점 카탈로그를 불러올 수 없습니다: {e}")
+
+            shop_view = PersistentShopView()
+            self.add_view(shop_view)
+            logging.info("PersistentShopView 등록 완료.")
 
-            filtered_data = [row for row in shop_data if len(row) >= 3 and row[0].isdigit()]
-            warn_shop_view = Warn_ShopView(shop_data=filtered_data)
+            warn_shop_view = Warn_ShopView()
             self.add_view(warn_shop_view)
             logging.info("Warn_ShopView 등록 완료.")
 
@@ -84,7 +86,8 @@ class CustomBot(commands.Bot):
         intents.members = True
         intents.voice_states = True
 
-        super().__init__(command_prefix="!", intents=intents)
+        # 삭제/수정 로그는 log.message_cache의 내용 캐시를 사용하므로 라이브러리 메시지 캐시는 작게 유지
+        super().__init__(command_prefix="!", intents=intents, max_messages=200)
         self.view_manager = None  # setup_hook에서 초기화
         self.guild = None
         self._synced = False
@@ -99,6 +102,13 @@ class CustomBot(commands.Bot):
             self.guild = self.get_guild(GUILD_ID) or discord.Object(id=GUILD_ID)
             self.view_manager = PersistentViewManager(self)
 
+            # 로그 채널 전송 작업 시작 (채널별로 모아 묶어서 전송)
+            log_dispatcher.start(self)
+            # 검색용 감사 로그 저장 작업 시작
+            audit_store.start()
+            # 상호작용 첫 응답 시간 기록
+            interaction_guard.start()
+
             # 내전 활성화 확인 (initialize_ongoing_war 호출)
             initialize_ongoing_war()
             logging.info("내전 활성화 상태 확인 완료")
@@ -109,6 +119,8 @@ class CustomBot(commands.Bot):
                 "commands.information",
                 "commands.war",
                 "commands.attendance_top",
+                "commands.voice_rank",
+                "commands.audit_search",
                 "shop.Mileage_shop",
                 "shop.Warn_shop"
             ]
@@ -130,6 +142,24 @@ class CustomBot(commands.Bot):
             logging.error(f"봇 설정 중 오류 발생: {e}", exc_info=True)
             self.setup_done = False
 
+    async def close(self):
+        # 진행 중인 음성 세션 기록
+        try:
+            voice_sessions.close_all()
+        except Exception as e:
+            logging.error(f"음성 세션 기록 중 오류 발생: {e}", exc_info=True)
+
+        # 종료 전에 대기 중인 로그를 모두 전송
+        try:
+            await log_dispatcher.stop()
+        except Exception as e:
+            logging.error(f"로그 전송 작업 종료 중 오류 발생: {e}", exc_info=True)
+        try:
+            await audit_store.stop()
+        except Exception as e:
+            logging.error(f"감사 로그 저장 종료 중 오류 발생: {e}", exc_info=True)
+        await super().close()
+
     async def on_ready(self):
         if not self._synced:
             try:
@@ -155,6 +185,8 @@ class CustomBot(commands.Bot):
             guild = self.get_guild(GUILD_ID)
             if guild:
                 logging.info(f"서버 '{guild.name}'에 연결됨")
+                # 봇이 꺼져 있던 사이에 바뀐 음성 채널 상태 반영
+                voice_sessions.seed(guild)
                 await self.change_presence(
                     activity=discord.Activity(
                         type=discord.ActivityType.watching,
@@ -164,63 +196,66 @@ class CustomBot(commands.Bot):
             else:
                 logging.warning(f"경고: ID {GUILD_ID}인 서버를 찾을 수 없음")
 
+    async def on_interaction(self, interaction):
+        # 모든 상호작용의 첫 응답 시간을 핸들러별로 기록 (deadline_guard 핸들러는 자동 defer도 함께 처리)
+        interaction_guard.watch(interaction)
+
     async def on_member_join(self, member):
-        await ServerLogger.log_member_join(self, member)
+        ServerLogger.log_member_join(self, member)
 
     async def on_member_remove(self, member):
-        await ServerLogger.log_member_leave(self, member)
-
-    async def on_message_delete(self, message):
-        if message.author and hasattr(message.author, "mention"):
-            await MessageLogger.log_message_delete(
-                self,
-                message.channel.id,
-                message.content,
-                message.author
-            )
-
-    async def on_message_edit(self, before, after):
-        if before.content != after.content:
-            await MessageLogger.log_message_edit(
-                self,
-                before.channel.id,
-                before.content,
-                after.content,
-                before.author
-            )
+        ServerLogger.log_member_leave(self, member)
+
+    async def on_raw_message_delete(self, payload):
+        # 캐시에 없는 메시지 삭제도 기록하기 위해 raw 이벤트 사용
+        MessageLogger.log_raw_message_delete(self, payload)
+
+    async def on_raw_bulk_message_delete(self, payload):
+        # 일괄 삭제는 메시지 수와 관계없이 요약 로그 하나와 기록 파일 하나로 전송
+        MessageLogger.log_bulk_message_delete(self, payload)
+
+    async def on_message(self, message):
+        # 삭제/수정 로그용으로 메시지 ID, 채널, 작성자, 내용만 저장
+        if message.guild and message.author != self.user:
+            message_cache.add(message)
+        await self.process_commands(message)
+
+    async def on_raw_message_edit(self, payload):
+        MessageLogger.log_raw_message_edit(self, payload)
 
     async def on_voice_state_update(self, member, before, after):
         if before.channel != after.channel:
+            voice_sessions.update(member, before.channel, after.channel)
             if after.channel:
                 if before.channel:
-                    await VoiceLogger.log_voice_move(
+                    VoiceLogger.log_voice_move(
                         self,
                         member,
                         before.channel.id,
                         after.channel.id
                     )
                 else:
-                    await VoiceLogger.log_voice_join(
+                    VoiceLogger.log_voice_join(
                         self,
                         member,
                         after.channel.id
                     )
             elif before.channel:
-                await VoiceLogger.log_voice_leave(
+                VoiceLogger.log_voice_leave(
                     self,
                     member,
                     before.channel.id
                 )
 
     async def on_member_update(self, before, after):
-        added_roles = [role for role in after.roles if role not in before.roles]
-        removed_roles = [role for role in before.roles if role not in after.roles]
-
-        for role in added_roles:
-            await RoleLogger.log_role_update(self, after, role.name, "추가")
-
-        for role in removed_roles:
-            await RoleLogger.log_role_update(self, after, role.name, "제거")
+        before_ids = {role.id for role in before.roles}
+        after_ids = {role.id for role in after.roles}
+        added_ids = after_ids - before_ids
+        removed_ids = before_ids - after_ids
+
+        # 역할 변경은 멤버별로 잠시 모았다가 임베드 하나로 기록
+        if added_ids or removed_ids:
+            RoleLogger.log_role_changes(self, after, added_ids, removed_ids)
 
 def main():
     try:
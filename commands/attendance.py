@@ -6,6 +6,9 @@ from discord import app_commands
 import logging
 import os
 from event.GoogleSheetsManager import GoogleSheetsManager
+from event.member_bindings import member_bindings, LINK_HELP
+from event.nickname import strip_decorations
+from shop.accrual_engine import accrual_engine
 
 # Google Sheets 설정
 SERVICE_ACCOUNT_FILE = "resources/service_account.json"
@@ -131,23 +134,13 @@ class AttendanceCommands(commands.Cog):
         # Google Sheets 업데이트
         try:
             raw_nickname = user.display_name
-            nickname = sheets_manager.clean_nickname(raw_nickname)
-
-            if not nickname:
-                logging.info(f"[닉네임 비어있음] 원본 닉네임: {raw_nickname}")
-                return
-
-            member_data = sheets_manager.get_values(sheet_name="MEMBER", range_notation="D:D")
-            member_row = next(
-                (
-                    row for row in member_data
-                    if len(row) >= 1 and row[0].split('#')[0].strip() == nickname
-                ),
-                None
-            )
-
-            if member_row:
-                row_index = member_data.index(member_row) + 1
+            nickname = strip_decorations(raw_nickname) or raw_nickname
+
+            # 사용자 ID 연결 테이블로 조회 (처음 한 번만 표시 이름으로 확인)
+            member = await member_bindings.resolve(user)
+
+            if member:
+                row_index = member.row
                 increment_value = self.ROLE_INCREMENT_VALUES.get(awarded_role, 0)
                 if increment_value > 0:
                     current_values = sheets_manager.get_values(sheet_name="MEMBER", range_notation=f"N{row_index}:N{row_index}")
@@ -160,8 +153,17 @@ class AttendanceCommands(commands.Cog):
                         values=[[updated_value]]
                     )
                     logging.info(f"[출석] 대상: {nickname}, 이전 값: {current_value}, 추가 값: {increment_value}, 갱신된 값: {updated_value}")
+
+                # 출석 횟수가 마일리지 지급 구간이면 적립 (mileage_accrual.json)
+                await accrual_engine.grant_attendance(member.nickname, user.id, user_count)
             else:
                 logging.info(f"[출석] Google Sheets에서 닉네임 '{nickname}'을(를) 찾을 수 없습니다.")
+                # 출석 횟수는 저장되었지만 시트(N열)와 마일리지에는 반영되지 않았음을 본인에게 안내
+                notice = f"{user.mention}님의 멤버 정보를 찾을 수 없어 출석 보상이 시트에 반영되지 않았습니다." + LINK_HELP
+                if isinstance(interaction_or_message, discord.Interaction):
+                    await interaction_or_message.followup.send(notice, ephemeral=True)
+                else:
+                    await interaction_or_message.send(notice)
         except Exception as e:
             logging.error(f"[오류 발생] Google Sheets 업데이트 중 오류: {e}")
 
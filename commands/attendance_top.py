@@ -5,7 +5,7 @@ import discord
 import json
 import os
 from typing import Dict, Any
-from .base_command import BaseCommandCog
+from event.pagination import PageSource, page_cache, first_page, setup_pagination
 
 GUILD_ID = int(os.getenv("GUILD_ID"))
 DATA_FILE = "attendance_data.json"
@@ -17,47 +17,80 @@ if os.path.exists(DATA_FILE):
 else:
     attendance = {}
 
-class Paginator(discord.ui.View):
-    def __init__(self, embeds):
-        super().__init__(timeout=None)
-        self.embeds = embeds
-        self.current_page = 0
+RANKING_SOURCE = "attendance_rank"
+RANKS_PER_PAGE = 10
 
-        self.prev_button = discord.ui.Button(label="⬅️ 이전", style=discord.ButtonStyle.primary)
-        self.page_label = discord.ui.Button(label=f"{self.current_page + 1}/{len(self.embeds)}", style=discord.ButtonStyle.secondary, disabled=True)
-        self.next_button = discord.ui.Button(label="➡️ 다음", style=discord.ButtonStyle.primary)
 
-        self.prev_button.callback = self.prev_page
-        self.next_button.callback = self.next_page
+def load_attendance_file() -> Dict[str, Any]:
+    if os.path.exists(DATA_FILE):
+        try:
+            with open(DATA_FILE, "r", encoding='utf-8') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print("JSON 파일 읽기 오류. 빈 데이터로 초기화합니다.")
+            return {}
+    return {}
 
-        self.add_item(self.prev_button)
-        self.add_item(self.page_label)
-        self.add_item(self.next_button)
 
-        self.update_buttons_state()
+class RankingPages(PageSource):
+    """
+    출석 순위 페이지. 출석 파일이 바뀔 때만(수정 시각 기준) 다시 만들고
+    그 전까지는 모든 순위 메시지가 같은 Embed를 공유합니다.
+    """
 
-    def update_buttons_state(self):
-        self.prev_button.disabled = self.current_page == 0
-        self.next_button.disabled = self.current_page == len(self.embeds) - 1
-        self.page_label.label = f"{self.current_page + 1}/{len(self.embeds)}"
+    name = RANKING_SOURCE
 
-    async def update_message(self, interaction):
-        self.update_buttons_state()
-        await interaction.response.edit_message(embed=self.embeds[self.current_page], view=self)
+    def version(self):
+        try:
+            return os.stat(DATA_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    async def build_pages(self, guild):
+        attendance = load_attendance_file()
+        sorted_attendance = sorted(
+            attendance.items(),
+            key=lambda x: x[1].get("count", 0) if isinstance(x[1], dict) else 0,
+            reverse=True
+        )
+
+        def new_embed():
+            return discord.Embed(
+                title="📊 출석 순위",
+                description="출석 횟수에 따른 순위입니다.",
+                color=discord.Color.blue()
+            )
 
-    async def prev_page(self, interaction: discord.Interaction):
-        if self.current_page > 0:
-            self.current_page -= 1
-            await self.update_message(interaction)
-        else:
-            await interaction.response.send_message("현재 페이지가 첫 번째 페이지입니다.", ephemeral=True)
+        embeds = []
+        embed = new_embed()
+        for rank, (user_id, data) in enumerate(sorted_attendance, start=1):
+            # 멤버 캐시를 먼저 사용하고, 없을 때만 API로 조회
+            member = guild.get_member(int(user_id))
+            if member is None:
+                try:
+                    member = await guild.fetch_member(int(user_id))
+                except (discord.NotFound, discord.HTTPException):
+                    continue
 
-    async def next_page(self, interaction: discord.Interaction):
-        if self.current_page < len(self.embeds) - 1:
-            self.current_page += 1
-            await self.update_message(interaction)
-        else:
-            await interaction.response.send_message("현재 페이지가 마지막 페이지입니다.", ephemeral=True)
+            count = data.get("count", 0) if isinstance(data, dict) else 0
+            rank_display = "👑 1위" if rank == 1 else f"{rank}위"
+            embed.add_field(name=rank_display, value=f"{member.display_name} - {count}회", inline=False)
+
+            if rank % RANKS_PER_PAGE == 0:
+                embeds.append(embed)
+                embed = new_embed()
+
+        if len(embed.fields) > 0:
+            embeds.append(embed)
+
+        if not embeds:
+            embed = new_embed()
+            embed.description = "표시할 순위가 없습니다."
+            embeds.append(embed)
+        return embeds
+
+
+page_cache.register(RankingPages())
 
 
 class RankingCommands(commands.Cog):  # BaseCommandCog 대신 commands.Cog 사용
@@ -66,14 +99,7 @@ class RankingCommands(commands.Cog):  # BaseCommandCog 대신 commands.Cog 사
         self.DATA_FILE = DATA_FILE
 
     def load_attendance_data(self) -> Dict[str, Any]:
-        if os.path.exists(self.DATA_FILE):
-            try:
-                with open(self.DATA_FILE, "r", encoding='utf-8') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                print("JSON 파일 읽기 오류. 빈 데이터로 초기화합니다.")
-                return {}
-        return {}
+        return load_attendance_file()
 
     @commands.command(name="순위")
     async def rank_prefix(self, ctx):
@@ -87,7 +113,13 @@ class RankingCommands(commands.Cog):  # BaseCommandCog 대신 commands.Cog 사
         is_interaction = isinstance(ctx_or_interaction, discord.Interaction)
         if is_interaction:
             await ctx_or_interaction.response.defer()
-        
+            await self._send_ranking(ctx_or_interaction, is_interaction)
+        else:
+            # 접두사 명령어는 순위를 만드는 동안 입력 중 표시
+            async with ctx_or_interaction.typing():
+                await self._send_ranking(ctx_or_interaction, is_interaction)
+
+    async def _send_ranking(self, ctx_or_interaction, is_interaction):
         attendance = self.load_attendance_data()
 
         if not attendance:
@@ -99,60 +131,12 @@ class RankingCommands(commands.Cog):  # BaseCommandCog 대신 commands.Cog 사
             return
 
         try:
-            sorted_attendance = sorted(
-                attendance.items(),
-                key=lambda x: x[1].get("count", 0) if isinstance(x[1], dict) else 0,
-                reverse=True
-            )
-
-            embeds = []
-            embed = discord.Embed(
-                title="📊 출석 순위",
-                description="출석 횟수에 따른 순위입니다.",
-                color=discord.Color.blue()
-            )
-
-            guild = ctx_or_interaction.guild
-            for rank, (user_id, data) in enumerate(sorted_attendance, start=1):
-                try:
-                    member = await guild.fetch_member(int(user_id))
-                    if member:
-                        count = data.get("count", 0) if isinstance(data, dict) else 0
-                        rank_display = "👑 1위" if rank == 1 else f"{rank}위"
-                        embed.add_field(name=rank_display, value=f"{member.display_name} - {count}회", inline=False)
-
-                        if rank % 10 == 0:
-                            embeds.append(embed)
-                            embed = discord.Embed(
-                                title="📊 출석 순위",
-                                description="출석 횟수에 따른 순위입니다.",
-                                color=discord.Color.blue()
-                            )
-                except (discord.NotFound, discord.HTTPException):
-                    continue
-
-            if len(embed.fields) > 0:
-                embeds.append(embed)
-
-            if not embeds:
-                message = "표시할 순위가 없습니다."
-                if is_interaction:
-                    await ctx_or_interaction.followup.send(message)
-                else:
-                    await ctx_or_interaction.send(message)
-                return
-
-            view = Paginator(embeds)
-            if len(embeds) == 1:
-                if is_interaction:
-                    await ctx_or_interaction.followup.send(embed=embeds[0])
-                else:
-                    await ctx_or_interaction.send(embed=embeds[0])
+            # 페이지는 출석 파일 버전별로 캐시되며, 페이지 번호는 버튼 custom_id에만 저장됨
+            embed, view = await first_page(RANKING_SOURCE, ctx_or_interaction.guild)
+            if is_interaction:
+                await ctx_or_interaction.followup.send(embed=embed, view=view or discord.utils.MISSING)
             else:
-                if is_interaction:
-                    await ctx_or_interaction.followup.send(embed=embeds[0], view=view)
-                else:
-                    await ctx_or_interaction.send(embed=embeds[0], view=view)
+                await ctx_or_interaction.send(embed=embed, view=view)
 
         except Exception as e:
             error_msg = f"순위를 가져오는 중 오류가 발생했습니다: {e}"
@@ -162,5 +146,6 @@ class RankingCommands(commands.Cog):  # BaseCommandCog 대신 commands.Cog 사
                 await ctx_or_interaction.send(error_msg)
 
 async def setup(bot: commands.Bot):
+    setup_pagination(bot)
     await bot.add_cog(RankingCommands(bot))
     logging.info("RankingCommands cog added to bot")  # 로그 추가
\ No newline at end of file
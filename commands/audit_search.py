@@ -0,0 +1,77 @@
+import logging
+import time
+from typing import Optional
+
+import discord
+import pytz
+from datetime import datetime
+from discord import app_commands
+from discord.ext import commands
+
+from log.audit_store import audit_store, EVENT_TYPES
+
+seoul_tz = pytz.timezone("Asia/Seoul")
+MAX_RESULTS = 15
+
+
+class AuditSearchCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="로그검색", description="저장된 서버 로그를 검색합니다.")
+    @app_commands.describe(
+        사용자="대상 사용자",
+        채널="대상 채널",
+        유형="로그 종류",
+        검색어="본문 검색어",
+        기간="최근 며칠 동안의 로그를 검색할지 (기본: 7일)"
+    )
+    @app_commands.choices(유형=[app_commands.Choice(name=name, value=key) for key, name in EVENT_TYPES.items()])
+    async def search_logs(
+        self,
+        interaction: discord.Interaction,
+        사용자: Optional[discord.User] = None,
+        채널: Optional[discord.abc.GuildChannel] = None,
+        유형: Optional[str] = None,
+        검색어: Optional[str] = None,
+        기간: app_commands.Range[int, 1, 90] = 7
+    ):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
+            return
+
+        try:
+            await interaction.response.defer(ephemeral=True)
+            started = time.perf_counter()
+            rows = await audit_store.search_async(
+                user_id=사용자.id if 사용자 else None,
+                channel_id=채널.id if 채널 else None,
+                event_type=유형,
+                since=time.time() - 기간 * 86400,
+                text=검색어.strip() if 검색어 else None,
+                limit=MAX_RESULTS
+            )
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            embed = discord.Embed(title="🔎 로그 검색 결과", color=discord.Color.blue())
+            if not rows:
+                embed.description = "조건에 맞는 로그가 없습니다."
+            lines = []
+            for at, event_type, user_id, channel_id, text in rows:
+                when = datetime.fromtimestamp(at, seoul_tz).strftime("%m-%d %H:%M:%S")
+                line = f"`{when}` **{EVENT_TYPES.get(event_type, event_type)}** {text[:150]}"
+                if sum(len(item) + 1 for item in lines) + len(line) > 4000:
+                    break
+                lines.append(line)
+            if lines:
+                embed.description = "\n".join(lines)
+            embed.set_footer(text=f"최근 {기간}일 · {len(lines)}건 · {elapsed_ms:.1f}ms")
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            logging.error(f"로그 검색 중 오류 발생: {e}", exc_info=True)
+            await interaction.followup.send("로그 검색 중 오류가 발생했습니다.", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(AuditSearchCommands(bot))
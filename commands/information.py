@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 from discord import Interaction, Embed, app_commands
 from discord.ext import commands
@@ -6,6 +7,9 @@ import pytz
 import logging
 from typing import Optional
 from event.GoogleSheetsManager import GoogleSheetsManager
+from event.interaction_guard import deadline_guard, interaction_guard
+from event.member_index import member_index
+from event.member_bindings import member_bindings
 
 # Google Sheets 설정
 SERVICE_ACCOUNT_FILE = 'resources/service_account.json'
@@ -63,9 +67,27 @@ class InfoChangeModal(discord.ui.Modal, title="정보 변경"):
         self.add_item(self.new_tier)
         self.add_item(self.reason)
 
+    async def find_member(self, nickname):
+        """
+        인덱스에서 닉네임#태그로 멤버를 찾고, 시트의 D열이 아직 같은 닉네임인지 한 셀만 읽어 확인합니다.
+        행이 옮겨졌거나 인덱스에 없으면 인덱스를 한 번 다시 읽습니다.
+        """
+        await member_index.ensure_loaded()
+        member = member_index.find_exact(nickname)
+        if member:
+            values = await asyncio.to_thread(
+                self.sheets_manager.get_values, sheet_name="MEMBER", range_notation=f"D{member.row}:D{member.row}"
+            )
+            if values and values[0] and values[0][0].strip() == member.nickname:
+                return member
+
+        await member_index.refresh_async()
+        return member_index.find_exact(nickname)
+
+    @deadline_guard
     async def on_submit(self, interaction: Interaction):
         try:
-            await interaction.response.defer(ephemeral=True)
+            await interaction_guard.defer(interaction, ephemeral=True)
 
             old_nickname = self.old_nickname.value.strip()
             new_nickname = self.new_nickname.value.strip()
@@ -74,40 +96,37 @@ class InfoChangeModal(discord.ui.Modal, title="정보 변경"):
 
             logging.info(f"정보 변경 시도: old={old_nickname}, new={new_nickname}, tier={new_tier}")
 
-            member_data = self.sheets_manager.get_values(sheet_name="MEMBER", range_notation="A:Z")
-            if not member_data:
-                logging.error("멤버 데이터를 가져올 수 없습니다.")
-                await interaction.followup.send("멤버 데이터를 가져올 수 없습니다.", ephemeral=True)
+            # 멤버 인덱스로 행을 찾고, 인덱스가 오래되었으면 한 번 다시 읽음
+            member = await self.find_member(old_nickname)
+            if not member:
+                logging.warning(f"멤버를 찾을 수 없음: {old_nickname}")
+                await interaction.followup.send(
+                    "해당 닉네임을 가진 멤버를 찾을 수 없습니다." + member_index.suggestion_text(old_nickname),
+                    ephemeral=True
+                )
                 return
 
-            # D열(닉네임)에서 해당 멤버 찾기
-            target_row = None
-            for row_idx, row in enumerate(member_data, start=1):
-                if len(row) >= 4 and row[3].strip() == old_nickname:  # D열은 인덱스 3
-                    target_row = row_idx
-                    break
-
-            if not target_row:
-                logging.warning(f"멤버를 찾을 수 없음: {old_nickname}")
-                await interaction.followup.send("해당 닉네임을 가진 멤버를 찾을 수 없습니다.", ephemeral=True)
+            # 다른 멤버의 닉네임으로 바꾸면 이름 변경 전파(레이팅, 경고 기록, 연결)가 두 멤버를 합쳐 버리므로 거부
+            existing = member_index.find_exact(new_nickname)
+            if existing is not None and existing.row != member.row:
+                logging.warning(f"정보 변경 거부 - 이미 사용 중인 닉네임: {new_nickname} ({existing.row}행)")
+                await interaction.followup.send(
+                    f"'{new_nickname}' 닉네임은 이미 다른 멤버가 사용 중입니다. 관리자에게 문의해주세요.",
+                    ephemeral=True
+                )
                 return
 
             try:
-                # D열에 새 닉네임 업데이트
-                self.sheets_manager.update_cell(
-                    sheet_name="MEMBER",
-                    start_column="D",
-                    start_row=target_row,
-                    values=[[new_nickname]]
+                # D(닉네임), E(티어)를 한 번의 범위 쓰기로 업데이트
+                await asyncio.to_thread(
+                    self.sheets_manager.update_range,
+                    f"MEMBER!D{member.row}:E{member.row}",
+                    [[new_nickname, new_tier]]
                 )
 
-                # E열에 새 티어 업데이트
-                self.sheets_manager.update_cell(
-                    sheet_name="MEMBER",
-                    start_column="E",
-                    start_row=target_row,
-                    values=[[new_tier]]
-                )
+                # 인덱스에 바로 반영하고 닉네임을 키로 쓰는 캐시에 변경 전파
+                # (멤버 연결, 내전 참가자, 레이팅, 경고 기록)
+                member_index.apply_change(member, new_nickname, new_tier)
 
                 await interaction.followup.send(
                     f"'{old_nickname}' 닉네임이 '{new_nickname}'(으)로, 티어가 '{new_tier}'(으)로 성공적으로 변경되었습니다.",
@@ -178,5 +197,45 @@ class InfoCommands(commands.GroupCog, group_name="정보"):
                 "메시지 전송 중 오류가 발생했습니다. 관리자에게 문의하세요.", ephemeral=True
             )
 
+    @app_commands.command(name="멤버연결", description="디스코드 사용자를 MEMBER 시트의 멤버에 연결합니다. (관리자 전용)")
+    @app_commands.guild_only()
+    @app_commands.describe(사용자="연결할 디스코드 사용자", 닉네임="MEMBER 시트의 닉네임#태그")
+    async def bind_member(self, interaction: Interaction, 사용자: discord.Member, 닉네임: str):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
+            return
+
+        try:
+            await interaction.response.defer(ephemeral=True)
+            await member_index.ensure_loaded()
+            record = member_index.find_exact(닉네임)
+            if record is None and await member_index.refresh_on_miss():
+                record = member_index.find_exact(닉네임)
+            if record is None:
+                await interaction.followup.send(
+                    f"`{닉네임}` 멤버를 찾을 수 없습니다." + member_index.suggestion_text(닉네임), ephemeral=True
+                )
+                return
+
+            previous = member_bindings.user_for_row(record.row)
+            member_bindings.bind(사용자.id, record, force=True)
+            logging.info(f"관리자 멤버 연결: {interaction.user.id} - {사용자.id} -> {record.row}행 ({record.nickname})")
+
+            message = f"{사용자.mention}님을 `{record.nickname}` ({record.row}행)에 연결했습니다."
+            if previous is not None and previous != 사용자.id:
+                message += f"\n기존 연결(<@{previous}>)은 해제되었습니다."
+            await interaction.followup.send(message, ephemeral=True)
+
+        except Exception as e:
+            logging.error(f"멤버 연결 중 오류 발생: {e}", exc_info=True)
+            await interaction.followup.send("멤버 연결 중 오류가 발생했습니다.", ephemeral=True)
+
+    @bind_member.autocomplete("닉네임")
+    async def bind_member_nickname_autocomplete(self, interaction: Interaction, current: str):
+        return [
+            app_commands.Choice(name=record.nickname, value=record.nickname)
+            for record in member_index.prefix(current)
+        ]
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(InfoCommands(bot))
\ No newline at end of file
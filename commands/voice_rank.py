@@ -0,0 +1,53 @@
+import logging
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from log.voice_sessions import voice_sessions
+
+PERIODS = {
+    "오늘": 1,
+    "7일": 7,
+    "30일": 30,
+}
+
+
+def format_duration(seconds):
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes = remainder // 60
+    return f"{hours}시간 {minutes}분" if hours else f"{minutes}분"
+
+
+class VoiceRankCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="음성순위", description="음성 채널 이용 시간 순위를 확인합니다.")
+    @app_commands.describe(기간="집계 기간 (기본: 7일)")
+    @app_commands.choices(기간=[app_commands.Choice(name=name, value=name) for name in PERIODS])
+    async def voice_rank(self, interaction: discord.Interaction, 기간: str = "7일"):
+        try:
+            days = PERIODS.get(기간, 7)
+            top = voice_sessions.top(days, limit=10)
+            embed = discord.Embed(
+                title=f"🎙️ 음성 채널 순위 ({기간})",
+                color=discord.Color.blue()
+            )
+            if not top:
+                embed.description = "표시할 순위가 없습니다."
+
+            for rank, (user_id, seconds) in enumerate(top, start=1):
+                member = interaction.guild.get_member(user_id) if interaction.guild else None
+                name = member.display_name if member else f"<@{user_id}>"
+                rank_display = "👑 1위" if rank == 1 else f"{rank}위"
+                embed.add_field(name=rank_display, value=f"{name} - {format_duration(seconds)}", inline=False)
+
+            await interaction.response.send_message(embed=embed)
+
+        except Exception as e:
+            logging.error(f"음성 순위 조회 중 오류 발생: {e}", exc_info=True)
+            await interaction.response.send_message("순위를 가져오는 중 오류가 발생했습니다.", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(VoiceRankCommands(bot))
@@ -1,10 +1,20 @@
+import asyncio
+import json
 import logging
 import re
 import time
+from typing import Optional
 from discord import app_commands
 import discord
 from discord.ext import commands
 from event.GoogleSheetsManager import GoogleSheetsManager
+from event.war_close_pipeline import WarClosePipeline, STAGE_DONE
+from event.team_balancer import team_balancer, Player, tier_score, parse_lanes, LANES
+from event.rating_engine import rating_engine, INITIAL_RATING
+from event.member_index import member_index, jamo_key, AUTOCOMPLETE_LIMIT
+from event.nickname import nickname_key
+from event.interaction_guard import deadline_guard, interaction_guard, respond
+from shop.accrual_engine import accrual_engine
 from datetime import datetime
 import os
 
@@ -15,45 +25,184 @@ SPREADSHEET_ID = '1AYSWQwLOA-EvMJzJ7ros27OEzrTd2hERlI2WJX32RBE'
 # Google Sheets 매니저 초기화
 sheets_manager = GoogleSheetsManager(SERVICE_ACCOUNT_FILE, SPREADSHEET_ID)
 
+RATING_PER_TIER_STEP = 50  # 팀 분배 시 레이팅 50점을 티어 1단계로 환산
+
+# 로비 설정
+DEFAULT_LOBBY_ID = "default"  # 기존 WarView 메시지가 사용하는 기본 로비
+LOBBY_FILE = "war_lobbies.json"
+SHEET_NAME_INVALID = re.compile(r"[\[\]*?/\\:']")  # 시트 이름에 쓸 수 없는 문자
+LOBBY_NAME_LIMIT = 40  # 시트 이름에 넣는 로비 이름 최대 길이
+SETTLEMENT_FILE = "war_settlements.jsonl"  # MEMBER 참여/승리 횟수를 반영한 정산 ID 기록
+
 
 class OngoingWar:
-    def __init__(self):
+    def __init__(self, lobby_id=DEFAULT_LOBBY_ID, name=None):
+        self.lobby_id = lobby_id
+        self.name = name
         self.status = False
         self.participants = []
         self.current_sheet = None
+        self.settling_job_id = None  # 승리팀이 정해져 정산 중인 닫기 작업 ID (다시 정산하지 않도록)
         self.saved_files = []
+        self.lock = asyncio.Lock()  # 로비별 시트 작업 직렬화
 
     def reset(self):
         self.status = False
         self.participants = []
         self.current_sheet = None
+        self.settling_job_id = None
+
+    def sheet_name_for(self, date_str):
+        """
+        해당 날짜에 이 로비가 사용할 내전 시트 이름.
+        채널 이름이 같은 로비끼리 시트가 겹치지 않도록 끝에 로비 ID(채널 ID)를 붙입니다.
+        """
+        if self.lobby_id == DEFAULT_LOBBY_ID:
+            return f"내전-{date_str}"
+        name = SHEET_NAME_INVALID.sub("", self.name or "").strip()[:LOBBY_NAME_LIMIT]
+        if not name:
+            return f"내전-{date_str}-{self.lobby_id}"
+        return f"내전-{date_str}-{name}-{self.lobby_id}"
+
+    def custom_id(self, base):
+        """로비별 영구 버튼 custom_id. 기본 로비는 기존 ID를 그대로 사용합니다."""
+        if self.lobby_id == DEFAULT_LOBBY_ID:
+            return base
+        return f"{base}:{self.lobby_id}"
+
+
+class LobbyRegistry:
+    """
+    로비 ID(채널 ID)별 내전 상태를 관리하는 클래스.
+    로비 목록은 파일에 저장되어 재시작 후에도 영구 버튼을 다시 등록할 수 있습니다.
+    """
+
+    def __init__(self, path=LOBBY_FILE):
+        self.path = path
+        self._lobbies = {DEFAULT_LOBBY_ID: OngoingWar(DEFAULT_LOBBY_ID)}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError as e:
+            logging.error(f"로비 파일 읽기 오류: {e}")
+            return
+
+        for lobby_id, info in data.items():
+            if lobby_id not in self._lobbies:
+                self._lobbies[lobby_id] = OngoingWar(lobby_id, info.get("name"))
+
+    def save(self):
+        data = {
+            lobby_id: {"name": war.name}
+            for lobby_id, war in self._lobbies.items()
+            if lobby_id != DEFAULT_LOBBY_ID
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+
+    def get(self, lobby_id):
+        return self._lobbies.get(lobby_id)
+
+    def get_or_create(self, lobby_id, name=None):
+        war = self._lobbies.get(lobby_id)
+        if war is None:
+            war = OngoingWar(lobby_id, name)
+            self._lobbies[lobby_id] = war
+            self.save()
+            logging.info(f"새 로비 등록: {lobby_id} ({name})")
+        elif name and war.name != name and not war.status:
+            war.name = name
+            self.save()
+        return war
+
+    def all(self):
+        return list(self._lobbies.values())
+
 
-ongoing_war = OngoingWar()
+lobbies = LobbyRegistry()
+ongoing_war = lobbies.get(DEFAULT_LOBBY_ID)  # 기본 로비 (기존 코드 호환)
 
-async def add_participant_to_sheet(member_number, full_nickname, line):
+
+def lobby_for_channel(channel_id):
+    """채널에 등록된 로비를 반환합니다. 없으면 기본 로비."""
+    return lobbies.get(str(channel_id)) or ongoing_war
+
+
+def _rename_participant(old, new):
+    """정보 변경으로 바뀐 닉네임을 모든 로비의 참가자 목록에 반영합니다."""
+    for war in lobbies.all():
+        for participant in war.participants:
+            if participant["닉네임"] == old:
+                participant["닉네임"] = new
+
+
+# 닉네임을 키로 쓰는 참가자 목록/레이팅이 정보 변경을 따라가도록 등록
+member_index.add_rename_listener(_rename_participant)
+member_index.add_rename_listener(rating_engine.rename)
+
+
+def _on_close_complete(job):
+    """닫기 작업에서 시트 삭제가 끝난 뒤 내전 상태를 정리합니다."""
+    war = lobbies.get(job.get("lobby_id", DEFAULT_LOBBY_ID)) or ongoing_war
+    if job["archive_path"] not in war.saved_files:
+        war.saved_files.append(job["archive_path"])
+    if war.current_sheet == job["sheet_name"]:
+        war.reset()
+
+
+# 내전 닫기 백그라운드 작업
+close_pipeline = WarClosePipeline(sheets_manager, on_complete=_on_close_complete)
+
+
+def start_close_job(interaction: discord.Interaction, war: OngoingWar):
+    """
+    닫기 작업을 백그라운드로 시작합니다. 새 참여는 즉시 막고,
+    상태 초기화는 시트 삭제가 끝난 뒤에 이루어집니다.
+    """
+    sheet_name = war.current_sheet
+    war.status = False
+
+    async def notify(job):
+        if job["stage"] == STAGE_DONE:
+            message = f"내전 시트 '{sheet_name}' 닫기가 완료되었습니다."
+        else:
+            message = f"내전 시트 '{sheet_name}' 닫기 중 오류가 발생했습니다. 봇 재시작 시 이어서 진행됩니다."
+        await interaction.followup.send(message, ephemeral=True)
+
+    return close_pipeline.submit(sheet_name, notify=notify, lobby_id=war.lobby_id)
+
+async def add_participant_to_sheet(war, member_number, full_nickname, line):
     try:
-        # 현재 시트에서 데이터를 가져옴
-        sheet_data = sheets_manager.get_values(
-            sheet_name=ongoing_war.current_sheet,
-            range_notation="W:Y"
-        )
+        async with war.lock:
+            # 현재 시트에서 데이터를 가져옴
+            sheet_data = await asyncio.to_thread(
+                sheets_manager.get_values,
+                sheet_name=war.current_sheet,
+                range_notation="W:Y"
+            )
 
-        # 첫 번째 빈 행 찾기
-        empty_row = len(sheet_data) + 5  # 데이터는 5행부터 시작
+            # 첫 번째 빈 행 찾기
+            empty_row = len(sheet_data) + 5  # 데이터는 5행부터 시작
 
-        # 새 데이터 추가
-        sheets_manager.update_cell(
-            sheet_name=ongoing_war.current_sheet,
-            start_column="W",
-            start_row=empty_row,
-            values=[[member_number, full_nickname, line]]
-        )
+            # 새 데이터 추가
+            await asyncio.to_thread(
+                sheets_manager.update_cell,
+                sheet_name=war.current_sheet,
+                start_column="W",
+                start_row=empty_row,
+                values=[[member_number, full_nickname, line]]
+            )
 
-        # 참여자 목록 업데이트
-        ongoing_war.participants.append({
-            "닉네임": full_nickname,
-            "라인": line
-        })
+            # 참여자 목록 업데이트
+            war.participants.append({
+                "닉네임": full_nickname,
+                "라인": line
+            })
 
         logging.info(f"참여자 추가 - 행: {empty_row}, 데이터: [{member_number}, {full_nickname}, {line}]")
 
@@ -68,29 +217,44 @@ def initialize_ongoing_war():
             return 0
 
         today_date = time.strftime('%Y-%m-%d')
-        active_sheet_name = f"내전-{today_date}"
+        pending_sheets = close_pipeline.pending_sheets()
+        total = 0
+
+        for war in lobbies.all():
+            active_sheet_name = war.sheet_name_for(today_date)
+
+            if active_sheet_name in pending_sheets:
+                logging.info(f"닫기 작업이 진행 중인 시트입니다: {active_sheet_name}")
+                continue
+
+            if active_sheet_name not in sheet_names:
+                continue
 
-        if active_sheet_name in sheet_names:
-            ongoing_war.status = True
-            ongoing_war.current_sheet = active_sheet_name
+            war.status = True
+            war.current_sheet = active_sheet_name
 
+            # 번호(W), 닉네임(X), 라인(Y)을 함께 읽어 팀 분배에 쓰는 라인 정보도 복구
             participants = sheets_manager.get_values(
-                sheet_name=active_sheet_name, range_notation="X:X"
+                sheet_name=active_sheet_name, range_notation="W:Y"
             )
             if participants is None:
-                return 0
+                continue
 
             valid_participants = []
-            for idx, row in enumerate(participants, start=1):
-                if row and len(row) == 1 and is_valid_participant(row[0].strip()):
-                    valid_participants.append({"닉네임": row[0].strip()})
-
-            ongoing_war.participants = valid_participants
+            for row in participants:
+                if len(row) >= 2 and is_valid_participant(row[1].strip()):
+                    valid_participants.append({
+                        "닉네임": row[1].strip(),
+                        "라인": row[2].strip() if len(row) >= 3 else ""
+                    })
+
+            war.participants = valid_participants
+            total += len(valid_participants)
             logging.info(f"활성화된 시트 '{active_sheet_name}'의 참가자 수: {len(valid_participants)}명")
-            return len(valid_participants)
-        else:
+
+        if not any(war.status for war in lobbies.all()):
             logging.info("내전 활성화 상태가 발견되지 않았습니다.")
-            return 0
+        return total
     except Exception as e:
         logging.error(f"내전 상태 복구 중 오류 발생: {e}", exc_info=True)
         return 0
@@ -111,9 +275,144 @@ def is_valid_participant(value):
     return False
 
 
+async def join_war(war: OngoingWar, nickname, line):
+    """
+    내전 참여를 기록합니다. 모달과 슬래시 명령어가 함께 사용합니다.
+    :return: 사용자에게 보낼 메시지
+    """
+    logging.info(f"내전 참여 요청 - 로비: {war.lobby_id}, 닉네임: {nickname}, 라인: {line}")
+
+    # 멤버 인덱스에서 닉네임#태그 완전 일치로 매칭 (태그 없이 입력한 경우만 정규화 키)
+    await member_index.ensure_loaded()
+    member = member_index.find(nickname)
+    if not member:
+        # 인덱스 갱신 이후 MEMBER에 등록된 멤버일 수 있으므로 한 번 다시 읽고 재시도
+        if await member_index.refresh_on_miss():
+            member = member_index.find(nickname)
+    if not member:
+        logging.warning(f"멤버 매칭 실패 - 닉네임: {nickname}")
+        return "닉네임#태그를 찾을 수 없습니다." + member_index.suggestion_text(nickname)
+
+    # 멤버 정보
+    member_number = member.number  # 순번
+    full_nickname = member.nickname
+
+    async with war.lock:
+        # 내전 시트에 데이터 추가
+        if not war.current_sheet:
+            logging.error("활성화된 내전 시트 없음")
+            return "내전 시트가 활성화되지 않았습니다."
+
+        sheet_data = await asyncio.to_thread(
+            sheets_manager.get_values,
+            sheet_name=war.current_sheet,
+            range_notation="W5:Y100"
+        )
+
+        # 첫 번째 빈 행 찾기
+        empty_row = len(sheet_data) + 5  # 데이터는 5행부터 시작
+
+        await asyncio.to_thread(
+            sheets_manager.update_cell,
+            sheet_name=war.current_sheet,
+            start_column="W",
+            start_row=empty_row,
+            values=[[member_number, full_nickname, line]]
+        )
+
+        logging.info(f"참여자 정보 추가 - 행: {empty_row}, 데이터: [{member_number}, {full_nickname}, {line}]")
+
+        # 참여자 목록 업데이트
+        if not any(p['닉네임'].lower() == full_nickname.lower() for p in war.participants):
+            war.participants.append({
+                "닉네임": full_nickname,
+                "라인": line
+            })
+            logging.info(f"현재 참여자 수: {len(war.participants)}")
+        else:
+            logging.warning(f"중복 참여 요청 - 닉네임: {full_nickname}")
+
+    return f"{nickname} 님의 참여가 기록되었습니다."
+
+
+async def cancel_war(war: OngoingWar, nickname):
+    """
+    내전 참여를 취소하고 아래 행들을 한 칸씩 당깁니다.
+    :return: 사용자에게 보낼 메시지
+    """
+    logging.debug(f"참여 취소 요청 닉네임: {nickname} (로비: {war.lobby_id})")
+
+    if not war.current_sheet or not war.current_sheet.startswith("내전"):
+        return "현재 활성화된 내전 시트가 없습니다."
+
+    async with war.lock:
+        sheet_data = await asyncio.to_thread(
+            sheets_manager.get_values,
+            sheet_name=war.current_sheet,
+            range_notation="W:Y"
+        )
+
+        if not sheet_data:
+            return "내전 시트에서 데이터를 가져올 수 없습니다."
+
+        # 데이터 시작 행과 닉네임 매칭 행 찾기
+        data_start_row = None
+        matching_row_index = None
+        last_data_row = None
+
+        # 헤더 행("번호")과 매칭되는 닉네임 찾기
+        for idx, row in enumerate(sheet_data):
+            if row and len(row) >= 1:
+                if row[0] == "번호":
+                    data_start_row = idx + 1
+                elif data_start_row is not None:
+                    if len(row) >= 2 and row[1].strip().lower() == nickname.lower():
+                        matching_row_index = idx
+                    # 마지막 데이터가 있는 행 찾기
+                    if row[0] and row[0].strip() and not row[0].startswith('http'):
+                        last_data_row = idx
+
+        if matching_row_index is None:
+            logging.warning(f"닉네임 매칭 실패: {nickname}")
+            return f"`{nickname}` 닉네임에 대한 참여 기록을 찾을 수 없습니다."
+
+        # 데이터 시프트 처리
+        shift_data = []
+        for idx in range(matching_row_index, last_data_row + 1):
+            next_idx = idx + 1
+            if next_idx <= last_data_row:
+                # 다음 행의 데이터를 현재 행으로 이동
+                next_row_data = sheet_data[next_idx]
+                if len(next_row_data) >= 3:
+                    shift_data.append([next_row_data[0], next_row_data[1], next_row_data[2]])
+                else:
+                    shift_data.append(["", "", ""])
+            else:
+                # 마지막 행은 비움
+                shift_data.append(["", "", ""])
+
+        # 데이터 일괄 업데이트
+        await asyncio.to_thread(
+            sheets_manager.update_cell,
+            sheet_name=war.current_sheet,
+            start_column="W",
+            start_row=matching_row_index + 1,
+            values=shift_data
+        )
+
+        # 참여자 목록에서 해당 닉네임 제거
+        war.participants = [
+            p for p in war.participants if p["닉네임"].lower() != nickname.lower()
+        ]
+
+    logging.info(f"닉네임 '{nickname}'의 참여가 성공적으로 취소되었습니다.")
+    return f"`{nickname}` 님의 참여 취소 성공"
+
+
 class JoinModal(discord.ui.Modal, title="내전 참여"):
-    def __init__(self):
+    def __init__(self, war: OngoingWar = ongoing_war):
         super().__init__()
+        self.war = war
 
         # 닉네임 입력 필드 (태그 포함 안내 추가)
         self.nickname = discord.ui.TextInput(
@@ -131,76 +430,21 @@ class JoinModal(discord.ui.Modal, title="내전 참여"):
         )
         self.add_item(self.line)
 
+    @deadline_guard
     async def on_submit(self, interaction: discord.Interaction):
      try:
-        await interaction.response.defer(ephemeral=True)
-
-        nickname = self.nickname.value.strip()
-        line = self.line.value.strip()
-
-        logging.info(f"내전 참여 요청 - 닉네임: {nickname}, 라인: {line}")
-
-        # 멤버 시트에서 닉네임과 태그를 완전히 매칭
-        member_data = sheets_manager.get_values(sheet_name="MEMBER", range_notation="C:D")
-        member_row = next(
-            (
-                row for row in member_data
-                if len(row) >= 2 and row[1].strip().lower() == nickname.lower()
-            ),
-            None
-        )
-
-        if not member_row:
-            logging.warning(f"멤버 매칭 실패 - 닉네임: {nickname}")
-            await interaction.followup.send("닉네임#태그를 찾을 수 없습니다.", ephemeral=True)
-            return
-
-        # 멤버 정보
-        member_number = member_row[0].lstrip("'").strip()  # 순번
-        full_nickname = member_row[1].strip()
-
-        # 내전 시트에 데이터 추가
-        if ongoing_war.current_sheet:
-            sheet_data = sheets_manager.get_values(
-                sheet_name=ongoing_war.current_sheet,
-                range_notation="W5:Y100"
-            )
-
-            # 첫 번째 빈 행 찾기
-            empty_row = len(sheet_data) + 5  # 데이터는 5행부터 시작
-
-            sheets_manager.update_cell(
-                sheet_name=ongoing_war.current_sheet,
-                start_column="W",
-                start_row=empty_row,
-                values=[[member_number, full_nickname, line]]
-            )
-
-            logging.info(f"참여자 정보 추가 - 행: {empty_row}, 데이터: [{member_number}, {full_nickname}, {line}]")
-        else:
-            logging.error("활성화된 내전 시트 없음")
-            await interaction.followup.send("내전 시트가 활성화되지 않았습니다.", ephemeral=True)
-            return
-
-        # 참여자 목록 업데이트
-        if not any(p['닉네임'].lower() == full_nickname.lower() for p in ongoing_war.participants):
-            ongoing_war.participants.append({
-                "닉네임": full_nickname,
-                "라인": line
-            })
-            logging.info(f"현재 참여자 수: {len(ongoing_war.participants)}")
-        else:
-            logging.warning(f"중복 참여 요청 - 닉네임: {full_nickname}")
-
-        await interaction.followup.send(f"{nickname} 님의 참여가 기록되었습니다.", ephemeral=True)
+        await interaction_guard.defer(interaction, ephemeral=True)
+        message = await join_war(self.war, self.nickname.value.strip(), self.line.value.strip())
+        await interaction.followup.send(message, ephemeral=True)
      except Exception as e:
         logging.error("참여 기록 중 오류 발생", exc_info=True)
         await interaction.followup.send(f"참여 기록 중 오류가 발생했습니다: {str(e)}", ephemeral=True)
 
 
 class CancelModal(discord.ui.Modal, title="참여 취소"):
-    def __init__(self):
+    def __init__(self, war: OngoingWar = ongoing_war):
         super().__init__()
+        self.war = war
 
         self.nickname = discord.ui.TextInput(
             label="닉네임",
@@ -209,84 +453,12 @@ class CancelModal(discord.ui.Modal, title="참여 취소"):
         )
         self.add_item(self.nickname)
 
+    @deadline_guard
     async def on_submit(self, interaction: discord.Interaction):
         try:
-            await interaction.response.defer(ephemeral=True)
-
-            nickname = self.nickname.value.strip()
-            logging.debug(f"참여 취소 요청 닉네임: {nickname}")
-
-            if not ongoing_war.current_sheet or not ongoing_war.current_sheet.startswith("내전"):
-                await interaction.followup.send("현재 활성화된 내전 시트가 없습니다.", ephemeral=True)
-                return
-
-            sheet_data = sheets_manager.get_values(
-                sheet_name=ongoing_war.current_sheet,
-                range_notation="W:Y"
-            )
-
-            if not sheet_data:
-                await interaction.followup.send("내전 시트에서 데이터를 가져올 수 없습니다.", ephemeral=True)
-                return
-
-            # 데이터 시작 행과 닉네임 매칭 행 찾기
-            data_start_row = None
-            matching_row_index = None
-            last_data_row = None
-            
-            # 헤더 행("번호")과 매칭되는 닉네임 찾기
-            for idx, row in enumerate(sheet_data):
-                if row and len(row) >= 1:
-                    if row[0] == "번호":
-                        data_start_row = idx + 1
-                    elif data_start_row is not None:
-                        if len(row) >= 2 and row[1].strip().lower() == nickname.lower():
-                            matching_row_index = idx
-                        # 마지막 데이터가 있는 행 찾기
-                        if row[0] and row[0].strip() and not row[0].startswith('http'):
-                            last_data_row = idx
-
-            if matching_row_index is None:
-                logging.warning(f"닉네임 매칭 실패: {nickname}")
-                await interaction.followup.send(
-                    f"`{nickname}` 닉네임에 대한 참여 기록을 찾을 수 없습니다.",
-                    ephemeral=True
-                )
-                return
-
-            # 데이터 시프트 처리
-            shift_data = []
-            for idx in range(matching_row_index, last_data_row + 1):
-                next_idx = idx + 1
-                if next_idx <= last_data_row:
-                    # 다음 행의 데이터를 현재 행으로 이동
-                    next_row_data = sheet_data[next_idx]
-                    if len(next_row_data) >= 3:
-                        shift_data.append([next_row_data[0], next_row_data[1], next_row_data[2]])
-                    else:
-                        shift_data.append(["", "", ""])
-                else:
-                    # 마지막 행은 비움
-                    shift_data.append(["", "", ""])
-
-            # 데이터 일괄 업데이트
-            sheets_manager.update_cell(
-                sheet_name=ongoing_war.current_sheet,
-                start_column="W",
-                start_row=matching_row_index + 1,
-                values=shift_data
-            )
-
-            # 참여자 목록에서 해당 닉네임 제거
-            ongoing_war.participants = [
-                p for p in ongoing_war.participants if p["닉네임"].lower() != nickname.lower()
-            ]
-
-            logging.info(f"닉네임 '{nickname}'의 참여가 성공적으로 취소되었습니다.")
-            await interaction.followup.send(
-                f"`{nickname}` 님의 참여 취소 성공",
-                ephemeral=True
-            )
+            await interaction_guard.defer(interaction, ephemeral=True)
+            message = await cancel_war(self.war, self.nickname.value.strip())
+            await interaction.followup.send(message, ephemeral=True)
 
         except Exception as e:
             logging.error("참여 취소 처리 중 오류 발생: %s", e, exc_info=True)
@@ -296,14 +468,16 @@ class CancelModal(discord.ui.Modal, title="참여 취소"):
             )
 
 class WarView(discord.ui.View):
-    def __init__(self):
+    def __init__(self, lobby_id=DEFAULT_LOBBY_ID):
         super().__init__(timeout=None)
+        self.lobby_id = lobby_id
+        war = self.war
 
         # 참여 버튼
         self.join_button = discord.ui.Button(
             label="내전 참여",
             style=discord.ButtonStyle.green,
-            custom_id="persistent_join_button"
+            custom_id=war.custom_id("persistent_join_button")
         )
         self.join_button.callback = self.join_callback
         self.add_item(self.join_button)
@@ -312,7 +486,7 @@ class WarView(discord.ui.View):
         self.cancel_button = discord.ui.Button(
             label="참여 취소",
             style=discord.ButtonStyle.red,
-            custom_id="persistent_cancel_button"
+            custom_id=war.custom_id("persistent_cancel_button")
         )
         self.cancel_button.callback = self.cancel_callback
         self.add_item(self.cancel_button)
@@ -321,7 +495,7 @@ class WarView(discord.ui.View):
         self.count_button = discord.ui.Button(
             label="인원",
             style=discord.ButtonStyle.gray,
-            custom_id="persistent_count_button"
+            custom_id=war.custom_id("persistent_count_button")
         )
         self.count_button.callback = self.count_callback
         self.add_item(self.count_button)
@@ -330,45 +504,53 @@ class WarView(discord.ui.View):
         self.manage_button = discord.ui.Button(
             label="관리",
             style=discord.ButtonStyle.blurple,
-            custom_id="persistent_manage_button"
+            custom_id=war.custom_id("persistent_manage_button")
         )
         self.manage_button.callback = self.manage_callback
         self.add_item(self.manage_button)
 
+    @property
+    def war(self) -> OngoingWar:
+        return lobbies.get_or_create(self.lobby_id)
+
     async def join_callback(self, interaction: discord.Interaction):
-        if not ongoing_war.status:
+        if not self.war.status:
             await interaction.response.send_message("현재 활성화된 내전이 없습니다.", ephemeral=True)
             return
-        modal = JoinModal()
+        modal = JoinModal(self.war)
         await interaction.response.send_modal(modal)
 
     async def cancel_callback(self, interaction: discord.Interaction):
-        if not ongoing_war.status:
+        if not self.war.status:
             await interaction.response.send_message("현재 활성화된 내전이 없습니다.", ephemeral=True)
             return
-        modal = CancelModal()
+        modal = CancelModal(self.war)
         await interaction.response.send_modal(modal)
 
+    @deadline_guard
     async def manage_callback(self, interaction: discord.Interaction):
         # 관리자 권한 확인
         if not interaction.user.guild_permissions.administrator:
-            await interaction.response.send_message("이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
+            await respond(interaction, "이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
             return
 
         # 관리 인터페이스 표시
-        manage_view = ManageView()
-        await interaction.response.send_message("관리 옵션을 선택하세요:", view=manage_view, ephemeral=True)
+        manage_view = ManageView(self.war)
+        await respond(interaction, "관리 옵션을 선택하세요:", view=manage_view, ephemeral=True)
 
+    @deadline_guard
     async def count_callback(self, interaction: discord.Interaction):
         try:
-            if not ongoing_war.status:
-                await interaction.response.send_message("현재 활성화된 내전이 없습니다.", ephemeral=True)
+            war = self.war
+            if not war.status:
+                await respond(interaction, "현재 활성화된 내전이 없습니다.", ephemeral=True)
                 return
 
-            # Google Sheets에서 참여자 목록을 가져옴
-            participants = sheets_manager.get_values(
-                sheet_name=ongoing_war.current_sheet,
-                range_notation="X:X"
+            # Google Sheets에서 참여자 목록을 가져옴 (번호, 닉네임, 라인)
+            participants = await asyncio.to_thread(
+                sheets_manager.get_values,
+                sheet_name=war.current_sheet,
+                range_notation="W:Y"
             )
 
             # 필터링 키워드
@@ -388,35 +570,114 @@ class WarView(discord.ui.View):
                 # 유효한 닉네임
                 return True
 
-            # 참여자 목록 필터링 및 중복 제거
-            valid_participants = set()
+            # 참여자 목록 필터링 및 중복 제거 (닉네임 -> 라인)
+            valid_participants = {}
             if participants:
                 for row in participants:
-                    if row and row[0].strip():  # 유효한 데이터인지 확인
-                        nickname = row[0].strip().replace(" ", "")  # 공백 제거 후 닉네임 처리
+                    if len(row) >= 2 and row[1].strip():  # 유효한 데이터인지 확인
+                        nickname = row[1].strip().replace(" ", "")  # 공백 제거 후 닉네임 처리
                         if is_valid_nickname(nickname):  # 닉네임 유효성 검사
-                            valid_participants.add(nickname)
+                            valid_participants.setdefault(nickname, row[2].strip() if len(row) >= 3 else "")
 
-            # 참여자 목록 업데이트
-            ongoing_war.participants = [{"닉네임": name} for name in valid_participants]
+            # 참여자 목록 업데이트 (라인 정보 유지)
+            war.participants = [{"닉네임": name, "라인": line} for name, line in valid_participants.items()]
 
             # 참여자 수 계산
             participant_count = len(valid_participants)
 
             # 사용자에게 참여 인원 수 전달
-            await interaction.response.send_message(f"현재 참여 인원: {participant_count}명", ephemeral=True)
+            await respond(interaction, f"현재 참여 인원: {participant_count}명", ephemeral=True)
 
         except Exception as e:
             logging.error(f"인원 확인 중 오류 발생: {e}", exc_info=True)
-            await interaction.response.send_message("인원 확인 중 오류가 발생했습니다.", ephemeral=True)
+            await respond(interaction, "인원 확인 중 오류가 발생했습니다.", ephemeral=True)
+
+
+def _load_settlements(path=SETTLEMENT_FILE):
+    keys = set()
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    keys.add(json.loads(line)["key"])
+    return keys
+
+
+settled_keys = _load_settlements()
+
+
+def settle_member_stats(participants, selected_winners, key):
+    """
+    MEMBER 시트의 참여 횟수(J)와 승리 횟수(L)를 갱신합니다. (스레드에서 실행)
+    :param key: 정산 ID ("war:<닫기 작업 ID>"). 이미 반영한 정산이면 아무것도 하지 않습니다.
+    :return: 반영했으면 True
+    """
+    if key in settled_keys:
+        logging.warning(f"이미 반영된 내전 정산입니다: {key}")
+        return False
+
+    member_data = sheets_manager.get_values(sheet_name="MEMBER", range_notation="C:L")
+
+    # 닉네임#태그 / 정규화 키 -> 행 번호 (한 번만 만들고 참가자마다 O(1)로 조회)
+    rows_by_nickname = {}
+    rows_by_key = {}
+    for idx, row in enumerate(member_data):
+        if len(row) >= 2:
+            rows_by_nickname.setdefault(row[1].strip(), idx + 1)
+            if nickname_key(row[1]):
+                rows_by_key.setdefault(nickname_key(row[1]), idx + 1)
+
+    # 각 참가자에 대해 업데이트
+    for participant in participants:
+        nickname = participant["닉네임"]
+
+        # 멤버 찾기 (태그가 있으면 완전 일치만, 태그 없이 적힌 이름만 정규화 키)
+        if "#" in nickname:
+            member_row = rows_by_nickname.get(nickname)
+        else:
+            member_row = rows_by_key.get(nickname_key(nickname))
+
+        if member_row:
+            current_values = member_data[member_row - 1]
+
+            # 현재 참여 횟수 가져오기 (J열)
+            current_participation = int(current_values[7]) if len(current_values) > 7 and current_values[7].strip() else 0
+
+            # 현재 승리 횟수 가져오기 (L열)
+            current_wins = int(current_values[9]) if len(current_values) > 9 and current_values[9].strip() else 0
+
+            # 참여 횟수 업데이트 (J열)
+            sheets_manager.update_cell(
+                sheet_name="MEMBER",
+                start_column="J",
+                start_row=member_row,
+                values=[[current_participation + 1]]
+            )
+
+            # 승리자인 경우 승리 횟수 업데이트 (L열)
+            if nickname in selected_winners:
+                sheets_manager.update_cell(
+                    sheet_name="MEMBER",
+                    start_column="L",
+                    start_row=member_row,
+                    values=[[current_wins + 1]]
+                )
+
+    settled_keys.add(key)
+    with open(SETTLEMENT_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": key, "settled_at": datetime.now().isoformat()}, ensure_ascii=False) + "\n")
+    return True
 
 
 class CloseConfirmView(discord.ui.View):
-    def __init__(self, original_interaction: discord.Interaction):
+    def __init__(self, original_interaction: discord.Interaction, war: OngoingWar = ongoing_war):
         super().__init__(timeout=60)  # 확인 뷰는 60초 후 만료
         self.original_interaction = original_interaction
+        self.war = war
 
     @discord.ui.button(label="확인", style=discord.ButtonStyle.red, custom_id="close_confirm_button")
+    @deadline_guard
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
         logging.debug(f"확인 버튼 클릭 이벤트 발생: {interaction.data}")
         try:
@@ -424,31 +685,26 @@ class CloseConfirmView(discord.ui.View):
                 logging.warning("잘못된 버튼 ID로 '닫기 확인' 이벤트가 호출되었습니다.")
                 return
 
-            if not interaction.response.is_done():
-                await interaction.response.defer(ephemeral=True)
+            await interaction_guard.defer(interaction, ephemeral=True)
 
-            # 내전 닫기 로직 실행
-            if ongoing_war.current_sheet:
-                file_name = f"내전기록_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
-                file_path = os.path.join("records", file_name)
-                sheets_manager.export_sheet_as_xlsx(ongoing_war.current_sheet, file_path)
-                ongoing_war.saved_files.append(file_path)
+            # 내전 닫기 작업을 백그라운드로 시작
+            if self.war.current_sheet:
+                job = start_close_job(interaction, self.war)
 
-                # 시트 삭제 및 상태 초기화
-                sheets_manager.delete_sheet(ongoing_war.current_sheet)
-                ongoing_war.reset()
-
-                logging.info("내전이 성공적으로 닫혔습니다.")
-                await interaction.followup.send("내전이 성공적으로 닫혔습니다.", ephemeral=True)
+                logging.info(f"내전 닫기 작업 시작: {job['job_id']}")
+                await interaction.followup.send(
+                    "내전 닫기 작업을 시작했습니다. 기록 보관 후 시트가 삭제되면 알려드립니다.",
+                    ephemeral=True
+                )
             else:
                 logging.info("현재 활성화된 내전이 없습니다.")
                 await interaction.followup.send("현재 활성화된 내전이 없습니다.", ephemeral=True)
         except Exception as e:
             logging.error(f"내전 닫기 확인 중 오류 발생: {e}", exc_info=True)
-            if not interaction.response.is_done():
-                await interaction.followup.send("내전 닫기 중 오류가 발생했습니다.", ephemeral=True)
+            await respond(interaction, "내전 닫기 중 오류가 발생했습니다.", ephemeral=True)
 
     @discord.ui.button(label="취소", style=discord.ButtonStyle.gray, custom_id="close_cancel_button")
+    @deadline_guard
     async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
         logging.debug(f"취소 버튼 클릭 이벤트 발생: {interaction.data}")
         try:
@@ -456,13 +712,14 @@ class CloseConfirmView(discord.ui.View):
                 logging.warning("잘못된 버튼 ID로 '취소' 이벤트가 호출되었습니다.")
                 return
 
-            await interaction.response.send_message("내전 닫기가 취소되었습니다.", ephemeral=True)
+            await respond(interaction, "내전 닫기가 취소되었습니다.", ephemeral=True)
         except Exception as e:
             logging.error(f"취소 버튼 처리 중 오류 발생: {e}", exc_info=True)
 
 class ManageView(discord.ui.View):
-    def __init__(self):
+    def __init__(self, war: OngoingWar = ongoing_war):
         super().__init__(timeout=None)
+        self.war = war
 
         # 열기 버튼
         self.open_button = discord.ui.Button(
@@ -505,6 +762,7 @@ class ManageView(discord.ui.View):
         await interaction.response.send_message("이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
         return
 
+     war = self.war
      try:
         class RecordDownload(discord.ui.Modal, title="내전 기록 다운로드"):
             def __init__(self):
@@ -516,38 +774,40 @@ class ManageView(discord.ui.View):
                 )
                 self.add_item(self.date_input)
 
+            @deadline_guard
             async def on_submit(self, modal_interaction: discord.Interaction):
                 try:
                     date_str = self.date_input.value.strip()
                     logging.debug(f"입력된 날짜: {date_str}")
 
                     # 저장된 파일 리스트 디버그 출력
-                    logging.debug(f"저장된 파일 목록: {ongoing_war.saved_files}")
+                    logging.debug(f"저장된 파일 목록: {war.saved_files}")
 
                     # 날짜 형식으로 매칭되는 파일 검색
                     matching_files = [
-                        file for file in ongoing_war.saved_files
+                        file for file in war.saved_files
                         if date_str in os.path.basename(file).split("_")[1]  # 날짜 부분만 비교
                     ]
 
                     logging.debug(f"매칭된 파일: {matching_files}")
 
                     if not matching_files:
-                        await modal_interaction.response.send_message(
-                            "해당 날짜의 기록을 찾을 수 없습니다.", ephemeral=True
+                        await respond(
+                            modal_interaction, "해당 날짜의 기록을 찾을 수 없습니다.", ephemeral=True
                         )
                         return
 
                     file_path = matching_files[0]  # 첫 번째 매칭 파일
-                    await modal_interaction.response.send_message(
+                    await respond(
+                        modal_interaction,
                         "기록 파일을 다운로드하세요:",
                         file=discord.File(file_path),
                         ephemeral=True
                     )
                 except Exception as e:
                     logging.error("기록 다운로드 처리 중 오류 발생: %s", e, exc_info=True)
-                    await modal_interaction.response.send_message(
-                        "기록 다운로드 중 오류가 발생했습니다.", ephemeral=True
+                    await respond(
+                        modal_interaction, "기록 다운로드 중 오류가 발생했습니다.", ephemeral=True
                     )
 
         await interaction.response.send_modal(RecordDownload())
@@ -555,21 +815,30 @@ class ManageView(discord.ui.View):
         logging.error("기록 버튼 처리 중 오류 발생: %s", e, exc_info=True)
         await interaction.response.send_message("기록 다운로드 중 오류가 발생했습니다.", ephemeral=True)
 
+    @deadline_guard
     async def open_callback(self, interaction: discord.Interaction):
      if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message("이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
+        await respond(interaction, "이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
         return
 
      try:
         # 초기 응답 연장
-        await interaction.response.defer(ephemeral=True)
-
-        # 새 시트 생성
-        new_sheet_name = sheets_manager.copy_sheet("경내(원본)")
+        await interaction_guard.defer(interaction, ephemeral=True)
+
+        war = self.war
+        async with war.lock:
+            # 새 시트 생성 (로비별 시트 이름 사용)
+            new_sheet_name = await asyncio.to_thread(
+                sheets_manager.copy_sheet,
+                "경내(원본)",
+                war.sheet_name_for(datetime.now().strftime('%Y-%m-%d'))
+            )
+            if new_sheet_name:
+                war.status = True
+                war.participants = []
+                war.current_sheet = new_sheet_name
+                war.settling_job_id = None
         if new_sheet_name:
-            ongoing_war.status = True
-            ongoing_war.participants = []
-            ongoing_war.current_sheet = new_sheet_name
             await interaction.followup.send(f"내전이 열렸습니다: {new_sheet_name}", ephemeral=True)
         else:
             await interaction.followup.send("내전을 열 수 없습니다. 오류가 발생했습니다.", ephemeral=True)
@@ -579,19 +848,21 @@ class ManageView(discord.ui.View):
 
 
         # Start of Selection
+    @deadline_guard
     async def close_callback(self, interaction: discord.Interaction):
         if interaction.data.get("custom_id") != "close_button":
             logging.warning("잘못된 버튼 ID로 '닫기' 이벤트가 호출되었습니다.")
             return
 
         if not interaction.user.guild_permissions.administrator:
-            await interaction.response.send_message("이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
+            await respond(interaction, "이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
             return
 
         try:
             # 확인 폼 전송
-            confirm_view = CloseConfirmView(original_interaction=interaction)
-            await interaction.response.send_message(
+            confirm_view = CloseConfirmView(original_interaction=interaction, war=self.war)
+            await respond(
+                interaction,
                 embed=discord.Embed(
                     title="내전 닫기 확인",
                     description="정말로 내전을 닫으시겠습니까?",
@@ -602,27 +873,28 @@ class ManageView(discord.ui.View):
             )
         except Exception as e:
             logging.error(f"내전 닫기 확인 폼 전송 중 오류 발생: {e}", exc_info=True)
-            if not interaction.response.is_done():
-                await interaction.followup.send("내전 닫기 확인 폼 전송 중 오류가 발생했습니다.", ephemeral=True)
+            await respond(interaction, "내전 닫기 확인 폼 전송 중 오류가 발생했습니다.", ephemeral=True)
 
 
+    @deadline_guard
     async def win_callback(self, interaction: discord.Interaction):
         if not interaction.user.guild_permissions.administrator:
-            await interaction.response.send_message("이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
+            await respond(interaction, "이 버튼은 관리자만 사용할 수 있습니다.", ephemeral=True)
             return
 
+        war = self.war
         try:
             # 초기 응답 연장
-            await interaction.response.defer(ephemeral=True)
+            await interaction_guard.defer(interaction, ephemeral=True)
 
-            if not ongoing_war.participants:
+            if not war.participants:
                 await interaction.followup.send("참여자가 없습니다.", ephemeral=True)
                 return
 
             # 승리 팀 선택 UI 생성
             options = [
                 discord.SelectOption(label=participant["닉네임"], value=participant["닉네임"])
-                for participant in ongoing_war.participants
+                for participant in war.participants
             ]
 
             # 최소 옵션 개수 보장
@@ -645,89 +917,71 @@ class ManageView(discord.ui.View):
                     self.select_menu.callback = self.select_winner
                     self.add_item(self.select_menu)
 
+                @deadline_guard
                 async def select_winner(self, interaction: discord.Interaction):
                     try:
                         # Interaction 만료 방지
-                        await interaction.response.defer(ephemeral=True)
-
-                        selected_winners = [
-                            value for value in self.select_menu.values if not value.startswith("dummy_")
-                        ]
-                        defeated_participants = [
-                            participant["닉네임"]
-                            for participant in ongoing_war.participants
-                            if participant["닉네임"] not in selected_winners
-                        ]
-
-                        # 내전 기록 파일 생성
-                        if ongoing_war.current_sheet:
-                            file_name = f"내전기록_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
-                            file_path = os.path.join("records", file_name)
-                            sheets_manager.export_sheet_as_xlsx(ongoing_war.current_sheet, file_path)
-                            ongoing_war.saved_files.append(file_path)
+                        await interaction_guard.defer(interaction, ephemeral=True)
+
+                        async with war.lock:
+                            if war.settling_job_id:
+                                # 닫기 작업이 끝나기 전(또는 실패 후) 같은 선택 창에서 다시 고른 경우
+                                await interaction.followup.send("이미 승리팀이 정해진 내전입니다.", ephemeral=True)
+                                return
+                            if not war.current_sheet:
+                                await interaction.followup.send("활성화된 내전 시트가 없습니다.", ephemeral=True)
+                                return
+
+                            participants = list(war.participants)
+                            selected_winners = [
+                                value for value in self.select_menu.values if not value.startswith("dummy_")
+                            ]
+                            defeated_participants = [
+                                participant["닉네임"]
+                                for participant in participants
+                                if participant["닉네임"] not in selected_winners
+                            ]
+
+                            # 시트에 쓰기 전에 정산 중으로 표시. 기록 보관 및 시트 삭제는 백그라운드 작업으로 진행
+                            job = start_close_job(interaction, war)
+                            war.settling_job_id = job["job_id"]
+                            # 닫기 작업 ID가 정산 ID = 중복 반영 방지 키
+                            # (시트 이름은 같은 날 같은 로비에서 다시 열면 겹치므로 사용하지 않음)
+                            settlement_key = f"war:{job['job_id']}"
 
                             # 멤버 시트 업데이트
-                            member_data = sheets_manager.get_values(sheet_name="MEMBER", range_notation="C:L")
-                            
-                            # 각 참가자에 대해 업데이트
-                            for participant in ongoing_war.participants:
-                                nickname = participant["닉네임"]
-                                
-                                # 멤버 찾기 (태그 포함하여 정확히 매칭)
-                                member_row = None
-                                for idx, row in enumerate(member_data):
-                                    if len(row) >= 2 and row[1].strip() == nickname:
-                                        member_row = idx + 1
-                                        break
-
-                                if member_row:
-                                    current_values = member_data[member_row - 1]
-                                    
-                                    # 현재 참여 횟수 가져오기 (J열)
-                                    current_participation = int(current_values[7]) if len(current_values) > 7 and current_values[7].strip() else 0
-                                    
-                                    # 현재 승리 횟수 가져오기 (L열)
-                                    current_wins = int(current_values[9]) if len(current_values) > 9 and current_values[9].strip() else 0
-                                    
-                                    # 참여 횟수 업데이트 (J열)
-                                    sheets_manager.update_cell(
-                                        sheet_name="MEMBER",
-                                        start_column="J",
-                                        start_row=member_row,
-                                        values=[[current_participation + 1]]
-                                    )
-                                    
-                                    # 승리자인 경우 승리 횟수 업데이트 (L열)
-                                    if nickname in selected_winners:
-                                        sheets_manager.update_cell(
-                                            sheet_name="MEMBER",
-                                            start_column="L",
-                                            start_row=member_row,
-                                            values=[[current_wins + 1]]
-                                        )
-
-                            # 시트 삭제
-                            sheets_manager.delete_sheet(ongoing_war.current_sheet)
-                            ongoing_war.reset()
-
-                            # 결과 임베드 생성 및 채널 전송
-                            embed = discord.Embed(
-                                title="내전 결과",
-                                description=f"진행된 날짜: {datetime.now().strftime('%m-%d')}\n"
-                                          f"⭐ 승리: {', '.join(selected_winners)}\n"
-                                          f"🧨 패배: {', '.join(defeated_participants)}",
-                                color=discord.Color.green()
+                            await asyncio.to_thread(settle_member_stats, participants, selected_winners, settlement_key)
+
+                            # 레이팅 증분 갱신
+                            await asyncio.to_thread(
+                                rating_engine.record_war,
+                                selected_winners, defeated_participants, war.lobby_id, settlement_key
                             )
 
-                            result_channel = interaction.guild.get_channel(1261185113446944869)  # 특정 채널 ID
-                            if result_channel:
-                                await result_channel.send(embed=embed)
+                            # 참가/승리 마일리지 일괄 적립
+                            try:
+                                await accrual_engine.grant_war(
+                                    settlement_key, selected_winners, defeated_participants
+                                )
+                            except Exception as e:
+                                logging.error(f"내전 마일리지 적립 중 오류 발생: {e}", exc_info=True)
+
+                        # 결과 임베드 생성 및 채널 전송
+                        embed = discord.Embed(
+                            title="내전 결과",
+                            description=f"진행된 날짜: {datetime.now().strftime('%m-%d')}\n"
+                                      f"⭐ 승리: {', '.join(selected_winners)}\n"
+                                      f"🧨 패배: {', '.join(defeated_participants)}",
+                            color=discord.Color.green()
+                        )
+
+                        result_channel = interaction.guild.get_channel(1261185113446944869)  # 특정 채널 ID
+                        if result_channel:
+                            await result_channel.send(embed=embed)
 
-                            await interaction.followup.send(
-                                f"내전이 종료되었습니다! 승리팀: {', '.join(selected_winners)}", ephemeral=True
-                            )
-                        else:
-                            await interaction.followup.send("활성화된 내전 시트가 없습니다.", ephemeral=True)
+                        await interaction.followup.send(
+                            f"내전이 종료되었습니다! 승리팀: {', '.join(selected_winners)}", ephemeral=True
+                        )
 
                     except Exception as e:
                         logging.error("승리 처리 중 오류 발생: %s", e, exc_info=True)
@@ -753,21 +1007,174 @@ class WinSelectMenu(discord.ui.Select):
             await interaction.response.send_message("승리팀 기록 중 오류가 발생했습니다.", ephemeral=True)
 
 class WarCommand(app_commands.Group):
-    def __init__(self):
+    def __init__(self, bot: Optional[commands.Bot] = None):
         super().__init__(name="내전")
+        self.bot = bot
 
     @app_commands.command(name="관리", description="내전 관리 메시지를 전송합니다.")
-    @app_commands.describe(채널="메시지를 전송할 채널을 선택하세요.")
-    async def manage(self, interaction: discord.Interaction, 채널: discord.TextChannel):
+    @app_commands.describe(
+        채널="메시지를 전송할 채널을 선택하세요.",
+        로비이름="채널별 로비 이름 (시트 이름에 사용, 기본값: 채널 이름)"
+    )
+    async def manage(self, interaction: discord.Interaction, 채널: discord.TextChannel, 로비이름: Optional[str] = None):
+        # 채널별로 독립된 로비를 사용
+        war = lobbies.get_or_create(str(채널.id), 로비이름 or 채널.name)
+        view = WarView(war.lobby_id)
+        if self.bot:
+            self.bot.add_view(view)
+
         embed = discord.Embed(
             title="내전 참여 안내",
             description="내전에 참여하거나 취소하려면 아래 버튼을 사용하세요.",
             color=discord.Color.blue()
         )
-        await 채널.send(embed=embed, view=WarView())
+        embed.set_footer(text=f"로비: {war.name or war.lobby_id}")
+        await 채널.send(embed=embed, view=view)
         await interaction.response.send_message(f"{채널.mention} 채널에 메시지가 전송되었습니다.", ephemeral=True)
 
+    @app_commands.command(name="참여", description="내전에 참여합니다.")
+    @app_commands.describe(닉네임="닉네임#태그 (입력하면 자동완성됩니다)", 라인="주 라인")
+    async def join(self, interaction: discord.Interaction, 닉네임: str, 라인: str):
+        war = lobby_for_channel(interaction.channel_id)
+        if not war.status:
+            await interaction.response.send_message("현재 활성화된 내전이 없습니다.", ephemeral=True)
+            return
+
+        try:
+            await interaction.response.defer(ephemeral=True)
+            message = await join_war(war, 닉네임.strip(), 라인.strip())
+            await interaction.followup.send(message, ephemeral=True)
+        except Exception as e:
+            logging.error("참여 기록 중 오류 발생", exc_info=True)
+            await interaction.followup.send(f"참여 기록 중 오류가 발생했습니다: {str(e)}", ephemeral=True)
+
+    @join.autocomplete("닉네임")
+    async def join_nickname_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=record.nickname, value=record.nickname)
+            for record in member_index.prefix(current)
+        ]
+
+    @join.autocomplete("라인")
+    async def join_line_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=lane, value=lane) for lane in LANES if current in lane]
+
+    @app_commands.command(name="취소", description="내전 참여를 취소합니다.")
+    @app_commands.describe(닉네임="참여 취소할 닉네임#태그")
+    async def cancel(self, interaction: discord.Interaction, 닉네임: str):
+        war = lobby_for_channel(interaction.channel_id)
+        if not war.status:
+            await interaction.response.send_message("현재 활성화된 내전이 없습니다.", ephemeral=True)
+            return
+
+        try:
+            await interaction.response.defer(ephemeral=True)
+            message = await cancel_war(war, 닉네임.strip())
+            await interaction.followup.send(message, ephemeral=True)
+        except Exception as e:
+            logging.error("참여 취소 처리 중 오류 발생: %s", e, exc_info=True)
+            await interaction.followup.send(f"참여 취소 작업 중 오류가 발생했습니다: {str(e)}", ephemeral=True)
+
+    @cancel.autocomplete("닉네임")
+    async def cancel_nickname_autocomplete(self, interaction: discord.Interaction, current: str):
+        # 현재 로비 참가자 중에서만 추천
+        war = lobby_for_channel(interaction.channel_id)
+        key = jamo_key(current)
+        return [
+            app_commands.Choice(name=p["닉네임"], value=p["닉네임"])
+            for p in war.participants
+            if jamo_key(p["닉네임"]).startswith(key)
+        ][:AUTOCOMPLETE_LIMIT]
+
+    @app_commands.command(name="팀분배", description="현재 내전 참가자를 균형 잡힌 두 팀으로 나눕니다.")
+    @app_commands.describe(채널="내전 로비 채널 (기본값: 현재 채널)")
+    async def balance_teams(self, interaction: discord.Interaction, 채널: Optional[discord.TextChannel] = None):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
+            return
+
+        try:
+            await interaction.response.defer(ephemeral=True)
+
+            war = lobby_for_channel((채널 or interaction.channel).id)
+            if not war.status or len(war.participants) < 2:
+                await interaction.followup.send("팀을 나눌 참가자가 부족합니다.", ephemeral=True)
+                return
+
+            await member_index.ensure_loaded()
+            players = build_players(list(war.participants))
+            result = team_balancer.balance(players)
+
+            def describe(team):
+                lines = []
+                for player in team:
+                    lanes = "/".join(LANES[lane] for lane in sorted(player.lanes)) if len(player.lanes) < len(LANES) else "전체"
+                    lines.append(f"{player.name} ({player.score:g}, {lanes})")
+                return "\n".join(lines) or "-"
+
+            embed = discord.Embed(
+                title="내전 팀 분배",
+                description=f"점수 차: `{result['diff']:g}` · 비어 있는 라인: `{result['missing_lanes']}`",
+                color=discord.Color.blue()
+            )
+            embed.add_field(name=f"🔵 A팀 ({sum(p.score for p in result['team_a']):g})", value=describe(result["team_a"]), inline=True)
+            embed.add_field(name=f"🔴 B팀 ({sum(p.score for p in result['team_b']):g})", value=describe(result["team_b"]), inline=True)
+            embed.set_footer(text=f"로비: {war.name or war.lobby_id} · 방식: {result['method']}")
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            logging.error(f"팀 분배 중 오류 발생: {e}", exc_info=True)
+            await interaction.followup.send("팀 분배 중 오류가 발생했습니다.", ephemeral=True)
+
+    @app_commands.command(name="레이팅", description="내전 레이팅 순위를 확인합니다.")
+    async def rating_leaderboard(self, interaction: discord.Interaction):
+        top = rating_engine.top(limit=10)
+        if not top:
+            await interaction.response.send_message("아직 정산된 내전 기록이 없습니다.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="🏆 내전 레이팅 순위", color=discord.Color.gold())
+        for rank, (nickname, rating, games, wins) in enumerate(top, start=1):
+            rank_display = "👑 1위" if rank == 1 else f"{rank}위"
+            embed.add_field(
+                name=rank_display,
+                value=f"{nickname} - `{rating:.0f}` ({games}전 {wins}승)",
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed)
+
+
+def build_players(participants):
+    """
+    참가자 목록에 멤버 인덱스의 티어(MEMBER E열)를 붙여 Player 목록을 만듭니다.
+    티어를 알 수 없는 참가자는 나머지 참가자의 중앙값 점수를 사용하며,
+    내전 레이팅이 있으면 점수에 반영합니다. (레이팅 100점 = 티어 2단계)
+    """
+    scored = []
+    for participant in participants:
+        nickname = participant["닉네임"]
+        member = member_index.find(nickname)
+        score = tier_score(member.tier if member else None)
+        scored.append((nickname, score, parse_lanes(participant.get("라인"))))
+
+    known = sorted(score for _, score, _ in scored if score is not None)
+    fallback = known[len(known) // 2] if known else 0
+    players = []
+    for nickname, score, lanes in scored:
+        score = float(score if score is not None else fallback)
+        rating = rating_engine.get(nickname)
+        if rating:
+            score += (rating[0] - INITIAL_RATING) / RATING_PER_TIER_STEP
+        players.append(Player(nickname, round(score, 1), lanes))
+    return players
+
 
 async def setup(bot: commands.Bot):
-    bot.add_view(WarView())
-    bot.tree.add_command(WarCommand())
\ No newline at end of file
+    member_index.start()
+    resumed = close_pipeline.resume()
+    if resumed:
+        logging.info(f"미완료 내전 닫기 작업 {resumed}건 재개")
+    # 로비별 영구 버튼 등록
+    for war in lobbies.all():
+        bot.add_view(WarView(war.lobby_id))
+    bot.tree.add_command(WarCommand(bot))
@@ -1,10 +1,10 @@
 import logging
-import re
 import time
 from googleapiclient.discovery import build
 from google.oauth2.service_account import Credentials
 from googleapiclient.errors import HttpError
 from datetime import datetime
+from event.nickname import strip_decorations
 
 class GoogleSheetsManager:
     """
@@ -114,21 +114,19 @@ class GoogleSheetsManager:
 
     def clean_nickname(self, nickname: str) -> str:
         """
-        닉네임에서 숫자, 성별 구분 텍스트, 롤 티어 제거
+        닉네임에서 태그, 성별 구분 텍스트, 롤 티어, 숫자 토큰 제거
+        (event.nickname.strip_decorations 사용)
         """
-        nickname = re.sub(r"\d", "", nickname)  # 숫자 제거
-        nickname = re.sub(r"(?:남|여)", "", nickname)  # 남/여 제거
-        nickname = re.sub(r"(?:B|S|G|P|E|D|M|GM|C)", "", nickname)  # 롤 티어 제거
-        nickname = nickname.split('#')[0]  # # 태그 제거
-        return nickname.strip()
+        return strip_decorations(nickname)
 
-    def update_cell(self, sheet_name, start_column, start_row, values):
+    def update_cell(self, sheet_name, start_column, start_row, values, value_input_option="RAW"):
         """
         특정 위치에서 데이터를 업데이트합니다.
         :param sheet_name: 시트 이름
         :param start_column: 시작 열 (예: W)
         :param start_row: 시작 행 (예: 5)
         :param values: 입력할 데이터 리스트 (2차원 배열)
+        :param value_input_option: "RAW" 또는 "USER_ENTERED"
         """
         try:
             def safe_convert(value):
@@ -158,23 +156,37 @@ class GoogleSheetsManager:
             response = self.service.spreadsheets().values().update(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_notation,
-                valueInputOption="RAW",  # 강제 업데이트
+                valueInputOption=value_input_option,
                 body={'values': formatted_values}
             ).execute()
 
-
-            # 업데이트된 값을 다시 확인
-            updated_values = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_notation
-            ).execute()
-
             return response
 
         except Exception as e:
             logging.error(f"Google Sheets 업데이트 중 오류 발생: {e}")
             raise
 
+    def batch_update_values(self, data, value_input_option="RAW"):
+        """
+        여러 범위를 한 번의 요청으로 업데이트합니다.
+        :param data: (범위, 2차원 값 리스트) 튜플 리스트. 범위는 "시트!A1" 형식
+        :param value_input_option: "RAW" 또는 "USER_ENTERED"
+        :return: API 응답 결과
+        """
+        if not data:
+            return None
+        try:
+            return self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={
+                    'valueInputOption': value_input_option,
+                    'data': [{'range': range_name, 'values': values} for range_name, values in data]
+                }
+            ).execute()
+        except Exception as e:
+            logging.error(f"Google Sheets 일괄 업데이트 중 오류 발생: {e}")
+            raise
+
     def append_row(self, sheet_name, values):
         """
         특정 시트에 데이터를 추가합니다.
@@ -195,6 +207,24 @@ class GoogleSheetsManager:
         except Exception as e:
             print(f"Google Sheets 데이터 추가 중 오류 발생: {e}")
 
+    def append_rows(self, sheet_name, rows):
+        """
+        여러 행을 한 번의 요청으로 시트 끝에 추가합니다.
+        :param sheet_name: 데이터를 추가할 시트 이름
+        :param rows: 추가할 데이터 (2차원 리스트)
+        """
+        try:
+            self.service.spreadsheets().values().append(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{sheet_name}!A:Z",
+                valueInputOption="RAW",
+                insertDataOption="INSERT_ROWS",
+                body={'values': rows}
+            ).execute()
+        except Exception as e:
+            logging.error(f"Google Sheets 일괄 추가 중 오류 발생: {e}")
+            raise
+
     def get_values(self, sheet_name, range_notation):
         """
         Google Sheets에서 특정 범위의 값을 가져옵니다.
@@ -213,6 +243,22 @@ class GoogleSheetsManager:
             print(f"Error retrieving values: {e}")
             raise
         
+    def batch_get_values(self, ranges):
+        """
+        여러 범위의 값을 한 번의 요청으로 가져옵니다.
+        :param ranges: "시트!범위" 문자열 리스트
+        :return: 범위 순서대로 값 리스트의 리스트
+        """
+        try:
+            result = self.service.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=list(ranges)
+            ).execute()
+            return [value_range.get("values", []) for value_range in result.get("valueRanges", [])]
+        except Exception as e:
+            logging.error(f"Google Sheets 일괄 조회 중 오류 발생: {e}")
+            raise
+
     def export_sheet_as_xlsx(self, sheet_name, file_path):
         """
         특정 시트를 .xlsx 파일로 내보냅니다.
@@ -225,25 +271,34 @@ class GoogleSheetsManager:
             if not values:
                 raise ValueError(f"시트 '{sheet_name}'에서 데이터를 가져오지 못했습니다.")
 
-            # xlsx 저장
-            import openpyxl
-            workbook = openpyxl.Workbook()
-            sheet = workbook.active
-            sheet.title = sheet_name
-
-            for row_idx, row in enumerate(values, start=1):
-                for col_idx, value in enumerate(row, start=1):
-                    sheet.cell(row=row_idx, column=col_idx, value=value)
-
-            workbook.save(file_path)
+            self.save_values_as_xlsx(values, sheet_name, file_path)
         except Exception as e:
             print(f"시트를 내보내는 중 오류 발생: {e}")
             raise
 
+    def save_values_as_xlsx(self, values, sheet_name, file_path):
+        """
+        이미 가져온 값 목록을 .xlsx 파일로 저장합니다.
+        :param values: 저장할 데이터 (2차원 리스트)
+        :param sheet_name: 워크시트 제목
+        :param file_path: 저장할 파일 경로
+        """
+        import openpyxl
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = sheet_name
+
+        for row_idx, row in enumerate(values, start=1):
+            for col_idx, value in enumerate(row, start=1):
+                sheet.cell(row=row_idx, column=col_idx, value=value)
+
+        workbook.save(file_path)
+
     def delete_sheet(self, sheet_name):
         """
         Google Sheets에서 특정 시트를 삭제합니다.
         :param sheet_name: 삭제할 시트 이름
+        :return: 삭제 성공 여부
         """
         try:
             # 시트 메타데이터를 가져옵니다.
@@ -268,8 +323,10 @@ class GoogleSheetsManager:
                 spreadsheetId=self.spreadsheet_id,
                 body=delete_request
             ).execute()
+            return True
         except Exception as e:
             print(f"Google Sheets 시트 삭제 중 오류 발생: {e}")
+            return False
 
     def increment_sheet_value(self, sheet_name, nickname_column, target_column, nickname, increment_value=1):
         """
@@ -300,10 +357,11 @@ class GoogleSheetsManager:
             print(f"Google Sheets 업데이트 중 오류 발생: {e}")
 
 
-    def copy_sheet(self, source_sheet_name):
+    def copy_sheet(self, source_sheet_name, new_sheet_name=None):
         """
         특정 시트를 복사하고 새로운 시트 이름을 설정합니다.
         :param source_sheet_name: 복사할 원본 시트 이름
+        :param new_sheet_name: 새 시트 이름 (기본: 내전-YYYY-MM-DD)
         :return: 새 시트 이름
         """
         try:
@@ -327,7 +385,9 @@ class GoogleSheetsManager:
 
             # 새 시트 이름 설정 (유효한 제목으로 변환)
             new_sheet_id = response['sheetId']
-            new_sheet_name = f"내전-{datetime.now().strftime('%Y-%m-%d')}".replace("/", "-")
+            if not new_sheet_name:
+                new_sheet_name = f"내전-{datetime.now().strftime('%Y-%m-%d')}"
+            new_sheet_name = new_sheet_name.replace("/", "-")
             update_request = {
                 'requests': [
                     {
@@ -0,0 +1,240 @@
+import asyncio
+import functools
+import logging
+import os
+import re
+import time
+from bisect import bisect_left
+
+import discord
+
+# 핸들러가 이 시간(초) 안에 응답하지 않으면 자동으로 defer (디스코드 제한은 3초)
+DEFER_BUDGET = float(os.getenv("INTERACTION_DEFER_BUDGET", "2.0"))
+WATCH_LIMIT = 15.0          # 이 시간까지 응답이 없으면 "응답 없음"으로 기록하고 감시 종료
+REPORT_INTERVAL = 3600      # 응답 시간 분포를 로그에 남기는 주기 (초)
+HISTOGRAM_BOUNDS_MS = (100, 250, 500, 1000, 2000, 3000)
+# 첫 응답 시점을 알기 위해 감싸는 InteractionResponse 메서드
+RESPONSE_METHODS = ("defer", "send_message", "edit_message", "send_modal", "autocomplete", "launch_activity")
+
+
+class ResponseHistogram:
+    """핸들러 하나의 첫 응답까지 걸린 시간 분포"""
+
+    __slots__ = ("buckets", "count", "total_ms", "max_ms", "auto_deferred", "unanswered")
+
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.auto_deferred = 0
+        self.unanswered = 0
+
+    def observe(self, elapsed_ms):
+        self.buckets[bisect_left(HISTOGRAM_BOUNDS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def text(self):
+        labels = [f"≤{bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"]
+        buckets = " ".join(f"{label}:{count}" for label, count in zip(labels, self.buckets) if count)
+        average = self.total_ms / self.count if self.count else 0
+        return (
+            f"{self.count}건 평균 {average:.0f}ms 최대 {self.max_ms:.0f}ms "
+            f"자동 defer {self.auto_deferred} 응답 없음 {self.unanswered} [{buckets}]"
+        )
+
+
+class _Watch:
+    __slots__ = ("interaction", "name", "started", "auto_defer", "budget", "ephemeral", "lock", "task")
+
+    def __init__(self, interaction, name):
+        self.interaction = interaction
+        self.name = name
+        self.started = time.perf_counter()
+        self.auto_defer = False
+        self.budget = DEFER_BUDGET
+        self.ephemeral = True
+        self.lock = asyncio.Lock()  # 자동 defer와 핸들러 응답이 겹치지 않도록 함
+        self.task = None
+
+
+def handler_name(interaction):
+    """히스토그램 키. 명령어 이름 또는 custom_id (ID 같은 긴 숫자는 #로 바꿔 묶음)"""
+    command = interaction.command
+    if command is not None:
+        return f"/{command.qualified_name}"
+    custom_id = (interaction.data or {}).get("custom_id")
+    if custom_id:
+        return re.sub(r"\d{3,}", "#", custom_id)
+    return str(interaction.type)
+
+
+class InteractionGuard:
+    """
+    상호작용 응답 감시. 모든 상호작용의 첫 응답까지 걸린 시간을 핸들러별로 기록하고,
+    deadline_guard로 감싼 핸들러는 예산 안에 응답하지 않으면 대신 defer해 3초 제한을 넘기지 않게 합니다.
+    감싼 핸들러는 첫 응답을 respond()/defer()로 보내야 자동 defer와 겹치지 않습니다.
+    """
+
+    def __init__(self):
+        self.histograms = {}    # 핸들러 이름 -> ResponseHistogram
+        self._watches = {}      # 상호작용 ID -> _Watch
+        self._report_task = None
+
+    def start(self):
+        if self._report_task is None or self._report_task.done():
+            self._report_task = asyncio.create_task(self._report_loop())
+
+    def watch(self, interaction, name=None, auto_defer=False, budget=None, ephemeral=True):
+        """
+        상호작용 감시를 시작합니다. on_interaction과 deadline_guard 중 먼저 호출된 쪽이 만들고,
+        나중에 호출된 쪽은 핸들러 이름/자동 defer 설정만 덧붙입니다.
+        """
+        watch = self._watches.get(interaction.id)
+        if watch is None:
+            watch = self._watches[interaction.id] = _Watch(interaction, name or handler_name(interaction))
+            if interaction.response.is_done():
+                # 감시 전에 이미 응답한 경우 (응답 시점을 알 수 없으므로 지금까지의 시간으로 기록)
+                self.responded(interaction)
+                return watch
+            watch.task = asyncio.create_task(self._run(watch))
+        if name:
+            watch.name = name
+        if auto_defer and not watch.auto_defer:
+            watch.auto_defer = True
+            watch.budget = budget if budget is not None else DEFER_BUDGET
+            watch.ephemeral = ephemeral
+            # 응답 없음 타이머로 자고 있던 감시를 자동 defer 시각에 맞춰 다시 시작
+            if watch.task is not None and not watch.task.done():
+                watch.task.cancel()
+            watch.task = asyncio.create_task(self._run(watch))
+        return watch
+
+    def responded(self, interaction):
+        """첫 응답 시점에 호출됩니다. 응답 시간을 기록하고 감시 타이머를 취소합니다."""
+        watch = self._watches.pop(interaction.id, None)
+        if watch is None:
+            return
+        elapsed_ms = (time.perf_counter() - watch.started) * 1000
+        self.histograms.setdefault(watch.name, ResponseHistogram()).observe(elapsed_ms)
+        if watch.task is not None and watch.task is not asyncio.current_task():
+            watch.task.cancel()
+
+    async def _run(self, watch):
+        """
+        감시 하나에 타이머 하나. 자동 defer 시각까지 한 번 자고, 그때도 응답이 없으면 defer합니다.
+        응답하면 responded()가 이 작업을 취소하므로 그 사이에 응답 여부를 확인하지 않습니다.
+        """
+        interaction = watch.interaction
+        try:
+            if watch.auto_defer:
+                await asyncio.sleep(max(0.0, watch.budget - (time.perf_counter() - watch.started)))
+                await self._auto_defer(watch)
+                if interaction.id not in self._watches:
+                    return
+            await asyncio.sleep(max(0.0, WATCH_LIMIT - (time.perf_counter() - watch.started)))
+            if self._watches.get(interaction.id) is watch:
+                self._watches.pop(interaction.id)
+                self.histograms.setdefault(watch.name, ResponseHistogram()).unanswered += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.error(f"상호작용 응답 감시 중 오류 발생: {e}", exc_info=True)
+            self._watches.pop(interaction.id, None)
+
+    async def _auto_defer(self, watch):
+        interaction = watch.interaction
+        async with watch.lock:
+            if interaction.response.is_done():
+                return
+            try:
+                if interaction.type == discord.InteractionType.component:
+                    # 버튼/선택 메뉴는 메시지를 그대로 두고 이후 followup으로 응답
+                    await interaction.response.defer()
+                else:
+                    await interaction.response.defer(ephemeral=watch.ephemeral, thinking=True)
+                self.histograms.setdefault(watch.name, ResponseHistogram()).auto_deferred += 1
+                logging.info(f"응답 지연으로 자동 defer: {watch.name}")
+            except (discord.InteractionResponded, discord.HTTPException) as e:
+                logging.warning(f"자동 defer 실패 ({watch.name}): {e}")
+                watch.auto_defer = False
+
+    def _lock_for(self, interaction):
+        # 감시가 끝났거나 없는 상호작용은 자동 defer와 겹칠 일이 없으므로 새 락으로 충분
+        watch = self._watches.get(interaction.id)
+        return watch.lock if watch is not None else asyncio.Lock()
+
+    # ----- 핸들러용 응답 함수 -----
+
+    async def respond(self, interaction, content=None, **kwargs):
+        """첫 응답이면 response.send_message, 이미 응답(자동 defer 포함)했으면 followup.send"""
+        async with self._lock_for(interaction):
+            if interaction.response.is_done():
+                return await interaction.followup.send(content, **kwargs)
+            return await interaction.response.send_message(content, **kwargs)
+
+    async def defer(self, interaction, **kwargs):
+        """아직 응답하지 않았을 때만 defer합니다."""
+        async with self._lock_for(interaction):
+            if not interaction.response.is_done():
+                await interaction.response.defer(**kwargs)
+
+    # ----- 통계 -----
+
+    def summary_lines(self):
+        return [
+            f"{name}: {histogram.text()}"
+            for name, histogram in sorted(self.histograms.items(), key=lambda item: -item[1].max_ms)
+        ]
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            if self.histograms:
+                logging.info("상호작용 첫 응답 시간\n" + "\n".join(self.summary_lines()))
+
+
+def _install_response_hooks(guard):
+    """
+    InteractionResponse의 응답 메서드를 감싸 첫 응답 시점에 guard.responded()를 부릅니다.
+    핸들러가 interaction.response를 직접 써도 응답 시간이 기록되고 감시 타이머가 바로 취소됩니다.
+    """
+    def hook(original):
+        @functools.wraps(original)
+        async def hooked(response, *args, **kwargs):
+            result = await original(response, *args, **kwargs)
+            guard.responded(response._parent)
+            return result
+        hooked.guarded = True
+        return hooked
+
+    for method_name in RESPONSE_METHODS:
+        original = getattr(discord.InteractionResponse, method_name, None)
+        if original is not None and not getattr(original, "guarded", False):
+            setattr(discord.InteractionResponse, method_name, hook(original))
+
+
+interaction_guard = InteractionGuard()
+respond = interaction_guard.respond
+_install_response_hooks(interaction_guard)
+
+
+def deadline_guard(func=None, *, budget=None, ephemeral=True):
+    """
+    상호작용 콜백 데코레이터. 핸들러가 budget초(기본 DEFER_BUDGET) 안에 응답하지 않으면 자동으로 defer합니다.
+    모달을 띄우는 핸들러(send_modal)에는 사용하지 않습니다.
+    """
+    def decorator(callback):
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            interaction = next((arg for arg in args if isinstance(arg, discord.Interaction)), None)
+            if interaction is not None:
+                interaction_guard.watch(
+                    interaction, name=callback.__qualname__, auto_defer=True, budget=budget, ephemeral=ephemeral
+                )
+            return await callback(*args, **kwargs)
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+
+import discord
+
+from event.member_index import member_index
+from log.dispatcher import log_dispatcher
+
+BINDING_FILE = "member_bindings.json"
+ADMIN_LOG_CHANNEL_ID = 1320605395676299305  # 정보 변경 로그 채널 (연결 충돌 알림)
+
+# 연결된 멤버를 찾지 못했을 때 사용자에게 덧붙이는 안내
+LINK_HELP = (
+    "\n디스코드 별명을 시트의 `닉네임#태그`와 똑같이 바꾼 뒤 다시 시도하거나, "
+    "관리자에게 `/정보 멤버연결`을 요청해 주세요."
+)
+
+
+class MemberBindings:
+    """
+    디스코드 사용자 ID -> MEMBER 행 연결 테이블.
+    표시 이름이 닉네임#태그와 정확히 같거나, 태그 없는 표시 이름("홍길동 G2 남")의 정규화 키가 한 멤버에만 맞고
+    그 행이 아직 누구에게도 연결되지 않았을 때 자동으로 연결하며, 이후에는 사용자 ID로 바로 찾습니다.
+    연결에는 닉네임#태그도 함께 저장해 시트 행이 옮겨져도 따라갑니다.
+    이미 다른 사용자에게 연결된 행은 자동으로 옮기지 않으며, 관리자가 /정보 멤버연결로만 바꿀 수 있습니다.
+    """
+
+    def __init__(self, path=BINDING_FILE, index=member_index):
+        self.path = path
+        self.index = index
+        self._rows = {}       # 사용자 ID -> 행 번호
+        self._nicknames = {}  # 사용자 ID -> 닉네임#태그
+        self._users = {}      # 행 번호 -> 사용자 ID
+        self._notified = set()  # 이미 관리자에게 알린 (사용자 ID, 행 번호)
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError as e:
+            logging.error(f"멤버 연결 파일 읽기 오류: {e}")
+            return
+
+        # 저장 형식: {"사용자 ID": [행 번호, "닉네임#태그"]}
+        for user_id, (row, nickname) in data.items():
+            self._set(int(user_id), int(row), nickname)
+
+    def save(self):
+        data = {str(user_id): [row, self._nicknames[user_id]] for user_id, row in self._rows.items()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def _set(self, user_id, row, nickname):
+        old_row = self._rows.get(user_id)
+        if old_row is not None and self._users.get(old_row) == user_id:
+            del self._users[old_row]
+        self._rows[user_id] = row
+        self._nicknames[user_id] = nickname
+        self._users[row] = user_id
+
+    # ----- 연결 -----
+
+    def bind(self, user_id, record, force=False):
+        """
+        사용자를 멤버 레코드에 연결하고 저장합니다.
+        행이 이미 다른 사용자에게 연결되어 있으면 force(관리자 연결)일 때만 옮깁니다.
+        :return: 연결했으면 True, 다른 사용자의 행이라 거부했으면 False
+        """
+        previous = self._users.get(record.row)
+        if previous is not None and previous != user_id:
+            if not force:
+                self._notify_conflict(user_id, record, previous)
+                return False
+            logging.warning(f"관리자 요청으로 멤버 행 {record.row} 연결 변경: {previous} -> {user_id}")
+            self._rows.pop(previous, None)
+            self._nicknames.pop(previous, None)
+        self._set(user_id, record.row, record.nickname)
+        self.save()
+        return True
+
+    def _notify_conflict(self, user_id, record, owner_id):
+        """다른 사용자에게 연결된 행에 연결하려는 시도를 로그와 관리자 채널에 남깁니다. (조합별 한 번)"""
+        logging.warning(
+            f"멤버 연결 거부: {user_id} -> {record.row}행 ({record.nickname}), 이미 {owner_id}에 연결됨"
+        )
+        if (user_id, record.row) in self._notified:
+            return
+        self._notified.add((user_id, record.row))
+        embed = discord.Embed(
+            title="⚠️ 멤버 연결 충돌",
+            description=(
+                f"<@{user_id}>님이 이미 <@{owner_id}>님에게 연결된 멤버에 연결을 시도했습니다.\n"
+                f"본인 확인 후 필요하면 `/정보 멤버연결`로 직접 연결해 주세요."
+            ),
+            color=discord.Color.orange()
+        )
+        embed.add_field(name="멤버", value=f"`{record.nickname}` ({record.row}행)", inline=False)
+        log_dispatcher.enqueue(ADMIN_LOG_CHANNEL_ID, embed)
+
+    def unbind(self, user_id):
+        row = self._rows.pop(user_id, None)
+        self._nicknames.pop(user_id, None)
+        if row is not None and self._users.get(row) == user_id:
+            del self._users[row]
+            self.save()
+
+    def rename(self, old_nickname, new_nickname):
+        """시트 닉네임 변경을 연결 정보에 반영합니다."""
+        changed = False
+        for user_id, nickname in self._nicknames.items():
+            if nickname == old_nickname:
+                self._nicknames[user_id] = new_nickname
+                changed = True
+        if changed:
+            self.save()
+
+    # ----- 조회 -----
+
+    def member_for(self, user):
+        """
+        디스코드 사용자의 멤버 레코드. 연결이 없으면 표시 이름으로 찾아 연결합니다.
+        멤버 인덱스가 로드된 상태에서 호출해야 합니다.
+        :return: MemberRecord 또는 None (None이면 사용자에게 LINK_HELP로 다시 연결을 안내)
+        """
+        row = self._rows.get(user.id)
+        if row is None:
+            # 태그가 있으면 닉네임#태그 완전 일치, 없으면 동명이인이 없는 정규화 키 일치
+            record = self.index.find(user.display_name)
+            if record is None:
+                return None
+            if "#" not in user.display_name and self._users.get(record.row) is not None:
+                # 정규화 키는 다른 사람도 같게 만들 수 있으므로 이미 주인이 있는 행은 키로 가져가지 않음
+                logging.info(f"멤버 자동 연결 건너뜀: {user.id} -> {record.row}행 ({record.nickname}) 이미 연결됨")
+                return None
+            if not self.bind(user.id, record):
+                return None
+            logging.info(f"멤버 연결: {user.id} -> {record.row}행 ({record.nickname})")
+            return record
+
+        record = self.index.find_row(row)
+        nickname = self._nicknames[user.id]
+        if record is not None and record.nickname == nickname:
+            return record
+
+        # 행이 옮겨졌으면 저장된 닉네임으로 새 행을 찾아 연결을 갱신
+        moved = self.index.find_exact(nickname)
+        if moved is not None:
+            return moved if self.bind(user.id, moved) else None
+
+        # 저장된 닉네임이 시트에 없으면 (시트에서 직접 수정, 멤버 삭제 등) 그 행의 현재 멤버를 믿지 않음
+        logging.warning(f"멤버 연결 확인 필요: {user.id} -> {row}행 ({nickname})을 시트에서 찾을 수 없음")
+        return None
+
+    async def resolve(self, user):
+        """member_for의 비동기 버전. 멤버 인덱스가 없으면 먼저 불러옵니다."""
+        await self.index.ensure_loaded()
+        return self.member_for(user)
+
+    def row_for(self, user_id):
+        return self._rows.get(user_id)
+
+    def user_for_row(self, row):
+        return self._users.get(row)
+
+
+member_bindings = MemberBindings()
+member_index.add_rename_listener(member_bindings.rename)
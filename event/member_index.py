@@ -0,0 +1,336 @@
+import asyncio
+import bisect
+import logging
+import time
+from collections import Counter
+from typing import NamedTuple
+
+from event.GoogleSheetsManager import GoogleSheetsManager
+from event.nickname import nickname_key
+
+# Google Sheets 설정
+SERVICE_ACCOUNT_FILE = 'resources/service_account.json'
+SPREADSHEET_ID = '1AYSWQwLOA-EvMJzJ7ros27OEzrTd2hERlI2WJX32RBE'
+
+REFRESH_INTERVAL = 600  # 초
+MISS_REFRESH_INTERVAL = 30  # 조회 실패 시 시트를 다시 읽는 최소 간격 (초)
+AUTOCOMPLETE_LIMIT = 25  # 디스코드 자동완성 최대 항목 수
+NGRAM_SIZE = 3
+SUGGESTION_LIMIT = 5
+CANDIDATE_FACTOR = 8      # 편집 거리로 재정렬할 후보 수 = limit * CANDIDATE_FACTOR
+STOP_GRAM_RATIO = 0.5     # 전체 멤버의 절반 이상이 가진 n-gram은 후보 선정에서 제외
+
+# 한글 자모 분해 테이블
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = [
+    "ㅏ", "ㅐ", "ㅑ", "ㅒ", "ㅓ", "ㅔ", "ㅕ", "ㅖ", "ㅗ", "ㅗㅏ", "ㅗㅐ",
+    "ㅗㅣ", "ㅛ", "ㅜ", "ㅜㅓ", "ㅜㅔ", "ㅜㅣ", "ㅠ", "ㅡ", "ㅡㅣ", "ㅣ",
+]
+JONGSEONG = [
+    "", "ㄱ", "ㄲ", "ㄱㅅ", "ㄴ", "ㄴㅈ", "ㄴㅎ", "ㄷ", "ㄹ", "ㄹㄱ", "ㄹㅁ",
+    "ㄹㅂ", "ㄹㅅ", "ㄹㅌ", "ㄹㅍ", "ㄹㅎ", "ㅁ", "ㅂ", "ㅂㅅ", "ㅅ", "ㅆ",
+    "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ",
+]
+# 입력 중인 호환 자모(겹모음/겹받침)도 같은 방식으로 분해
+COMPAT_JAMO = {
+    "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ",
+    "ㄽ": "ㄹㅅ", "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+}
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+
+
+def jamo_key(text):
+    """
+    검색용 키를 만듭니다. 공백을 제거하고 소문자로 바꾼 뒤 한글 음절을 자모로 분해하므로
+    '홍기', '홍길ㄷ' 처럼 조합 중인 입력도 '홍길동'의 접두어로 매칭됩니다.
+    """
+    parts = []
+    for char in text.lower():
+        if char.isspace():
+            continue
+        code = ord(char)
+        if HANGUL_BASE <= code <= HANGUL_LAST:
+            offset = code - HANGUL_BASE
+            parts.append(CHOSEONG[offset // 588])
+            parts.append(JUNGSEONG[(offset % 588) // 28])
+            parts.append(JONGSEONG[offset % 28])
+        else:
+            parts.append(COMPAT_JAMO.get(char, char))
+    return "".join(parts)
+
+
+def ngrams(key, size=NGRAM_SIZE):
+    """양 끝을 표시한 문자 n-gram 집합"""
+    padded = f"^{key}$"
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def edit_distance(a, b, max_distance=None):
+    """
+    레벤슈타인 편집 거리. max_distance를 넘으면 조기 종료하고 max_distance + 1을 반환합니다.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class MemberRecord(NamedTuple):
+    row: int          # MEMBER 시트 행 번호 (1부터)
+    number: str       # 순번 (C열)
+    nickname: str     # 닉네임#태그 (D열)
+    tier: str         # 티어 (E열)
+    key: str          # 정규화 키 (event.nickname.nickname_key)
+
+
+class MemberIndex:
+    """
+    MEMBER 시트 스냅샷을 메모리에 보관하고 닉네임 접두어 검색을 제공하는 클래스.
+    자동완성 응답은 이 인덱스만 사용하므로 Google Sheets를 호출하지 않습니다.
+    """
+
+    def __init__(self, sheets_manager=None):
+        self._sheets_manager = sheets_manager
+        self.records = []
+        self._by_nickname = {}   # 소문자 닉네임 -> MemberRecord
+        self._by_key = {}        # 정규화 키 -> MemberRecord (같은 키가 여러 명이면 None)
+        self._by_row = {}        # MEMBER 행 번호 -> MemberRecord
+        self._prefix_keys = []   # 정렬된 (자모 키, 레코드 인덱스)
+        self._search_keys = []   # 레코드별 자모 키
+        self._ngram_index = {}   # n-gram -> 레코드 인덱스 목록
+        self.loaded_at = None
+        self._refresh_task = None
+        self._miss_lock = asyncio.Lock()
+        self._rename_listeners = []
+
+    @property
+    def sheets_manager(self):
+        if self._sheets_manager is None:
+            self._sheets_manager = GoogleSheetsManager(SERVICE_ACCOUNT_FILE, SPREADSHEET_ID)
+        return self._sheets_manager
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    # ----- 갱신 -----
+
+    def refresh(self):
+        """MEMBER 시트를 읽어 인덱스를 다시 만듭니다. (블로킹)"""
+        member_data = self.sheets_manager.get_values(sheet_name="MEMBER", range_notation="C:E")
+        self.load_rows(member_data)
+        logging.info(f"멤버 인덱스 갱신 완료: {len(self.records)}명")
+
+    async def refresh_async(self):
+        await asyncio.to_thread(self.refresh)
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.refresh_async()
+
+    async def refresh_on_miss(self, min_age=MISS_REFRESH_INTERVAL):
+        """
+        조회 실패 시 호출합니다. 최근에 등록된 멤버일 수 있으므로 마지막 갱신 후 min_age초가 지났으면
+        시트를 한 번 다시 읽습니다. 동시에 여러 요청이 실패해도 읽기는 한 번만 합니다.
+        :return: 다시 읽었으면 True
+        """
+        async with self._miss_lock:
+            if self.loaded and time.time() - self.loaded_at < min_age:
+                return False
+            await self.refresh_async()
+            return True
+
+    def load_rows(self, member_data, start_row=1):
+        """
+        C:E 범위 값으로 인덱스를 만듭니다. 완성된 인덱스로 한 번에 교체하므로
+        갱신 중에도 조회는 이전 스냅샷을 그대로 사용합니다.
+        """
+        self._load_records(member_data, range(start_row, start_row + len(member_data)))
+
+    def _load_records(self, member_data, row_numbers):
+        records = []
+        for row_number, row in zip(row_numbers, member_data):
+            if len(row) < 2 or "#" not in row[1]:
+                continue
+            nickname = row[1].strip()
+            records.append(MemberRecord(
+                row=row_number,
+                number=row[0].lstrip("'").strip(),
+                nickname=nickname,
+                tier=row[2].strip() if len(row) >= 3 else "",
+                key=nickname_key(nickname),
+            ))
+
+        by_nickname = {record.nickname.lower(): record for record in records}
+        by_row = {record.row: record for record in records}
+        by_key = {}
+        for record in records:
+            if not record.key:
+                continue  # 꾸밈 글자만으로 된 닉네임("S#KR1")은 키로 찾지 않음
+            # 태그만 다른 동명이인은 키만으로 구분할 수 없으므로 None으로 표시
+            by_key[record.key] = None if record.key in by_key else record
+        search_keys = [jamo_key(record.nickname) for record in records]
+        prefix_keys = sorted((key, idx) for idx, key in enumerate(search_keys))
+
+        # 태그(#) 앞부분으로 n-gram 역색인 생성
+        ngram_index = {}
+        for idx, record in enumerate(records):
+            for gram in ngrams(jamo_key(record.nickname.split("#")[0])):
+                ngram_index.setdefault(gram, []).append(idx)
+
+        self.records, self._by_nickname, self._by_key = records, by_nickname, by_key
+        self._by_row, self._prefix_keys = by_row, prefix_keys
+        self._search_keys, self._ngram_index = search_keys, ngram_index
+        self.loaded_at = time.time()
+
+    def apply_change(self, record, nickname, tier):
+        """
+        시트에 반영한 닉네임/티어 변경을 인덱스에 바로 적용하고,
+        닉네임이 바뀌었으면 등록된 리스너에 (이전 닉네임, 새 닉네임)을 알립니다.
+        :return: 변경된 MemberRecord
+        """
+        updated = record._replace(nickname=nickname, tier=tier, key=nickname_key(nickname))
+        # 바뀐 한 행만 교체해 인덱스를 다시 만듦 (시트를 다시 읽지 않음)
+        rows = [
+            [r.number, r.nickname, r.tier] if r.row != record.row else [r.number, nickname, tier]
+            for r in self.records
+        ]
+        self._load_records(rows, [r.row for r in self.records])
+
+        if record.nickname != nickname:
+            for listener in self._rename_listeners:
+                try:
+                    listener(record.nickname, nickname)
+                except Exception as e:
+                    logging.error(f"닉네임 변경 전파 중 오류 발생 ({listener}): {e}", exc_info=True)
+        return self.find_row(record.row) or updated
+
+    def add_rename_listener(self, listener):
+        """
+        닉네임 변경 리스너를 등록합니다. listener(이전 닉네임, 새 닉네임)
+        닉네임을 키로 쓰는 캐시/저장소는 여기에 등록해 변경을 따라갑니다.
+        """
+        if listener not in self._rename_listeners:
+            self._rename_listeners.append(listener)
+
+    def start(self, interval=REFRESH_INTERVAL):
+        """주기적 갱신 작업을 시작합니다. 여러 번 호출해도 한 번만 실행됩니다."""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop(interval))
+
+    async def _refresh_loop(self, interval):
+        while True:
+            try:
+                await self.refresh_async()
+            except Exception as e:
+                logging.error(f"멤버 인덱스 갱신 중 오류 발생: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    # ----- 조회 -----
+
+    def find_exact(self, nickname):
+        """닉네임#태그 완전 일치 (대소문자 무시)"""
+        return self._by_nickname.get(nickname.strip().lower())
+
+    def find_row(self, row):
+        """MEMBER 행 번호로 멤버를 찾습니다."""
+        return self._by_row.get(row)
+
+    def find_by_key(self, key):
+        """정규화 키로 멤버를 찾습니다. 없거나 동명이인이면 None."""
+        if not key:
+            return None
+        return self._by_key.get(key)
+
+    def find(self, name):
+        """
+        태그(#)가 있으면 닉네임#태그 완전 일치로만 찾습니다. 키는 태그를 지우므로
+        "홍길동#KR9"가 "홍길동#KR1"로 매칭되지 않게 하려면 실패 시 suggest()로 후보를 보여주세요.
+        태그가 없으면 정규화 키로 찾습니다. 디스코드 표시 이름("홍길동 G2 남")도 그대로 넘기면 됩니다.
+        """
+        if "#" in name:
+            return self.find_exact(name)
+        return self.find_by_key(nickname_key(name))
+
+    def prefix(self, query, limit=AUTOCOMPLETE_LIMIT):
+        """자모 단위 접두어 검색 결과를 최대 limit개 반환합니다."""
+        key = jamo_key(query)
+        if not key:
+            return self.records[:limit]
+
+        keys = self._prefix_keys
+        start = bisect.bisect_left(keys, (key, -1))
+        results = []
+        for position in range(start, len(keys)):
+            prefix_key, idx = keys[position]
+            if not prefix_key.startswith(key):
+                break
+            results.append(self.records[idx])
+            if len(results) >= limit:
+                break
+        return results
+
+
+    def suggest(self, query, limit=SUGGESTION_LIMIT):
+        """
+        오타가 있는 닉네임과 비슷한 멤버를 최대 limit개 반환합니다.
+        n-gram 역색인으로 후보를 좁힌 뒤 편집 거리로 재정렬하므로 전체 멤버를 훑지 않습니다.
+        """
+        query = query.strip()
+        if not query or not self.records:
+            return []
+
+        query_key = jamo_key(query)
+        name_grams = ngrams(jamo_key(query.split("#")[0]))
+        stop_size = max(len(self.records) * STOP_GRAM_RATIO, 1)
+
+        overlap = Counter()
+        for gram in name_grams:
+            postings = self._ngram_index.get(gram)
+            if postings and len(postings) <= stop_size:
+                overlap.update(postings)
+        if not overlap:
+            return []
+
+        candidates = [idx for idx, _ in overlap.most_common(limit * CANDIDATE_FACTOR)]
+        max_distance = max(len(query_key) // 2, 2)
+        ranked = []
+        for idx in candidates:
+            candidate_key = self._search_keys[idx]
+            if "#" not in query_key:
+                candidate_key = candidate_key.split("#")[0]
+            distance = edit_distance(query_key, candidate_key, max_distance)
+            if distance <= max_distance:
+                ranked.append((distance, -overlap[idx], self.records[idx].nickname, idx))
+
+        ranked.sort()
+        return [self.records[idx] for *_, idx in ranked[:limit]]
+
+    def suggestion_text(self, query, limit=SUGGESTION_LIMIT):
+        """조회 실패 메시지에 덧붙일 추천 문구. 추천이 없으면 빈 문자열."""
+        suggestions = self.suggest(query, limit)
+        if not suggestions:
+            return ""
+        return "\n혹시 이 닉네임인가요? " + ", ".join(f"`{record.nickname}`" for record in suggestions)
+
+
+member_index = MemberIndex()
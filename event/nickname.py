@@ -0,0 +1,40 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+
+# 한 번의 치환으로 처리하는 정리 규칙
+#  - "#태그" 이후 전체
+#  - 단어 단위의 성별(남/여), 롤 티어 약자(GM, B/S/G/P/E/D/M/C/U/I + 디비전),
+#    숫자만으로 된 토큰(나이, 생년 등. 예: 95, 00년생)
+# 단어 단위로만 제거하므로 닉네임 안에 포함된 같은 글자는 그대로 남습니다.
+_SEPARATORS = r"\s/|·"
+_CLEANUP_PATTERN = re.compile(
+    rf"#.*$"
+    rf"|(?<![^{_SEPARATORS}])"
+    rf"(?:남|여|GM|[IBSGPEDMCU][1-4]?|\d+(?:년생|살)?)"
+    rf"(?![^{_SEPARATORS}#])",
+    re.IGNORECASE
+)
+_SEPARATOR_PATTERN = re.compile(rf"[{_SEPARATORS}]+")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def strip_decorations(nickname: str) -> str:
+    """
+    디스코드 표시 이름이나 시트 닉네임에서 태그, 티어, 성별, 숫자 토큰을 제거합니다.
+    예: "홍길동 G2 남" -> "홍길동", "홍길동#KR1" -> "홍길동"
+    """
+    cleaned = _CLEANUP_PATTERN.sub("", nickname)
+    return _SEPARATOR_PATTERN.sub(" ", cleaned).strip()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def nickname_key(nickname: str) -> str:
+    """
+    닉네임 비교용 정규화 키. 표시 이름과 시트 닉네임 모두 같은 키로 변환되므로
+    키가 같으면 같은 멤버로 봅니다.
+    """
+    cleaned = unicodedata.normalize("NFC", strip_decorations(nickname))
+    return "".join(cleaned.casefold().split())
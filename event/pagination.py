@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import re
+
+import discord
+
+# 버튼 custom_id: page:<소스 이름>:<버전>:<현재 페이지>:<prev|next>
+PAGE_BUTTON_TEMPLATE = r"page:(?P<source>[a-z_]+):(?P<version>\d+):(?P<page>\d+):(?P<action>prev|next)"
+
+
+class PageSource:
+    """
+    페이지로 나눠 보여줄 데이터 소스. version()이 바뀌면 페이지를 다시 만듭니다.
+    하위 클래스는 name, version(), build_pages()를 구현합니다.
+    """
+
+    name = ""
+
+    def version(self) -> int:
+        raise NotImplementedError
+
+    async def build_pages(self, guild) -> list:
+        """현재 버전의 페이지 Embed 목록을 만듭니다."""
+        raise NotImplementedError
+
+
+class PageCache:
+    """
+    소스별로 최신 버전의 페이지 Embed 목록 하나만 보관합니다.
+    같은 버전을 보는 모든 메시지와 사용자가 같은 Embed를 공유합니다.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._pages = {}   # 소스 이름 -> (버전, Embed 튜플)
+        self._locks = {}   # 소스 이름 -> asyncio.Lock (같은 버전을 동시에 두 번 만들지 않도록)
+
+    def register(self, source: PageSource):
+        self._sources[source.name] = source
+
+    def invalidate(self, name):
+        self._pages.pop(name, None)
+
+    async def get(self, name, guild):
+        """
+        :return: (현재 버전, 페이지 Embed 튜플)
+        """
+        source = self._sources[name]
+        version = source.version()
+        cached = self._pages.get(name)
+        if cached and cached[0] == version:
+            return cached
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            cached = self._pages.get(name)
+            if cached and cached[0] == version:
+                return cached
+            pages = tuple(await source.build_pages(guild))
+            self._pages[name] = (version, pages)
+            return version, pages
+
+
+page_cache = PageCache()
+
+
+class PageButton(discord.ui.DynamicItem[discord.ui.Button], template=PAGE_BUTTON_TEMPLATE):
+    """
+    이전/다음 페이지 버튼. 소스, 버전, 페이지가 custom_id에 들어 있으므로
+    메시지별 뷰 객체를 보관하지 않고 하나의 핸들러가 모든 메시지를 처리합니다.
+    """
+
+    def __init__(self, source, version, page, action, disabled=False):
+        super().__init__(
+            discord.ui.Button(
+                label="⬅️ 이전" if action == "prev" else "➡️ 다음",
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"page:{source}:{version}:{page}:{action}",
+                disabled=disabled,
+            )
+        )
+        self.source = source
+        self.version = version
+        self.page = page
+        self.action = action
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str], /):
+        return cls(match["source"], int(match["version"]), int(match["page"]), match["action"])
+
+    async def callback(self, interaction: discord.Interaction):
+        try:
+            version, pages = await page_cache.get(self.source, interaction.guild)
+            if version != self.version:
+                # 목록이 바뀌었으면 같은 위치의 최신 페이지를 보여줌
+                target = self.page
+            else:
+                target = self.page - 1 if self.action == "prev" else self.page + 1
+            target = max(0, min(target, len(pages) - 1))
+
+            await interaction.response.edit_message(
+                embed=pages[target],
+                view=page_view(self.source, version, target, len(pages))
+            )
+        except KeyError:
+            await interaction.response.send_message("더 이상 사용할 수 없는 목록입니다.", ephemeral=True)
+        except Exception as e:
+            logging.error(f"페이지 이동 중 오류 발생: {e}", exc_info=True)
+            await interaction.response.send_message("페이지를 불러오는 중 오류가 발생했습니다.", ephemeral=True)
+
+
+def page_view(source, version, page, total):
+    """
+    페이지 이동 버튼 뷰를 만듭니다. 뷰를 미리 종료해 두므로 메시지를 보내도 봇에 저장되지 않고,
+    버튼 클릭은 PageButton 핸들러가 처리합니다.
+    """
+    view = discord.ui.View(timeout=None)
+    view.add_item(PageButton(source, version, page, "prev", disabled=page <= 0))
+    view.add_item(discord.ui.Button(
+        label=f"{page + 1}/{max(total, 1)}",
+        style=discord.ButtonStyle.secondary,
+        custom_id=f"page_label:{source}",
+        disabled=True,
+    ))
+    view.add_item(PageButton(source, version, page, "next", disabled=page >= total - 1))
+    view.stop()
+    return view
+
+
+async def first_page(source, guild):
+    """
+    :return: (첫 페이지 Embed, 페이지 뷰). 한 페이지뿐이면 뷰는 None
+    """
+    version, pages = await page_cache.get(source, guild)
+    view = page_view(source, version, 0, len(pages)) if len(pages) > 1 else None
+    return pages[0], view
+
+
+def setup_pagination(bot):
+    """페이지 버튼 핸들러를 봇에 등록합니다. 여러 번 호출해도 됩니다."""
+    bot.add_dynamic_items(PageButton)
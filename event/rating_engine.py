@@ -0,0 +1,224 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+HISTORY_FILE = "war_history.jsonl"
+RATING_FILE = "ratings.npz"
+
+INITIAL_RATING = 1500.0
+K_PROVISIONAL = 40.0   # 배치 기간 K 계수
+K_STABLE = 20.0        # 배치 이후 K 계수
+PROVISIONAL_GAMES = 10
+
+
+class RatingEngine:
+    """
+    정산된 내전 기록을 순서대로 재생하여 팀 Elo 레이팅을 계산하는 클래스.
+    기록은 war_history.jsonl에 추가만 되며, 레이팅은 ratings.npz에 배열 형태로 저장됩니다.
+    """
+
+    def __init__(self, history_file=HISTORY_FILE, rating_file=RATING_FILE):
+        self.history_file = history_file
+        self.rating_file = rating_file
+        self._lock = threading.Lock()
+        self._index = {}  # 닉네임 -> 배열 인덱스
+        self.names = []
+        self.ratings = np.zeros(0, dtype=np.float64)
+        self.games = np.zeros(0, dtype=np.int32)
+        self.wins = np.zeros(0, dtype=np.int32)
+        self.applied = 0  # 반영된 기록 수
+        self._keys = set()  # 기록된 정산 ID (같은 내전을 두 번 기록하지 않도록)
+        self.load()
+
+    # ----- 저장/불러오기 -----
+
+    def load(self):
+        """저장된 레이팅을 불러오고, 반영되지 않은 기록이 있으면 이어서 계산합니다."""
+        with self._lock:
+            if os.path.exists(self.rating_file):
+                try:
+                    with np.load(self.rating_file, allow_pickle=False) as data:
+                        self.names = [str(name) for name in data["names"]]
+                        self.ratings = data["ratings"].astype(np.float64)
+                        self.games = data["games"].astype(np.int32)
+                        self.wins = data["wins"].astype(np.int32)
+                        self.applied = int(data["applied"])
+                    self._index = {name: idx for idx, name in enumerate(self.names)}
+                except Exception as e:
+                    logging.error(f"레이팅 파일 읽기 오류, 기록에서 다시 계산합니다: {e}")
+                    self._reset()
+
+            history = self._read_history()
+            self._keys = {war["key"] for war in history if war.get("key")}
+            if self.applied > len(history):
+                # 기록 파일이 교체된 경우 처음부터 다시 계산
+                self._reset()
+            pending = history[self.applied:]
+            if pending:
+                for war in pending:
+                    self._apply(war)
+                self._save()
+                logging.info(f"레이팅 기록 {len(pending)}건 반영 (총 {self.applied}건)")
+
+    def rebuild(self):
+        """모든 기록을 처음부터 다시 재생합니다."""
+        with self._lock:
+            self._reset()
+            for war in self._read_history():
+                self._apply(war)
+            self._save()
+            return self.applied
+
+    def _reset(self):
+        self._index = {}
+        self.names = []
+        self.ratings = np.zeros(0, dtype=np.float64)
+        self.games = np.zeros(0, dtype=np.int32)
+        self.wins = np.zeros(0, dtype=np.int32)
+        self.applied = 0
+
+    def _read_history(self):
+        if not os.path.exists(self.history_file):
+            return []
+        history = []
+        with open(self.history_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    history.append(json.loads(line))
+        return history
+
+    def _save(self):
+        tmp_path = f"{self.rating_file}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            names=np.array(self.names, dtype=str),
+            ratings=self.ratings,  # 기록 재생과 같은 float64로 저장해 불러온 값이 어긋나지 않게 함
+            games=self.games,
+            wins=self.wins,
+            applied=np.int64(self.applied),
+        )
+        os.replace(tmp_path, self.rating_file)
+
+    # ----- 계산 -----
+
+    def _indices(self, nicknames):
+        """닉네임 목록을 배열 인덱스로 변환합니다. 처음 보는 닉네임은 추가합니다."""
+        new_names = [name for name in dict.fromkeys(nicknames) if name not in self._index]
+        if new_names:
+            for name in new_names:
+                self._index[name] = len(self.names)
+                self.names.append(name)
+            grow = len(new_names)
+            self.ratings = np.concatenate([self.ratings, np.full(grow, INITIAL_RATING)])
+            self.games = np.concatenate([self.games, np.zeros(grow, dtype=np.int32)])
+            self.wins = np.concatenate([self.wins, np.zeros(grow, dtype=np.int32)])
+        return np.fromiter((self._index[name] for name in dict.fromkeys(nicknames)), dtype=np.int64)
+
+    def _rename(self, old, new):
+        idx = self._index.get(old)
+        if idx is None or old == new:
+            return
+        if new in self._index:
+            logging.warning(f"레이팅 닉네임 변경 건너뜀 - 이미 존재하는 닉네임: {new}")
+            return
+        del self._index[old]
+        self._index[new] = idx
+        self.names[idx] = new
+
+    def _apply(self, war):
+        """내전 한 건을 반영합니다. 양 팀의 모든 선수를 한 번에 갱신합니다."""
+        if war.get("type") == "rename":
+            self.applied += 1
+            self._rename(war["old"], war["new"])
+            return
+
+        winners = self._indices(war.get("winners", []))
+        losers = self._indices(war.get("losers", []))
+        self.applied += 1
+        if len(winners) == 0 or len(losers) == 0:
+            return
+
+        winner_rating = self.ratings[winners].mean()
+        loser_rating = self.ratings[losers].mean()
+        expected = 1.0 / (1.0 + 10 ** ((loser_rating - winner_rating) / 400.0))
+        delta = 1.0 - expected
+
+        k_winners = np.where(self.games[winners] < PROVISIONAL_GAMES, K_PROVISIONAL, K_STABLE)
+        k_losers = np.where(self.games[losers] < PROVISIONAL_GAMES, K_PROVISIONAL, K_STABLE)
+        self.ratings[winners] += k_winners * delta
+        self.ratings[losers] -= k_losers * delta
+        self.games[winners] += 1
+        self.games[losers] += 1
+        self.wins[winners] += 1
+
+    def record_war(self, winners, losers, lobby_id=None, key=None):
+        """
+        정산된 내전을 기록에 추가하고 레이팅을 증분 갱신합니다.
+        :param winners: 승리팀 닉네임 목록
+        :param losers: 패배팀 닉네임 목록
+        :param lobby_id: 내전 로비 ID
+        :param key: 정산 ID ("war:<닫기 작업 ID>"). 이미 기록된 정산이면 건너뜁니다.
+        :return: 기록했으면 True
+        """
+        war = {
+            "settled_at": datetime.now().isoformat(),
+            "lobby_id": lobby_id,
+            "winners": list(winners),
+            "losers": list(losers),
+        }
+        if key:
+            war["key"] = key
+        with self._lock:
+            if key and key in self._keys:
+                logging.warning(f"이미 기록된 내전 정산입니다: {key}")
+                return False
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(war, ensure_ascii=False) + "\n")
+            self._apply(war)
+            self._save()
+            if key:
+                self._keys.add(key)
+        logging.info(f"레이팅 갱신 - 승리 {len(war['winners'])}명, 패배 {len(war['losers'])}명")
+        return True
+
+    def rename(self, old, new):
+        """
+        닉네임 변경을 기록에 추가하고 반영합니다.
+        기록에 남기므로 rebuild()로 다시 계산해도 변경된 닉네임이 유지됩니다.
+        """
+        with self._lock:
+            if old not in self._index or old == new:
+                return
+            event = {"type": "rename", "renamed_at": datetime.now().isoformat(), "old": old, "new": new}
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._apply(event)
+            self._save()
+        logging.info(f"레이팅 닉네임 변경: {old} -> {new}")
+
+    # ----- 조회 -----
+
+    def get(self, nickname):
+        """닉네임의 (레이팅, 경기 수, 승리 수)를 반환합니다. 기록이 없으면 None."""
+        idx = self._index.get(nickname)
+        if idx is None:
+            return None
+        return float(self.ratings[idx]), int(self.games[idx]), int(self.wins[idx])
+
+    def top(self, limit=10, min_games=1):
+        """레이팅 상위 목록 [(닉네임, 레이팅, 경기 수, 승리 수)]"""
+        with self._lock:
+            eligible = np.flatnonzero(self.games >= min_games)
+            order = eligible[np.argsort(-self.ratings[eligible], kind="stable")][:limit]
+            return [
+                (self.names[idx], float(self.ratings[idx]), int(self.games[idx]), int(self.wins[idx]))
+                for idx in order
+            ]
+
+
+rating_engine = RatingEngine()
@@ -0,0 +1,225 @@
+import itertools
+import re
+from collections import OrderedDict
+from typing import NamedTuple, FrozenSet
+
+import numpy as np
+
+# 티어별 기본 점수 (티어 단계 * 4 + 디비전 보정)
+TIER_BASE = {"I": 0, "B": 1, "S": 2, "G": 3, "P": 4, "E": 5, "D": 6, "M": 7, "GM": 8, "C": 9}
+TIER_ALIASES = {
+    "아이언": "I", "브론즈": "B", "실버": "S", "골드": "G",
+    "플래티넘": "P", "플레": "P", "에메랄드": "E", "에메": "E",
+    "다이아몬드": "D", "다이아": "D", "마스터": "M",
+    "그랜드마스터": "GM", "그마": "GM", "챌린저": "C", "챌": "C",
+}
+TIER_PATTERN = re.compile(
+    r"(그랜드마스터|그마|아이언|브론즈|실버|골드|플래티넘|플레|에메랄드|에메|다이아몬드|다이아|마스터|챌린저|챌|GM|[IBSGPEDMC])\s*([1-4])?",
+    re.IGNORECASE
+)
+
+LANES = ("탑", "정글", "미드", "원딜", "서폿")
+LANE_ALIASES = {
+    "탑": 0, "top": 0,
+    "정글": 1, "jg": 1, "jungle": 1,
+    "미드": 2, "mid": 2,
+    "원딜": 3, "바텀": 3, "ad": 3, "adc": 3, "bot": 3,
+    "서폿": 4, "서포터": 4, "sup": 4, "support": 4,
+}
+ALL_LANES_WORDS = ("올라인", "상관없음", "all", "fill", "아무거나")
+
+LANE_PENALTY = 4.0        # 팀에 비어 있는 라인 하나당 추가 비용
+EXHAUSTIVE_LIMIT = 16     # 이 인원 이하까지는 모든 분할을 한 번에 계산
+LOCAL_SEARCH_RESTARTS = 8
+CACHE_SIZE = 64
+
+
+class Player(NamedTuple):
+    name: str
+    score: float
+    lanes: FrozenSet[int]
+
+
+def tier_score(tier):
+    """
+    티어 문자열을 점수로 변환합니다. (예: "G2", "골드 2", "다이아1", "M")
+    :return: 점수 또는 해석할 수 없는 경우 None
+    """
+    if not tier:
+        return None
+    match = TIER_PATTERN.search(str(tier).strip())
+    if not match:
+        return None
+
+    token = match.group(1)
+    key = TIER_ALIASES.get(token, token.upper())
+    division = int(match.group(2)) if match.group(2) else 4
+    if key in ("M", "GM", "C"):
+        division = 4  # 마스터 이상은 디비전 없음
+    return TIER_BASE[key] * 4 + (4 - division)
+
+
+def parse_lanes(text):
+    """라인 입력 문자열을 라인 인덱스 집합으로 변환합니다. 알 수 없으면 전체 라인."""
+    if not text:
+        return frozenset(range(len(LANES)))
+    lowered = str(text).lower()
+    if any(word in lowered for word in ALL_LANES_WORDS):
+        return frozenset(range(len(LANES)))
+
+    lanes = {
+        lane for alias, lane in LANE_ALIASES.items()
+        if re.search(rf"(?<![a-z]){re.escape(alias)}(?![a-z])", lowered)
+    }
+    return frozenset(lanes) if lanes else frozenset(range(len(LANES)))
+
+
+def _split_masks(n, k):
+    """
+    n명 중 k명을 A팀으로 고르는 모든 분할을 (분할 수 x n) 0/1 행렬로 반환합니다.
+    양 팀 인원이 같으면 0번 선수를 A팀에 고정해 좌우 대칭인 중복 분할을 제거합니다.
+    (10명: 252개 분할 중 서로 다른 126개)
+    """
+    if n == 2 * k:
+        combos = [(0,) + rest for rest in itertools.combinations(range(1, n), k - 1)]
+    else:
+        combos = list(itertools.combinations(range(n), k))
+    masks = np.zeros((len(combos), n), dtype=np.float64)
+    rows = np.repeat(np.arange(len(combos)), k)
+    masks[rows, np.asarray(combos).ravel()] = 1.0
+    return masks
+
+
+_mask_cache = {}
+
+
+def _cached_masks(n, k):
+    masks = _mask_cache.get((n, k))
+    if masks is None:
+        masks = _split_masks(n, k)
+        _mask_cache[(n, k)] = masks
+    return masks
+
+
+def _lane_matrix(players):
+    lanes = np.zeros((len(players), len(LANES)), dtype=np.float64)
+    for idx, player in enumerate(players):
+        lanes[idx, list(player.lanes)] = 1.0
+    return lanes
+
+
+def _score_masks(masks, scores, lanes):
+    """
+    여러 분할을 한 번에 평가합니다.
+    비용 = 팀 점수 차 + 비어 있는 라인 수 * LANE_PENALTY
+    """
+    total = scores.sum()
+    sum_a = masks @ scores
+    diff = np.abs(2 * sum_a - total)
+
+    coverage_a = (masks @ lanes) > 0
+    coverage_b = ((1.0 - masks) @ lanes) > 0
+    missing = (len(LANES) - coverage_a.sum(axis=1)) + (len(LANES) - coverage_b.sum(axis=1))
+    return diff + missing * LANE_PENALTY, diff, missing
+
+
+def _local_search(scores, lanes, k, restarts=LOCAL_SEARCH_RESTARTS):
+    """
+    인원이 많은 경우 교환(swap) 기반 지역 탐색으로 분할을 찾습니다.
+    매 단계에서 가능한 모든 1:1 교환을 한 번에 평가하여 가장 좋은 교환을 적용합니다.
+    """
+    n = len(scores)
+    rng = np.random.default_rng(n)
+    best_mask, best_cost = None, np.inf
+
+    # 첫 시도는 점수 순 스네이크 드래프트, 이후는 무작위 시작
+    order = np.argsort(-scores)
+    snake = np.zeros(n)
+    snake[order[[i for i in range(n) if (i % 4) in (0, 3)][:k]]] = 1.0
+    if snake.sum() < k:
+        rest = [i for i in order if snake[i] == 0]
+        snake[rest[:k - int(snake.sum())]] = 1.0
+
+    for attempt in range(restarts):
+        if attempt == 0:
+            mask = snake
+        else:
+            mask = np.zeros(n)
+            mask[rng.choice(n, size=k, replace=False)] = 1.0
+        cost = _score_masks(mask[None, :], scores, lanes)[0][0]
+
+        while True:
+            team_a = np.flatnonzero(mask)
+            team_b = np.flatnonzero(mask == 0)
+            pairs = np.array(list(itertools.product(team_a, team_b)))
+            candidates = np.repeat(mask[None, :], len(pairs), axis=0)
+            candidates[np.arange(len(pairs)), pairs[:, 0]] = 0.0
+            candidates[np.arange(len(pairs)), pairs[:, 1]] = 1.0
+
+            costs = _score_masks(candidates, scores, lanes)[0]
+            best_idx = int(np.argmin(costs))
+            if costs[best_idx] >= cost - 1e-9:
+                break
+            mask, cost = candidates[best_idx], costs[best_idx]
+
+        if cost < best_cost:
+            best_mask, best_cost = mask, cost
+
+    return best_mask
+
+
+class TeamBalancer:
+    """
+    내전 참가자를 가장 균형 잡힌 두 팀으로 나누는 클래스.
+    결과는 로스터(이름, 점수, 라인) 단위로 캐시됩니다.
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def balance(self, players):
+        """
+        :param players: Player 목록
+        :return: {"team_a", "team_b", "diff", "missing_lanes", "method"} 딕셔너리
+        """
+        players = sorted(players, key=lambda p: p.name)
+        if len(players) < 2:
+            raise ValueError("팀을 나누려면 최소 2명이 필요합니다.")
+
+        key = tuple(players)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        n = len(players)
+        k = n // 2
+        scores = np.array([p.score for p in players], dtype=np.float64)
+        lanes = _lane_matrix(players)
+
+        if n <= EXHAUSTIVE_LIMIT:
+            masks = _cached_masks(n, k)
+            costs = _score_masks(masks, scores, lanes)[0]
+            mask = masks[int(np.argmin(costs))]
+            method = "exhaustive"
+        else:
+            mask = _local_search(scores, lanes, k)
+            method = "local"
+
+        _, diff, missing = _score_masks(mask[None, :], scores, lanes)
+        result = {
+            "team_a": [p for p, m in zip(players, mask) if m],
+            "team_b": [p for p, m in zip(players, mask) if not m],
+            "diff": float(diff[0]),
+            "missing_lanes": int(missing[0]),
+            "method": method,
+        }
+
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+
+team_balancer = TeamBalancer()
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+
+RECORD_DIR = "records"
+JOB_DIR = os.path.join(RECORD_DIR, "jobs")
+
+# 작업 단계 (순서대로 진행)
+STAGE_PENDING = "pending"      # 작업 등록됨
+STAGE_SNAPSHOT = "snapshot"    # 시트 값 스냅샷 저장 완료
+STAGE_ARCHIVED = "archived"    # xlsx 보관 완료
+STAGE_VERIFIED = "verified"    # 보관 파일 검증 완료
+STAGE_DELETED = "deleted"      # 시트 삭제 완료
+STAGE_DONE = "done"            # 상태 정리 완료
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 5  # 초
+
+
+class WarClosePipeline:
+    """
+    내전 닫기를 단계별 백그라운드 작업으로 처리하는 클래스.
+    각 단계는 작업 파일에 기록되므로 봇이 중간에 종료되어도 다음 실행 시 이어서 진행됩니다.
+    """
+
+    def __init__(self, sheets_manager, on_complete=None, job_dir=JOB_DIR, record_dir=RECORD_DIR):
+        """
+        :param sheets_manager: GoogleSheetsManager 인스턴스
+        :param on_complete: 시트 삭제 후 호출될 콜백 (job) -> None
+        :param job_dir: 작업 파일 저장 경로
+        :param record_dir: xlsx 보관 경로
+        """
+        self.sheets_manager = sheets_manager
+        self.on_complete = on_complete
+        self.job_dir = job_dir
+        self.record_dir = record_dir
+        self._tasks = {}
+
+    # ----- 작업 파일 관리 -----
+
+    def _job_path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _snapshot_path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.snapshot.json")
+
+    def _save_job(self, job):
+        os.makedirs(self.job_dir, exist_ok=True)
+        path = self._job_path(job["job_id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, path)
+
+    def load_jobs(self):
+        """작업 파일을 모두 읽어 반환합니다."""
+        if not os.path.isdir(self.job_dir):
+            return []
+
+        jobs = []
+        for file_name in sorted(os.listdir(self.job_dir)):
+            if not file_name.endswith(".json") or file_name.endswith(".snapshot.json"):
+                continue
+            try:
+                with open(os.path.join(self.job_dir, file_name), "r", encoding="utf-8") as f:
+                    jobs.append(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                logging.error(f"닫기 작업 파일 읽기 오류 ({file_name}): {e}")
+        return jobs
+
+    def pending_jobs(self):
+        return [job for job in self.load_jobs() if job.get("stage") != STAGE_DONE]
+
+    def pending_sheets(self):
+        """아직 닫기가 끝나지 않은 시트 이름 목록."""
+        return {job["sheet_name"] for job in self.pending_jobs()}
+
+    # ----- 작업 실행 -----
+
+    def submit(self, sheet_name, notify=None, **extra):
+        """
+        닫기 작업을 등록하고 즉시 백그라운드에서 실행합니다.
+        :param sheet_name: 닫을 내전 시트 이름
+        :param notify: 작업 종료 시 호출될 코루틴 함수 (job) -> None
+        :param extra: 작업 파일에 함께 기록할 값 (예: lobby_id)
+        :return: 등록된 작업 정보
+        """
+        for job in self.pending_jobs():
+            if job["sheet_name"] == sheet_name:
+                logging.info(f"이미 진행 중인 닫기 작업이 있습니다: {sheet_name}")
+                self._schedule(job, notify)
+                return job
+
+        now = datetime.now()
+        job = {
+            "job_id": f"{now.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}",
+            "sheet_name": sheet_name,
+            "stage": STAGE_PENDING,
+            "created_at": now.isoformat(),
+            "archive_path": os.path.join(
+                self.record_dir, f"내전기록_{now.strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
+            ),
+            "attempts": 0,
+            "error": None,
+        }
+        job.update(extra)
+        self._save_job(job)
+        logging.info(f"닫기 작업 등록: {job['job_id']} ({sheet_name})")
+        self._schedule(job, notify)
+        return job
+
+    def resume(self):
+        """완료되지 않은 작업을 다시 실행합니다. 봇 시작 시 호출됩니다."""
+        jobs = self.pending_jobs()
+        for job in jobs:
+            logging.info(f"닫기 작업 재개: {job['job_id']} ({job['sheet_name']}, 단계: {job['stage']})")
+            self._schedule(job)
+        return len(jobs)
+
+    def _schedule(self, job, notify=None):
+        task = self._tasks.get(job["job_id"])
+        if task and not task.done():
+            return task
+        task = asyncio.get_running_loop().create_task(self._run(job, notify))
+        self._tasks[job["job_id"]] = task
+        return task
+
+    async def _run(self, job, notify=None):
+        try:
+            while job["stage"] != STAGE_DONE:
+                try:
+                    if job["stage"] == STAGE_DELETED:
+                        self._complete(job)
+                    else:
+                        await asyncio.to_thread(self._advance, job)
+                    job["attempts"] = 0
+                    job["error"] = None
+                except Exception as e:
+                    job["attempts"] += 1
+                    job["error"] = str(e)
+                    self._save_job(job)
+                    logging.error(
+                        f"닫기 작업 오류 ({job['job_id']}, 단계: {job['stage']}, 시도: {job['attempts']}): {e}",
+                        exc_info=True
+                    )
+                    if job["attempts"] >= MAX_ATTEMPTS:
+                        logging.error(f"닫기 작업 중단: {job['job_id']} - 다음 실행 시 재개됩니다.")
+                        break
+                    await asyncio.sleep(RETRY_DELAY * job["attempts"])
+        finally:
+            self._tasks.pop(job["job_id"], None)
+
+        if notify:
+            try:
+                await notify(job)
+            except Exception as e:
+                logging.error(f"닫기 작업 결과 알림 중 오류 발생: {e}", exc_info=True)
+
+    def _advance(self, job):
+        """현재 단계의 다음 단계를 수행하고 작업 파일에 기록합니다. (스레드에서 실행)"""
+        stage = job["stage"]
+        sheet_name = job["sheet_name"]
+
+        if stage == STAGE_PENDING:
+            values = self.sheets_manager.get_values(sheet_name=sheet_name, range_notation="A:Z")
+            if not values:
+                raise ValueError(f"시트 '{sheet_name}'에서 데이터를 가져오지 못했습니다.")
+            with open(self._snapshot_path(job["job_id"]), "w", encoding="utf-8") as f:
+                json.dump(values, f, ensure_ascii=False)
+            job["stage"] = STAGE_SNAPSHOT
+
+        elif stage == STAGE_SNAPSHOT:
+            os.makedirs(self.record_dir, exist_ok=True)
+            values = self._load_snapshot(job)
+            self.sheets_manager.save_values_as_xlsx(values, sheet_name, job["archive_path"])
+            job["stage"] = STAGE_ARCHIVED
+
+        elif stage == STAGE_ARCHIVED:
+            if not self._verify_archive(job):
+                # 보관 파일이 손상된 경우 다시 보관
+                job["stage"] = STAGE_SNAPSHOT
+                self._save_job(job)
+                raise ValueError(f"보관 파일 검증 실패: {job['archive_path']}")
+            job["stage"] = STAGE_VERIFIED
+
+        elif stage == STAGE_VERIFIED:
+            if sheet_name in (self.sheets_manager.get_sheet_names() or []):
+                if not self.sheets_manager.delete_sheet(sheet_name):
+                    raise RuntimeError(f"시트 '{sheet_name}' 삭제 실패")
+            job["stage"] = STAGE_DELETED
+
+        self._save_job(job)
+        logging.info(f"닫기 작업 진행: {job['job_id']} -> {job['stage']}")
+
+    def _complete(self, job):
+        if self.on_complete:
+            self.on_complete(job)
+        job["stage"] = STAGE_DONE
+        job["completed_at"] = datetime.now().isoformat()
+
+        # 완료된 작업은 파일을 정리하여 재개 대상에서 제외
+        for path in (self._snapshot_path(job["job_id"]), self._job_path(job["job_id"])):
+            if os.path.exists(path):
+                os.remove(path)
+        logging.info(f"닫기 작업 완료: {job['job_id']} ({job['sheet_name']})")
+
+    def _load_snapshot(self, job):
+        with open(self._snapshot_path(job["job_id"]), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _verify_archive(self, job):
+        """보관된 xlsx의 내용이 스냅샷과 일치하는지 확인합니다."""
+        import openpyxl
+
+        if not os.path.exists(job["archive_path"]):
+            return False
+
+        def normalize(rows):
+            normalized = []
+            for row in rows:
+                cells = ["" if value is None else str(value) for value in row]
+                while cells and cells[-1] == "":
+                    cells.pop()
+                normalized.append(cells)
+            while normalized and not normalized[-1]:
+                normalized.pop()
+            return normalized
+
+        workbook = openpyxl.load_workbook(job["archive_path"], read_only=True)
+        try:
+            archived = normalize(workbook.active.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+        return archived == normalize(self._load_snapshot(job))
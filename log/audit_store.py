@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+AUDIT_DIR = "audit_logs"
+DB_FILE = "audit.db"
+RETENTION_DAYS = 90         # 일별 파일과 검색 인덱스를 보관하는 기간
+FLUSH_INTERVAL = 2.0        # 모은 기록을 파일/인덱스에 쓰는 주기 (초)
+
+seoul_tz = pytz.timezone("Asia/Seoul")
+
+# 로그 종류 -> 표시 이름
+EVENT_TYPES = {
+    "member_join": "멤버 입장",
+    "member_leave": "멤버 퇴장",
+    "message_delete": "메시지 삭제",
+    "message_edit": "메시지 수정",
+    "message_bulk_delete": "메시지 일괄 삭제",
+    "voice_join": "음성 입장",
+    "voice_move": "음성 이동",
+    "voice_leave": "음성 퇴장",
+    "role_update": "역할 변경",
+}
+
+
+def embed_text(embed):
+    """임베드의 제목, 설명, 필드를 검색용 텍스트 한 줄로 만듭니다."""
+    parts = [embed.title or "", embed.description or ""]
+    parts += [f"{field.name}: {field.value}" for field in embed.fields]
+    return " | ".join(part for part in parts if part)
+
+
+class AuditStore:
+    """
+    감사 로그 저장소. 로그 채널로 보내는 모든 이벤트를 날짜별 JSONL 파일(추가 전용)에 쓰고,
+    SQLite 인덱스(FTS5 trigram)에 넣어 사용자/채널/종류/기간/본문으로 검색합니다.
+    이벤트 핸들러는 record()로 메모리에 넣기만 하고, 쓰기는 주기적으로 별도 스레드에서 한 번에 합니다.
+    """
+
+    def __init__(self, directory=AUDIT_DIR, retention_days=RETENTION_DAYS):
+        self.directory = directory
+        self.retention_days = retention_days
+        self._pending = []
+        self._pending_lock = threading.Lock()  # record()(이벤트 루프)와 flush()(작업 스레드)의 대기열 교체 보호
+        self._lock = threading.Lock()   # 파일/DB 쓰기와 검색을 직렬화
+        self._conn = None
+        self._fts = False
+        self._task = None
+
+    # ----- 초기화 -----
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.directory, DB_FILE), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY, at REAL NOT NULL, type TEXT NOT NULL, "
+            "user_id INTEGER, channel_id INTEGER, text TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS events_at ON events(at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_user ON events(user_id, at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_channel ON events(channel_id, at)")
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+                "text, content='events', content_rowid='id', tokenize='trigram')"
+            )
+            self._fts = True
+        except sqlite3.OperationalError as e:
+            logging.warning(f"FTS5 trigram을 사용할 수 없어 본문 검색은 LIKE로 처리합니다: {e}")
+        conn.commit()
+        self._conn = conn
+        return conn
+
+    def start(self):
+        """봇 이벤트 루프에서 주기적 쓰기 작업을 시작합니다."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self):
+        last_prune = 0.0
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await asyncio.to_thread(self.flush)
+                if time.time() - last_prune > 3600:
+                    await asyncio.to_thread(self.prune)
+                    last_prune = time.time()
+            except Exception as e:
+                logging.error(f"감사 로그 저장 중 오류 발생: {e}", exc_info=True)
+
+    # ----- 기록 -----
+
+    def record(self, event_type, text, user_id=None, channel_id=None):
+        """로그 이벤트 하나를 쓰기 대기열에 넣습니다. 바로 반환합니다."""
+        event = {
+            "at": time.time(),
+            "type": event_type,
+            "user_id": int(user_id) if user_id is not None else None,
+            "channel_id": int(channel_id) if channel_id is not None else None,
+            "text": text,
+        }
+        with self._pending_lock:
+            self._pending.append(event)
+
+    def flush(self):
+        """대기 중인 기록을 날짜별 파일과 검색 인덱스에 씁니다."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            by_day = {}
+            for event in pending:
+                day = datetime.fromtimestamp(event["at"], seoul_tz).strftime("%Y-%m-%d")
+                by_day.setdefault(day, []).append(event)
+            for day, events in by_day.items():
+                with open(os.path.join(self.directory, f"audit-{day}.jsonl"), "a", encoding="utf-8") as f:
+                    for event in events:
+                        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+            with conn:
+                for event in pending:
+                    cursor = conn.execute(
+                        "INSERT INTO events (at, type, user_id, channel_id, text) VALUES (?, ?, ?, ?, ?)",
+                        (event["at"], event["type"], event["user_id"], event["channel_id"], event["text"])
+                    )
+                    if self._fts:
+                        conn.execute(
+                            "INSERT INTO events_fts (rowid, text) VALUES (?, ?)",
+                            (cursor.lastrowid, event["text"])
+                        )
+        return len(pending)
+
+    def prune(self):
+        """보관 기간이 지난 일별 파일과 인덱스 기록을 지웁니다."""
+        cutoff_day = datetime.now(seoul_tz).date() - timedelta(days=self.retention_days)
+        cutoff = seoul_tz.localize(datetime(cutoff_day.year, cutoff_day.month, cutoff_day.day)).timestamp()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                if self._fts:
+                    conn.execute(
+                        "INSERT INTO events_fts (events_fts, rowid, text) "
+                        "SELECT 'delete', id, text FROM events WHERE at < ?",
+                        (cutoff,)
+                    )
+                conn.execute("DELETE FROM events WHERE at < ?", (cutoff,))
+            for name in os.listdir(self.directory):
+                if name.startswith("audit-") and name.endswith(".jsonl") and name[6:16] < cutoff_day.isoformat():
+                    os.remove(os.path.join(self.directory, name))
+
+    # ----- 검색 -----
+
+    def search(self, user_id=None, channel_id=None, event_type=None, since=None, until=None, text=None, limit=20):
+        """
+        조건에 맞는 기록을 최신순으로 반환합니다. since/until은 유닉스 시각.
+        :return: [(at, type, user_id, channel_id, text)]
+        """
+        self.flush()
+        with self._lock:
+            conn = self._connect()
+
+        conditions = []
+        params = []
+        if user_id is not None:
+            conditions.append("events.user_id = ?")
+            params.append(int(user_id))
+        if channel_id is not None:
+            conditions.append("events.channel_id = ?")
+            params.append(int(channel_id))
+        if event_type:
+            conditions.append("events.type = ?")
+            params.append(event_type)
+        if since is not None:
+            conditions.append("events.at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("events.at < ?")
+            params.append(until)
+
+        source = "events"
+        if text:
+            # trigram 인덱스는 3글자 이상일 때만 사용할 수 있음
+            if self._fts and len(text) >= 3:
+                source = "events JOIN events_fts ON events_fts.rowid = events.id"
+                conditions.append("events_fts MATCH ?")
+                params.append('"' + text.replace('"', '""') + '"')
+            else:
+                conditions.append("events.text LIKE ?")
+                params.append(f"%{text}%")
+
+        query = f"SELECT events.at, events.type, events.user_id, events.channel_id, events.text FROM {source}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY events.at DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            return conn.execute(query, params).fetchall()
+
+
+    async def search_async(self, **conditions):
+        return await asyncio.to_thread(self.search, **conditions)
+
+
+audit_store = AuditStore()
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+from collections import Counter, deque
+from datetime import datetime
+
+import discord
+
+MAX_EMBEDS_PER_MESSAGE = 10     # 디스코드 메시지 하나에 넣을 수 있는 임베드 수
+MAX_EMBED_CHARS = 6000          # 메시지 하나에 들어가는 임베드 글자 수 합계 제한
+FLUSH_INTERVAL = 2.0            # 채널별 대기열을 보내는 주기 (초)
+SUMMARIZE_AFTER = 30            # 채널 대기열이 이보다 길어지면 넘치는 로그를 요약
+MAX_PENDING_FILES = 5           # 채널별로 대기시킬 첨부 파일 로그 수 (넘으면 첨부 없이 요약)
+
+# 이벤트 핸들러와 전송 작업 사이의 공용 대기열 설정 (.env로 변경 가능)
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "1000"))
+# 대기열이 가득 찼을 때: "summarize"는 제목별 건수만 남겨 요약 임베드로 보내고, "drop"은 버림
+OVERFLOW_POLICY = os.getenv("LOG_QUEUE_POLICY", "summarize")
+POLICY_SUMMARIZE = "summarize"
+POLICY_DROP = "drop"
+
+
+class _ChannelQueue:
+    """채널 하나의 전송 대기열. 임베드 대신 제목별 건수만 남긴 요약분을 함께 가집니다."""
+
+    __slots__ = ("embeds", "overflow", "first_at", "last_at", "wakeup")
+
+    def __init__(self):
+        self.embeds = deque()       # (Embed, File 또는 None)
+        self.overflow = Counter()   # 제목 -> 건수 (요약으로만 보낼 로그)
+        self.first_at = None
+        self.last_at = None
+        self.wakeup = asyncio.Event()
+
+    def pending_files(self):
+        return sum(1 for _, file in self.embeds if file is not None)
+
+    def add_overflow(self, embed):
+        self.overflow[embed.title or "기타"] += 1
+        at = embed.timestamp or datetime.now()
+        at = at.replace(tzinfo=None)
+        self.first_at = at if self.first_at is None else min(self.first_at, at)
+        self.last_at = at if self.last_at is None else max(self.last_at, at)
+
+    def __len__(self):
+        return len(self.embeds) + sum(self.overflow.values())
+
+
+class LogDispatcher:
+    """
+    로그 채널 전송기. 이벤트 핸들러는 enqueue()로 크기가 제한된 공용 대기열에 넣기만 하고 바로 반환합니다.
+    수집 작업이 공용 대기열을 채널별 대기열로 나누고, 채널마다 전송 작업이 최대 10개씩 묶어 보냅니다.
+    로그가 몰려 채널 대기열이 길어지거나 공용 대기열이 가득 차면 넘치는 로그는 제목별 건수 요약으로 보냅니다.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, summarize_after=SUMMARIZE_AFTER,
+                 queue_size=QUEUE_SIZE, overflow_policy=OVERFLOW_POLICY):
+        if overflow_policy not in (POLICY_SUMMARIZE, POLICY_DROP):
+            logging.warning(f"알 수 없는 로그 대기열 정책 '{overflow_policy}', summarize 사용")
+            overflow_policy = POLICY_SUMMARIZE
+        self.flush_interval = flush_interval
+        self.summarize_after = summarize_after
+        self.overflow_policy = overflow_policy
+        self.bot = None
+        self.stats = Counter()      # enqueued, sent, dropped, summarized, messages, failed
+        self._intake = asyncio.Queue(maxsize=queue_size)
+        self._channels = {}         # 채널 ID -> _ChannelQueue
+        self._tasks = {}            # "collector" 또는 채널 ID -> Task
+
+    def start(self, bot):
+        """봇 이벤트 루프에서 수집 작업을 시작합니다. setup_hook에서 호출합니다."""
+        self.bot = bot
+        task = self._tasks.get("collector")
+        if task is None or task.done():
+            self._tasks["collector"] = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        """작업을 멈추고 남은 로그를 모두 보냅니다."""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._drain_intake()
+        for channel_id, queue in self._channels.items():
+            while len(queue):
+                await self._send(channel_id, self._take_batch(queue))
+        logging.info(f"로그 전송 종료 - {self.stats_text()}")
+
+    # ----- 생산 (이벤트 핸들러) -----
+
+    def enqueue(self, channel_id, embed, file=None):
+        """
+        로그 임베드를 공용 대기열에 넣습니다. 전송을 기다리지 않으며 대기열이 가득 차면 정책에 따라
+        요약분으로 넘기거나 버립니다. 첨부 파일(discord.File)이 있는 로그도 같은 정책을 따르며 첨부는 버립니다.
+        """
+        try:
+            self._intake.put_nowait((channel_id, embed, file))
+            self.stats["enqueued"] += 1
+        except asyncio.QueueFull:
+            if self.overflow_policy == POLICY_SUMMARIZE:
+                self._channel(channel_id).add_overflow(embed)
+                self.stats["summarized"] += 1
+            else:
+                self.stats["dropped"] += 1
+                if self.stats["dropped"] % 100 == 1:
+                    logging.warning(f"로그 대기열이 가득 차 로그를 버립니다 - {self.stats_text()}")
+
+    def pending(self, channel_id=None):
+        if channel_id is not None:
+            queue = self._channels.get(channel_id)
+            return len(queue) if queue else 0
+        return self._intake.qsize() + sum(len(queue) for queue in self._channels.values())
+
+    def stats_text(self):
+        return ", ".join(
+            f"{name}={self.stats[name]}"
+            for name in ("enqueued", "sent", "summarized", "dropped", "messages", "failed")
+        ) + f", pending={self.pending()}"
+
+    # ----- 수집/전송 작업 -----
+
+    def _channel(self, channel_id):
+        queue = self._channels.get(channel_id)
+        if queue is None:
+            queue = self._channels[channel_id] = _ChannelQueue()
+        if self.bot is not None:
+            task = self._tasks.get(channel_id)
+            if (task is None or task.done()) and "collector" in self._tasks:
+                self._tasks[channel_id] = asyncio.create_task(self._sender(channel_id, queue))
+        return queue
+
+    def _route(self, channel_id, embed, file=None):
+        queue = self._channel(channel_id)
+        if len(queue.embeds) >= self.summarize_after or (
+            file is not None and queue.pending_files() >= MAX_PENDING_FILES
+        ):
+            # 채널 대기열이 길면 임베드(와 첨부 파일)를 들고 있지 않고 건수만 남김
+            queue.add_overflow(embed)
+            self.stats["summarized"] += 1
+        else:
+            queue.embeds.append((embed, file))
+        if len(queue) >= MAX_EMBEDS_PER_MESSAGE:
+            queue.wakeup.set()
+
+    def _drain_intake(self):
+        while not self._intake.empty():
+            self._route(*self._intake.get_nowait())
+
+    async def _collect(self):
+        while True:
+            item = await self._intake.get()
+            try:
+                self._route(*item)
+                self._drain_intake()
+            except Exception as e:
+                logging.error(f"로그 분배 중 오류 발생: {e}", exc_info=True)
+
+    async def _sender(self, channel_id, queue):
+        while True:
+            try:
+                await asyncio.wait_for(queue.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            queue.wakeup.clear()
+            try:
+                if len(queue):
+                    await self._send(channel_id, self._take_batch(queue))
+                if len(queue) >= MAX_EMBEDS_PER_MESSAGE:
+                    queue.wakeup.set()
+            except Exception as e:
+                logging.error(f"로그 전송 중 오류 발생: {e}", exc_info=True)
+
+    def _take_batch(self, queue):
+        # 첨부 파일이 있는 로그는 혼자 보냄 (큰 파일 하나 때문에 함께 묶인 로그까지 전송에 실패하지 않도록)
+        if queue.embeds and queue.embeds[0][1] is not None:
+            return [queue.embeds.popleft()]
+
+        if queue.overflow:
+            # 요약분이 있으면 마지막 한 칸에 요약을 넣고 나머지 임베드도 요약으로 넘겨 한 번에 비움
+            # (첨부 파일이 있는 로그는 다음 메시지로 남김)
+            entries = []
+            total = 0
+            while queue.embeds and len(entries) < MAX_EMBEDS_PER_MESSAGE - 1:
+                if queue.embeds[0][1] is not None:
+                    break
+                size = len(queue.embeds[0][0])
+                if total + size > MAX_EMBED_CHARS - 1000:
+                    break
+                entries.append(queue.embeds.popleft())
+                total += size
+            kept = deque()
+            for embed, file in queue.embeds:
+                if file is not None:
+                    kept.append((embed, file))
+                else:
+                    queue.add_overflow(embed)
+                    self.stats["summarized"] += 1
+            queue.embeds = kept
+            summary = self._summary_embed(queue)
+            queue.overflow.clear()
+            queue.first_at = queue.last_at = None
+            return entries + [(summary, None)]
+
+        entries = []
+        total = 0
+        while queue.embeds and len(entries) < MAX_EMBEDS_PER_MESSAGE:
+            if queue.embeds[0][1] is not None:
+                break
+            size = len(queue.embeds[0][0])
+            if entries and total + size > MAX_EMBED_CHARS:
+                break
+            entries.append(queue.embeds.popleft())
+            total += size
+        return entries
+
+    @staticmethod
+    def _summary_embed(queue):
+        counts = queue.overflow
+        lines = [f"{title} × {count}" for title, count in counts.most_common(20)]
+        if len(counts) > 20:
+            lines.append(f"외 {len(counts) - 20}종")
+        embed = discord.Embed(
+            title=f"📦 로그 요약 ({sum(counts.values())}건)",
+            description="\n".join(lines),
+            color=discord.Color.dark_grey(),
+            timestamp=datetime.now()
+        )
+        if queue.first_at:
+            embed.set_footer(text=f"{queue.first_at:%H:%M:%S} ~ {queue.last_at:%H:%M:%S}")
+        return embed
+
+    async def _send(self, channel_id, entries):
+        if not entries or self.bot is None:
+            return
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            self.stats["dropped"] += len(entries)
+            return
+        embeds = [embed for embed, _ in entries]
+        files = [file for _, file in entries if file is not None]
+        try:
+            try:
+                await channel.send(embeds=embeds, files=files)
+            except discord.HTTPException as e:
+                if not files or e.status != 413:
+                    raise
+                # 첨부 파일이 너무 크면 임베드만이라도 보냄 (내용은 감사 로그 저장소에 남아 있음)
+                logging.warning(f"로그 첨부 파일이 너무 커 임베드만 전송합니다 ({channel_id}): {e}")
+                await channel.send(embeds=embeds)
+            self.stats["sent"] += len(embeds)
+            self.stats["messages"] += 1
+        except discord.HTTPException as e:
+            self.stats["failed"] += len(embeds)
+            logging.error(f"로그 채널({channel_id}) 전송 실패: {e}")
+
+
+log_dispatcher = LogDispatcher()
@@ -0,0 +1,204 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+CONFIG_FILE = "logging_config.json"
+
+# 설정 파일이 없거나 항목이 빠졌을 때 사용하는 기본값
+DEFAULT_CONFIG = {
+    "level": "INFO",                    # 모듈별 설정이 없을 때의 기본 레벨
+    "console_level": "WARNING",         # 콘솔(stderr)에 출력할 최소 레벨
+    "directory": "logs",
+    "max_bytes": 10 * 1024 * 1024,      # 파일 하나의 최대 크기
+    "backup_count": 5,
+    "max_message_chars": 4000,          # 기록 하나의 최대 길이 (넘으면 가운데를 생략)
+    "debug_rate_per_second": 20,        # 모듈별 DEBUG 기록 허용량 (초당)
+    "modules": {                        # 모듈/로거 이름 -> 레벨 (가장 긴 접두어 기준)
+        "discord": "WARNING",
+        "googleapiclient": "WARNING",
+    },
+}
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_listener = None
+
+
+def load_config(path=CONFIG_FILE):
+    config = dict(DEFAULT_CONFIG)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            modules = dict(DEFAULT_CONFIG["modules"])
+            modules.update(loaded.pop("modules", {}))
+            config.update(loaded)
+            config["modules"] = modules
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"로깅 설정 파일 읽기 오류, 기본값 사용: {e}")
+    return config
+
+
+def level_of(name):
+    return logging.getLevelName(str(name).upper()) if not isinstance(name, int) else name
+
+
+class ModuleLevelFilter(logging.Filter):
+    """
+    모듈별 레벨 적용과 DEBUG 기록 속도 제한.
+    이 프로젝트는 대부분 루트 로거(logging.info 등)를 쓰므로 루트 기록은 호출한 파일 경로로 모듈 이름을 정합니다.
+    """
+
+    def __init__(self, default_level, modules, debug_rate):
+        super().__init__()
+        self.default_level = default_level
+        # 긴 접두어부터 비교
+        self.modules = sorted(((name, level_of(level)) for name, level in modules.items()), key=lambda item: -len(item[0]))
+        self.debug_rate = debug_rate
+        self._module_names = {}     # 파일 경로 -> 모듈 이름
+        self._levels = {}           # 모듈 이름 -> 레벨
+        self._buckets = {}          # 모듈 이름 -> [남은 허용량, 마지막 갱신 시각, 생략한 수]
+
+    def module_name(self, record):
+        if record.name != "root":
+            return record.name
+        name = self._module_names.get(record.pathname)
+        if name is None:
+            relative = os.path.relpath(record.pathname, PROJECT_ROOT)
+            if relative.startswith(".."):
+                name = record.module
+            else:
+                name = os.path.splitext(relative)[0].replace(os.sep, ".")
+            self._module_names[record.pathname] = name
+        return name
+
+    def level_for(self, name):
+        level = self._levels.get(name)
+        if level is None:
+            level = self.default_level
+            for prefix, prefix_level in self.modules:
+                if name == prefix or name.startswith(prefix + "."):
+                    level = prefix_level
+                    break
+            self._levels[name] = level
+        return level
+
+    def filter(self, record):
+        name = self.module_name(record)
+        if record.levelno < self.level_for(name):
+            return False
+        if record.levelno > logging.DEBUG or self.debug_rate <= 0:
+            return True
+
+        # 토큰 버킷: 모듈마다 초당 debug_rate건까지만 남기고, 생략한 수는 다음 기록에 붙임
+        now = time.monotonic()
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = [float(self.debug_rate), now, 0]
+        bucket[0] = min(float(self.debug_rate), bucket[0] + (now - bucket[1]) * self.debug_rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1
+        if bucket[2]:
+            record.msg = f"{record.getMessage()} (이전 DEBUG 기록 {bucket[2]}건 생략)"
+            record.args = None
+            bucket[2] = 0
+        return True
+
+
+class TruncatingQueueHandler(QueueHandler):
+    """큐에 넣기 전에 메시지를 문자열로 만들고 너무 긴 기록은 앞뒤만 남깁니다."""
+
+    def __init__(self, log_queue, max_chars):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        msg = record.msg
+        if self.max_chars and len(msg) > self.max_chars:
+            # 예외 정보는 마지막 줄이 중요하므로 앞뒤를 남기고 가운데를 생략
+            half = self.max_chars // 2
+            record.msg = record.message = f"{msg[:half]} ...[{len(msg) - self.max_chars}자 생략]... {msg[-half:]}"
+        return record
+
+
+class LevelRangeFilter(logging.Filter):
+    def __init__(self, min_level, max_level=logging.CRITICAL):
+        super().__init__()
+        self.min_level = min_level
+        self.max_level = max_level
+
+    def filter(self, record):
+        return self.min_level <= record.levelno <= self.max_level
+
+
+def setup_logging(config_path=CONFIG_FILE):
+    """
+    루트 로거에 큐 핸들러 하나만 달고, 파일 쓰기는 별도 스레드(QueueListener)에서 합니다.
+    debug.log(DEBUG), app.log(INFO 이상), error.log(ERROR 이상)로 나눠 크기 기준으로 교체합니다.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    config = load_config(config_path)
+    os.makedirs(config["directory"], exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    def file_handler(filename, min_level, max_level=logging.CRITICAL):
+        handler = RotatingFileHandler(
+            os.path.join(config["directory"], filename),
+            maxBytes=int(config["max_bytes"]),
+            backupCount=int(config["backup_count"]),
+            encoding="utf-8",
+        )
+        handler.setFormatter(formatter)
+        handler.addFilter(LevelRangeFilter(min_level, max_level))
+        return handler
+
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+    console.setLevel(level_of(config["console_level"]))
+
+    handlers = [
+        file_handler("debug.log", logging.DEBUG, logging.DEBUG),
+        file_handler("app.log", logging.INFO),
+        file_handler("error.log", logging.ERROR),
+        console,
+    ]
+
+    default_level = level_of(config["level"])
+    module_levels = {name: level_of(level) for name, level in config["modules"].items()}
+    log_queue = queue.SimpleQueue()
+    queue_handler = TruncatingQueueHandler(log_queue, int(config["max_message_chars"]))
+    queue_handler.addFilter(ModuleLevelFilter(default_level, module_levels, float(config["debug_rate_per_second"])))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    # 루트 레벨은 설정된 레벨 중 가장 낮은 값. 그보다 낮은 기록은 만들어지지도 않음
+    root.setLevel(min([default_level] + list(module_levels.values())))
+    for name, level in module_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """큐에 남은 기록을 모두 쓰고 기록 스레드를 멈춥니다."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,6 +1,14 @@
+import asyncio
+import io
+
 import discord
+import pytz
 from datetime import datetime
 
+from log.audit_store import audit_store, embed_text
+from log.dispatcher import log_dispatcher
+from log.message_cache import message_cache
+
 DISCORD_CHANNELS = {
     "server": 1321426551052570644,  # 서버 입퇴장 로그 채널 ID
     "voice": 1321426608224997377,  # 음성 채널 로그 채널 ID
@@ -8,124 +16,273 @@ DISCORD_CHANNELS = {
     "roles": 1321426652365852723  # 역할 업데이트 로그 채널 ID
 }
 
+seoul_tz = pytz.timezone("Asia/Seoul")
+
+ROLE_COALESCE_SECONDS = 3.0  # 한 멤버의 역할 변경을 모으는 시간 (초)
+
+
+def send_log(channel_key, embed, event_type, user_id=None, channel_id=None, extra="", file=None):
+    """로그 채널 전송 대기열에 넣고, 같은 내용을 검색용 감사 로그 저장소에도 기록합니다."""
+    log_dispatcher.enqueue(DISCORD_CHANNELS[channel_key], embed, file=file)
+    text = embed_text(embed)
+    audit_store.record(event_type, f"{text} | {extra}" if extra else text, user_id=user_id, channel_id=channel_id)
+
 class ServerLogger:
     @staticmethod
-    async def log_member_join(bot, member):
+    def log_member_join(bot, member):
         embed = discord.Embed(
             title="✅ 멤버 입장",
             description=f"{member.mention} 님이 서버에 입장했습니다!",
             color=discord.Color.green(),
             timestamp=datetime.now()
         )
-        log_channel = bot.get_channel(DISCORD_CHANNELS["server"])
-        if log_channel:
-            await log_channel.send(embed=embed)
+        send_log("server", embed, "member_join", user_id=member.id, extra=str(member))
 
     @staticmethod
-    async def log_member_leave(bot, member):
+    def log_member_leave(bot, member):
         embed = discord.Embed(
             title="❌ 멤버 퇴장",
             description=f"{member.mention} 님이 서버에서 퇴장했습니다.",
             color=discord.Color.red(),
             timestamp=datetime.now()
         )
-        log_channel = bot.get_channel(DISCORD_CHANNELS["server"])
-        if log_channel:
-            await log_channel.send(embed=embed)
+        send_log("server", embed, "member_leave", user_id=member.id, extra=str(member))
 
 class MessageLogger:
     @staticmethod
-    async def log_message_delete(bot, channel_id, message_content, author):
-        log_channel = bot.get_channel(DISCORD_CHANNELS["message"])
-        if log_channel:
-            target_channel = bot.get_channel(channel_id)
-            target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
-            embed = discord.Embed(
-                title="🗑️ 메시지 삭제",
-                color=discord.Color.red(),
-                timestamp=datetime.now()
-            )
-            embed.add_field(name="채널", value=target_channel_mention, inline=False)
-            embed.add_field(name="작성자", value=author.mention, inline=False)
-            embed.add_field(name="내용", value=message_content if message_content else "[내용 없음]", inline=False)
-            await log_channel.send(embed=embed)
+    def log_message_delete(bot, channel_id, message_content, author_id):
+        target_channel = bot.get_channel(channel_id)
+        target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
+        embed = discord.Embed(
+            title="🗑️ 메시지 삭제",
+            color=discord.Color.red(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="채널", value=target_channel_mention, inline=False)
+        embed.add_field(name="작성자", value=f"<@{author_id}>", inline=False)
+        embed.add_field(name="내용", value=message_content[:1024] if message_content else "[내용 없음]", inline=False)
+        send_log("message", embed, "message_delete", user_id=author_id, channel_id=channel_id)
 
     @staticmethod
-    async def log_message_edit(bot, channel_id, before_content, after_content, author):
-        log_channel = bot.get_channel(DISCORD_CHANNELS["message"])
-        if log_channel:
-            target_channel = bot.get_channel(channel_id)
-            target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
-            embed = discord.Embed(
-                title="✏️ 메시지 수정",
-                color=discord.Color.blue(),
-                timestamp=datetime.now()
-            )
-            embed.add_field(name="채널", value=target_channel_mention, inline=False)
-            embed.add_field(name="작성자", value=author.mention, inline=False)
-            embed.add_field(name="이전 내용", value=before_content if before_content else "[내용 없음]", inline=False)
-            embed.add_field(name="수정된 내용", value=after_content if after_content else "[내용 없음]", inline=False)
-            await log_channel.send(embed=embed)
+    def log_message_edit(bot, channel_id, before_content, after_content, author_id):
+        target_channel = bot.get_channel(channel_id)
+        target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
+        embed = discord.Embed(
+            title="✏️ 메시지 수정",
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="채널", value=target_channel_mention, inline=False)
+        embed.add_field(name="작성자", value=f"<@{author_id}>" if author_id is not None else "알 수 없음", inline=False)
+        embed.add_field(name="이전 내용", value=before_content[:1024] if before_content else "[내용 없음]", inline=False)
+        embed.add_field(name="수정된 내용", value=after_content[:1024] if after_content else "[내용 없음]", inline=False)
+        send_log("message", embed, "message_edit", user_id=author_id, channel_id=channel_id)
 
-class VoiceLogger:
     @staticmethod
-    async def log_voice_join(bot, member, channel_id):
-        log_channel = bot.get_channel(DISCORD_CHANNELS["voice"])
-        if log_channel:
-            target_channel = bot.get_channel(channel_id)
-            target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
-            embed = discord.Embed(
-                title="🔊 음성 채널 입장",
-                description=f"{member.mention} 님이 음성 채널 {target_channel_mention}에 입장했습니다.",
-                color=discord.Color.green(),
-                timestamp=datetime.now()
-            )
-            await log_channel.send(embed=embed)
+    def log_raw_message_delete(bot, payload):
+        """
+        단일 메시지 삭제 (on_raw_message_delete). discord.py 캐시에서 밀려난 메시지는 내용 캐시에서 찾습니다.
+        """
+        cached = message_cache.pop(payload.message_id)
+        message = payload.cached_message
+        if message is not None:
+            MessageLogger.log_message_delete(bot, message.channel.id, message.content, message.author.id)
+            return
+        if cached is not None:
+            MessageLogger.log_message_delete(bot, cached.channel_id, cached.content, cached.author_id)
+            return
+
+        target_channel = bot.get_channel(payload.channel_id)
+        target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
+        embed = discord.Embed(
+            title="🗑️ 메시지 삭제",
+            color=discord.Color.red(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="채널", value=target_channel_mention, inline=False)
+        embed.add_field(name="메시지 ID", value=str(payload.message_id), inline=False)
+        embed.add_field(name="내용", value="[캐시에 없는 메시지]", inline=False)
+        send_log("message", embed, "message_delete", channel_id=payload.channel_id)
 
     @staticmethod
-    async def log_voice_move(bot, member, before_channel_id, after_channel_id):
-        log_channel = bot.get_channel(DISCORD_CHANNELS["voice"])
-        if log_channel:
-            before_channel = bot.get_channel(before_channel_id)
-            after_channel = bot.get_channel(after_channel_id)
-            before_channel_mention = before_channel.mention if before_channel else "알 수 없는 채널"
-            after_channel_mention = after_channel.mention if after_channel else "알 수 없는 채널"
-            embed = discord.Embed(
-                title="🔄 음성 채널 이동",
-                color=discord.Color.blue(),
-                timestamp=datetime.now()
-            )
-            embed.add_field(name="대상", value=member.mention, inline=False)
-            embed.add_field(name="기존 채널", value=before_channel_mention, inline=False)
-            embed.add_field(name="이동 채널", value=after_channel_mention, inline=False)
-            await log_channel.send(embed=embed)
+    def log_raw_message_edit(bot, payload):
+        """
+        메시지 수정 (on_raw_message_edit). 수정 전 내용은 discord.py 캐시, 없으면 내용 캐시에서 찾습니다.
+        수정 전 내용을 모르는 메시지는 실제로 무엇이 바뀌었는지 알 수 없으므로 기록하지 않습니다.
+        """
+        after_content = payload.data.get("content")
+        if after_content is None or payload.data.get("edited_timestamp") is None:
+            return  # 링크 미리보기, 고정 등 사용자가 수정하지 않은 갱신
+        cached = message_cache.update(payload.message_id, after_content)
+        message = payload.cached_message
+        if message is not None:
+            before_content, author_id = message.content, message.author.id
+        elif cached is not None:
+            before_content, author_id = cached.content, cached.author_id
+        else:
+            return
+        if before_content != after_content:
+            MessageLogger.log_message_edit(bot, payload.channel_id, before_content, after_content, author_id)
 
     @staticmethod
-    async def log_voice_leave(bot, member, channel_id):
-        log_channel = bot.get_channel(DISCORD_CHANNELS["voice"])
-        if log_channel:
-            target_channel = bot.get_channel(channel_id)
-            target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
-            embed = discord.Embed(
-                title="🔇 음성 채널 퇴장",
-                description=f"{member.mention} 님이 음성 채널 {target_channel_mention}에서 퇴장했습니다.",
-                color=discord.Color.red(),
-                timestamp=datetime.now()
+    def log_bulk_message_delete(bot, payload):
+        """
+        일괄 삭제(purge)를 요약 임베드 하나와 삭제된 메시지 기록 파일 하나로 남깁니다 (on_raw_bulk_message_delete).
+        """
+        target_channel = bot.get_channel(payload.channel_id)
+        target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
+        cached = {message.id: message for message in payload.cached_messages}
+
+        lines = []
+        authors = {}
+        known = 0
+        for message_id in sorted(payload.message_ids):
+            message = cached.get(message_id)
+            compact = message_cache.pop(message_id)
+            if message is None:
+                if compact is None:
+                    lines.append(f"[{message_id}] [캐시에 없는 메시지]")
+                    continue
+                known += 1
+                authors[compact.author_id] = authors.get(compact.author_id, 0) + 1
+                lines.append(f"[{message_id}] ({compact.author_id}): {compact.content or '[내용 없음]'}")
+                continue
+            known += 1
+            created_at = message.created_at.astimezone(seoul_tz).strftime("%Y-%m-%d %H:%M:%S")
+            author = message.author
+            authors[author.id] = authors.get(author.id, 0) + 1
+            attachments = " ".join(attachment.url for attachment in message.attachments)
+            content = message.content + (f" {attachments}" if attachments else "")
+            lines.append(f"[{message_id}] {created_at} {author} ({author.id}): {content or '[내용 없음]'}")
+
+        embed = discord.Embed(
+            title="🧹 메시지 일괄 삭제",
+            color=discord.Color.dark_red(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="채널", value=target_channel_mention, inline=False)
+        embed.add_field(
+            name="삭제된 메시지",
+            value=f"{len(payload.message_ids)}개 (내용 확인 {known}개)",
+            inline=False
+        )
+        if authors:
+            top_authors = sorted(authors.items(), key=lambda item: -item[1])[:10]
+            embed.add_field(
+                name="작성자",
+                value="\n".join(f"<@{author_id}> × {count}" for author_id, count in top_authors),
+                inline=False
             )
-            await log_channel.send(embed=embed)
 
-class RoleLogger:
+        transcript_text = "\n".join(lines)
+        transcript = discord.File(
+            io.BytesIO(transcript_text.encode("utf-8")),
+            filename=f"purge_{payload.channel_id}_{datetime.now(seoul_tz):%Y%m%d_%H%M%S}.txt"
+        )
+        send_log(
+            "message", embed, "message_bulk_delete",
+            channel_id=payload.channel_id, extra=transcript_text, file=transcript
+        )
+
+class VoiceLogger:
+    @staticmethod
+    def log_voice_join(bot, member, channel_id):
+        target_channel = bot.get_channel(channel_id)
+        target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
+        embed = discord.Embed(
+            title="🔊 음성 채널 입장",
+            description=f"{member.mention} 님이 음성 채널 {target_channel_mention}에 입장했습니다.",
+            color=discord.Color.green(),
+            timestamp=datetime.now()
+        )
+        send_log("voice", embed, "voice_join", user_id=member.id, channel_id=channel_id, extra=str(member))
+
+    @staticmethod
+    def log_voice_move(bot, member, before_channel_id, after_channel_id):
+        before_channel = bot.get_channel(before_channel_id)
+        after_channel = bot.get_channel(after_channel_id)
+        before_channel_mention = before_channel.mention if before_channel else "알 수 없는 채널"
+        after_channel_mention = after_channel.mention if after_channel else "알 수 없는 채널"
+        embed = discord.Embed(
+            title="🔄 음성 채널 이동",
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="대상", value=member.mention, inline=False)
+        embed.add_field(name="기존 채널", value=before_channel_mention, inline=False)
+        embed.add_field(name="이동 채널", value=after_channel_mention, inline=False)
+        send_log("voice", embed, "voice_move", user_id=member.id, channel_id=after_channel_id, extra=str(member))
+
     @staticmethod
-    async def log_role_update(bot, member, role_name, action):
-        color = discord.Color.green() if action == "추가" else discord.Color.red()
-        emoji = "➕" if action == "추가" else "➖"
+    def log_voice_leave(bot, member, channel_id):
+        target_channel = bot.get_channel(channel_id)
+        target_channel_mention = target_channel.mention if target_channel else "알 수 없는 채널"
         embed = discord.Embed(
-            title=f"{emoji} 역할 업데이트",
-            color=color,
+            title="🔇 음성 채널 퇴장",
+            description=f"{member.mention} 님이 음성 채널 {target_channel_mention}에서 퇴장했습니다.",
+            color=discord.Color.red(),
             timestamp=datetime.now()
         )
+        send_log("voice", embed, "voice_leave", user_id=member.id, channel_id=channel_id, extra=str(member))
+
+class RoleLogger:
+    # 멤버 ID -> [멤버, 추가된 역할 ID, 제거된 역할 ID]. 짧은 시간 안의 변경을 한 임베드로 합침
+    _pending = {}
+
+    @staticmethod
+    def log_role_changes(bot, member, added_ids, removed_ids):
+        """
+        역할 변경을 멤버별로 모았다가 ROLE_COALESCE_SECONDS 뒤에 한 번에 기록합니다.
+        그 사이 추가 후 제거(또는 반대)된 역할은 서로 상쇄됩니다.
+        """
+        entry = RoleLogger._pending.get(member.id)
+        if entry is None:
+            entry = RoleLogger._pending[member.id] = [member, set(), set()]
+            asyncio.get_running_loop().call_later(ROLE_COALESCE_SECONDS, RoleLogger._flush, member.id)
+        entry[0] = member
+        added, removed = entry[1], entry[2]
+        for role_id in added_ids:
+            if role_id in removed:
+                removed.discard(role_id)
+            else:
+                added.add(role_id)
+        for role_id in removed_ids:
+            if role_id in added:
+                added.discard(role_id)
+            else:
+                removed.add(role_id)
+
+    @staticmethod
+    def _role_list(role_ids):
+        text = ", ".join(f"<@&{role_id}>" for role_id in sorted(role_ids))
+        if len(text) > 1024:
+            text = text[:1000].rsplit(",", 1)[0] + f" 외 (총 {len(role_ids)}개)"
+        return text
+
+    @staticmethod
+    def _flush(member_id):
+        entry = RoleLogger._pending.pop(member_id, None)
+        if entry is None:
+            return
+        member, added, removed = entry
+        if not added and not removed:
+            return
+
+        if added and removed:
+            title, color = "🔁 역할 업데이트", discord.Color.orange()
+        elif added:
+            title, color = "➕ 역할 업데이트", discord.Color.green()
+        else:
+            title, color = "➖ 역할 업데이트", discord.Color.red()
+        embed = discord.Embed(title=title, color=color, timestamp=datetime.now())
         embed.add_field(name="대상", value=member.mention, inline=False)
-        embed.add_field(name="역할", value=role_name, inline=False)
-        log_channel = bot.get_channel(DISCORD_CHANNELS["roles"])
-        if log_channel:
-            await log_channel.send(embed=embed)
\ No newline at end of file
+        if added:
+            embed.add_field(name="추가된 역할", value=RoleLogger._role_list(added), inline=False)
+        if removed:
+            embed.add_field(name="제거된 역할", value=RoleLogger._role_list(removed), inline=False)
+        # 검색용으로 역할 이름도 함께 기록
+        guild = getattr(member, "guild", None)
+        role_names = [
+            role.name for role in (guild.get_role(role_id) for role_id in added | removed) if role
+        ] if guild else []
+        send_log("roles", embed, "role_update", user_id=member.id, extra=" ".join([str(member)] + role_names))
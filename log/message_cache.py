@@ -0,0 +1,74 @@
+import os
+from collections import OrderedDict
+from typing import NamedTuple
+
+# 메시지 삭제/수정 로그용 내용 캐시의 최대 크기 (.env로 변경 가능)
+CACHE_BYTES = int(os.getenv("LOG_MESSAGE_CACHE_BYTES", str(8 * 1024 * 1024)))
+# 항목 하나당 내용 외에 드는 대략적인 메모리 (키, 튜플, 정수 객체, OrderedDict 노드)
+ENTRY_OVERHEAD = 200
+
+
+class CachedMessage(NamedTuple):
+    channel_id: int
+    author_id: int
+    content: str
+
+
+class MessageCache:
+    """
+    메시지 ID -> (채널 ID, 작성자 ID, 내용)만 저장하는 LRU 캐시.
+    discord.py 메시지 캐시처럼 Message 객체 전체를 들고 있지 않으므로 같은 메모리로 훨씬 많은 메시지를 기억하며,
+    내용 바이트 합계가 예산을 넘으면 가장 오래 쓰이지 않은 메시지부터 지웁니다.
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # 메시지 ID -> (CachedMessage, 크기)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _entry_size(content):
+        return len(content.encode("utf-8")) + ENTRY_OVERHEAD
+
+    def put(self, message_id, channel_id, author_id, content):
+        self.pop(message_id)
+        size = self._entry_size(content)
+        if size > self.max_bytes:
+            return
+        self._entries[message_id] = (CachedMessage(channel_id, author_id, content), size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+
+    def add(self, message):
+        """on_message에서 받은 discord.Message를 저장합니다."""
+        self.put(message.id, message.channel.id, message.author.id, message.content)
+
+    def get(self, message_id):
+        """캐시된 메시지 (없으면 None). 조회한 메시지는 최근 사용으로 옮깁니다."""
+        entry = self._entries.get(message_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(message_id)
+        return entry[0]
+
+    def update(self, message_id, content):
+        """수정된 내용으로 바꾸고 이전 항목을 반환합니다."""
+        before = self.get(message_id)
+        if before is not None:
+            self.put(message_id, before.channel_id, before.author_id, content)
+        return before
+
+    def pop(self, message_id):
+        entry = self._entries.pop(message_id, None)
+        if entry is None:
+            return None
+        self.size -= entry[1]
+        return entry[0]
+
+
+message_cache = MessageCache()
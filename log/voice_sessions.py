@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytz
+
+SESSION_FILE = "voice_sessions.bin"
+RETENTION_DAYS = 90         # 메모리에 일별 합계와 파일에 세션을 유지하는 기간
+DAY_SECONDS = 86400
+
+seoul_tz = pytz.timezone("Asia/Seoul")
+
+
+def day_of(timestamp):
+    """유닉스 시각 -> 서울 기준 날짜 (date)"""
+    return datetime.fromtimestamp(timestamp, seoul_tz).date()
+
+
+def day_start(day):
+    """서울 기준 날짜의 0시 유닉스 시각"""
+    return int(seoul_tz.localize(datetime(day.year, day.month, day.day)).timestamp())
+
+
+def split_by_day(sessions):
+    """
+    세션 배열((사용자 ID, 시작, 끝) N행)을 서울 기준 날짜 경계에서 나눠 (날짜 번호, 사용자 ID)별로 합칩니다.
+    서울은 일광 절약 시간이 없으므로 고정 오프셋으로 날짜를 계산합니다. 날짜 번호는 1970-01-01부터의 일수.
+    :return: (날짜 번호 배열, 사용자 ID 배열, 초 배열)
+    """
+    empty = np.empty(0, dtype=np.int64)
+    sessions = sessions[sessions[:, 2] > sessions[:, 1]]
+    if not len(sessions):
+        return empty, empty, empty
+    offset = int(datetime.now(seoul_tz).utcoffset().total_seconds())
+    users, starts, ends = sessions[:, 0], sessions[:, 1], sessions[:, 2]
+    first_days = (starts + offset) // DAY_SECONDS
+    spans = (ends - 1 + offset) // DAY_SECONDS - first_days + 1
+
+    # 세션 하나를 걸친 날짜 수만큼 펼침
+    index = np.repeat(np.arange(len(sessions)), spans)
+    days = first_days[index] + np.arange(len(index)) - np.repeat(np.cumsum(spans) - spans, spans)
+    piece_starts = np.maximum(starts[index], days * DAY_SECONDS - offset)
+    piece_ends = np.minimum(ends[index], (days + 1) * DAY_SECONDS - offset)
+    seconds = piece_ends - piece_starts
+
+    # (날짜, 사용자)로 정렬해 같은 묶음끼리 합계
+    order = np.lexsort((users[index], days))
+    days, piece_users, seconds = days[order], users[index][order], seconds[order]
+    heads = np.flatnonzero(np.r_[True, (days[1:] != days[:-1]) | (piece_users[1:] != piece_users[:-1])])
+    return days[heads], piece_users[heads], np.add.reduceat(seconds, heads)
+
+
+class VoiceSessionTracker:
+    """
+    음성 채널 체류 시간 집계.
+    진행 중인 세션은 사용자 ID -> 입장 시각 dict에 두고, 끝난 세션은 (사용자 ID, 시작, 끝) int64 세 개로
+    바이너리 파일에 이어 붙입니다. 순위는 날짜별 사용자 합계(Counter)로 미리 모아 두고 그 합만 계산합니다.
+    보관 기간이 지난 합계와 세션은 날짜가 바뀐 뒤 처음 기록/조회할 때 정리합니다.
+    """
+
+    def __init__(self, path=SESSION_FILE, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._open = {}     # 사용자 ID -> 입장 시각
+        self._daily = {}    # 날짜 -> Counter(사용자 ID -> 초)
+        self._pruned_on = None
+        self._file_lock = threading.Lock()  # 세션 추가와 파일 정리(바꿔치기)가 겹치지 않도록
+        self._compact_task = None
+        self.load()
+
+    def _cutoff_day(self):
+        return datetime.now(seoul_tz).date() - timedelta(days=self.retention_days)
+
+    def _read(self, size=None):
+        data = np.fromfile(self.path, dtype=np.int64, count=-1 if size is None else size // 8)
+        usable = len(data) - len(data) % 3
+        return data[:usable].reshape(-1, 3), usable != len(data)
+
+    def load(self):
+        self._daily.clear()
+        if not os.path.exists(self.path):
+            return
+        sessions, partial = self._read()
+        if partial:
+            logging.warning(f"음성 세션 파일 끝의 불완전한 기록을 무시합니다: {self.path}")
+
+        # 보관 기간 안에 끝난 세션만 일별 합계에 반영
+        cutoff = day_start(self._cutoff_day())
+        sessions = sessions[sessions[:, 2] >= cutoff]
+        sessions[:, 1] = np.maximum(sessions[:, 1], cutoff)
+        epoch = date(1970, 1, 1).toordinal()
+        for day, user_id, seconds in zip(*(column.tolist() for column in split_by_day(sessions))):
+            self._daily.setdefault(date.fromordinal(epoch + day), Counter())[user_id] = seconds
+        logging.info(f"음성 세션 {len(sessions)}건 집계 완료")
+        self._prune()
+
+    def compact(self):
+        """
+        보관 기간 전에 끝난 세션을 파일에서 지웁니다. 임시 파일에 쓴 뒤 바꿔치기합니다.
+        스레드에서 실행해도 되며, 읽는 동안 추가된 세션은 바꿔치기 직전에 임시 파일 끝에 옮겨 붙입니다.
+        """
+        with self._file_lock:
+            if not os.path.exists(self.path):
+                return 0
+            size = os.path.getsize(self.path)
+        sessions, _ = self._read(size)
+        keep = sessions[:, 2] >= day_start(self._cutoff_day())
+        removed = len(sessions) - int(keep.sum())
+        if not removed and size % 24 == 0:
+            return 0
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            sessions[keep].tofile(f)
+        with self._file_lock:
+            with open(self.path, "rb") as source, open(temp_path, "ab") as f:
+                source.seek(size)
+                f.write(source.read())
+            os.replace(temp_path, self.path)
+        logging.info(f"보관 기간이 지난 음성 세션 {removed}건을 파일에서 정리했습니다")
+        return removed
+
+    def _accumulate(self, user_id, start, end):
+        """세션을 날짜 경계에서 나눠 일별 합계에 더합니다."""
+        while start < end:
+            day = day_of(start)
+            boundary = min(end, day_start(day + timedelta(days=1)))
+            self._daily.setdefault(day, Counter())[user_id] += boundary - start
+            start = boundary
+
+    def _prune(self):
+        """보관 기간이 지난 일별 합계와 파일의 세션을 지웁니다. 하루에 한 번만 실제로 정리합니다."""
+        today = datetime.now(seoul_tz).date()
+        if self._pruned_on == today:
+            return
+        self._pruned_on = today
+        cutoff = self._cutoff_day()
+        for day in [day for day in self._daily if day < cutoff]:
+            del self._daily[day]
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._compact_safely()  # 시작 시(이벤트 루프 밖)에는 바로 정리
+            return
+        # 음성 이벤트 처리 중에 파일 전체를 다시 쓰지 않도록 스레드에서 정리
+        if self._compact_task is None or self._compact_task.done():
+            self._compact_task = loop.create_task(asyncio.to_thread(self._compact_safely))
+
+    def _compact_safely(self):
+        try:
+            self.compact()
+        except OSError as e:
+            logging.error(f"음성 세션 파일 정리 중 오류 발생: {e}", exc_info=True)
+
+    # ----- 이벤트 -----
+
+    def open(self, user_id, at=None):
+        self._open.setdefault(user_id, int(at if at is not None else time.time()))
+
+    def close(self, user_id, at=None):
+        start = self._open.pop(user_id, None)
+        if start is None:
+            return
+        end = int(at if at is not None else time.time())
+        if end <= start:
+            return
+        with self._file_lock, open(self.path, "ab") as f:
+            array("q", (user_id, start, end)).tofile(f)
+        self._accumulate(user_id, start, end)
+        self._prune()
+
+    def update(self, member, before_channel, after_channel):
+        """on_voice_state_update에서 호출. 채널 이동은 같은 세션으로 이어집니다."""
+        if member.bot:
+            return
+        if after_channel is not None and before_channel is None:
+            self.open(member.id)
+        elif after_channel is None and before_channel is not None:
+            self.close(member.id)
+
+    def seed(self, guild):
+        """
+        봇 시작/재연결 시 현재 음성 채널 상태에 맞춥니다.
+        이미 들어와 있는 멤버는 지금부터 세션을 열고, 그 사이 나간 멤버의 세션은 닫습니다.
+        """
+        in_voice = {
+            member.id
+            for channel in guild.voice_channels + guild.stage_channels
+            for member in channel.members
+            if not member.bot
+        }
+        for user_id in list(self._open):
+            if user_id not in in_voice:
+                self.close(user_id)
+        for user_id in in_voice:
+            self.open(user_id)
+        self._prune()
+
+    def close_all(self):
+        """봇 종료 시 진행 중인 세션을 모두 기록합니다."""
+        now = int(time.time())
+        for user_id in list(self._open):
+            self.close(user_id, now)
+
+    # ----- 조회 -----
+
+    def totals(self, days):
+        """
+        최근 days일(오늘 포함) 사용자별 합계. 진행 중인 세션도 지금까지의 시간을 포함합니다.
+        :return: Counter(사용자 ID -> 초)
+        """
+        self._prune()
+        today = datetime.now(seoul_tz).date()
+        first_day = today - timedelta(days=days - 1)
+        totals = Counter()
+        for offset in range(days):
+            daily = self._daily.get(first_day + timedelta(days=offset))
+            if daily:
+                totals.update(daily)
+
+        now = int(time.time())
+        window_start = day_start(first_day)
+        for user_id, start in self._open.items():
+            totals[user_id] += now - max(start, window_start)
+        return totals
+
+    def top(self, days, limit=10):
+        """:return: [(사용자 ID, 초)] 긴 순서"""
+        return heapq.nlargest(limit, self.totals(days).items(), key=lambda item: item[1])
+
+
+voice_sessions = VoiceSessionTracker()
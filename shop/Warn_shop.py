@@ -1,15 +1,42 @@
+import asyncio
+import csv
+import io
 import logging
 import discord
+import openpyxl
+from discord import app_commands
 from discord.ext import commands
 from event.GoogleSheetsManager import GoogleSheetsManager
-
-logging.basicConfig(level=logging.DEBUG, format="[%(asctime)s] [%(levelname)s] %(message)s")
+from event.interaction_guard import deadline_guard, interaction_guard, respond
+from event.member_index import member_index
+from event.pagination import page_cache, first_page, setup_pagination
+from shop.catalog import catalog_service, CatalogPages, WARN_CATALOG
+from shop.penalty_store import penalty_store, SHEET_ISSUER
 
 SERVICE_ACCOUNT_FILE = 'resources/service_account.json'
 SPREADSHEET_ID = '1AYSWQwLOA-EvMJzJ7ros27OEzrTd2hERlI2WJX32RBE'
 
 sheets_manager = GoogleSheetsManager(SERVICE_ACCOUNT_FILE, SPREADSHEET_ID)
 
+BULK_FILE_EXTENSIONS = (".csv", ".xlsx")
+DIFF_PREVIEW_LINES = 15
+
+# 경고 기록 추가와 O열 쓰기를 직렬화 (적용 모달과 일괄 적용이 서로 덮어쓰지 않도록)
+penalty_lock = asyncio.Lock()
+
+# O열을 직접 수정한 관리자에게 보여주는 안내
+O_COLUMN_NOTICE = (
+    "※ MEMBER O열은 경고 기록에서 자동으로 만들어집니다. 시트에서 직접 수정하지 말고 "
+    "경고 상점 적용 또는 `/경고일괄적용`을 사용해 주세요."
+)
+
+# 상품 목록 페이지 (카탈로그 버전별로 한 번만 만들어 모든 메시지가 공유)
+page_cache.register(CatalogPages(
+    WARN_CATALOG,
+    "상품 목록",
+    lambda product: f"상품 이름: {product.name}\n가격: {product.price}"
+))
+
 def clean_value(value):
     """문자열에서 특수문자를 제거하고 공백을 정리합니다."""
     if isinstance(value, str):
@@ -18,27 +45,137 @@ def clean_value(value):
         return cleaned
     return str(value).strip()
 
-def merge_values(existing_value, new_value):
-    try:
-        # 값 정리
-        existing_value = clean_value(existing_value) if existing_value else "0"
-        new_value = clean_value(new_value)
-
-        # 숫자인 경우 합산
-        if existing_value.replace(".", "").lstrip("-").isdigit() and new_value.replace(".", "").lstrip("-").isdigit():
-            total = float(existing_value) + float(new_value)
-            return str(int(total)) if total.is_integer() else str(total)
-        
-        # 문자열인 경우 병합
-        existing_list = [clean_value(x) for x in existing_value.split(",") if clean_value(x)]
-        if new_value not in existing_list:
-            existing_list.append(new_value)
-
-        # 리스트 병합 후 중복 제거
-        return ", ".join(sorted(set(existing_list)))
-    except Exception as e:
-        logging.error(f"값 병합 중 오류 발생: {str(e)}")
-        return new_value
+def parse_penalty_file(filename, data):
+    """
+    CSV/XLSX 파일 내용을 (줄 번호, 닉네임, 상품 번호) 목록으로 변환합니다.
+    앞의 두 열만 사용하며, 상품 번호가 숫자가 아닌 줄(머리글 등)은 건너뜁니다.
+    """
+    if filename.lower().endswith(".xlsx"):
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        workbook.close()
+    else:
+        for encoding in ("utf-8-sig", "cp949"):
+            try:
+                text = data.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError("파일 인코딩을 읽을 수 없습니다. (UTF-8 또는 CP949)")
+        rows = list(csv.reader(io.StringIO(text)))
+
+    entries = []
+    for line_no, row in enumerate(rows, start=1):
+        if not row or len(row) < 2 or row[0] is None or row[1] is None:
+            continue
+        product_number = row[1]
+        if isinstance(product_number, float) and product_number.is_integer():
+            product_number = int(product_number)  # 엑셀 숫자 셀 (3.0 -> "3")
+        nickname, product_number = clean_value(row[0]), clean_value(product_number)
+        if nickname and product_number.isdigit():
+            entries.append((line_no, nickname, product_number))
+    return entries
+
+
+async def ensure_penalties_imported():
+    """
+    저장소 도입 전의 O열 값을 한 번만 경고 기록으로 가져옵니다. (penalty_lock 안에서 호출)
+    닉네임#태그 멤버로 확인할 수 없는 행의 값도 버리지 않고 미해석 기록으로 보관합니다.
+    :return: 가져온 기록 수 (이미 가져왔으면 0)
+    """
+    if penalty_store.legacy_imported:
+        return 0
+    await member_index.ensure_loaded()
+    rows = await asyncio.to_thread(sheets_manager.get_values, sheet_name="MEMBER", range_notation="D2:O")
+    values_by_member = {}
+    unparsed = []
+    for row_number, row in enumerate(rows or [], start=2):
+        value = row[11].strip() if len(row) > 11 else ""
+        if not value:
+            continue
+        nickname = row[0].strip() if row else ""
+        record = member_index.find_row(row_number)
+        if record is not None and record.nickname == nickname:
+            values_by_member[record.nickname] = value
+        else:
+            unparsed.append((nickname or f"MEMBER {row_number}행", value))
+    return await asyncio.to_thread(penalty_store.import_legacy, values_by_member, unparsed)
+
+
+async def preserve_manual_edits(members, save=True):
+    """
+    O열이 저장소에서 만든 값과 다르게 직접 수정된 멤버를 찾아 그 값을 미해석 기록으로 보관합니다.
+    O열은 저장소 값으로 덮어쓰므로 보관하지 않으면 직접 수정한 값이 사라집니다. (penalty_lock 안에서 호출)
+    :param members: 행 번호 -> 닉네임#태그
+    :param save: False면 찾기만 하고 기록하지 않음 (미리보기)
+    :return: [(닉네임#태그, 시트 값)]
+    """
+    if not members:
+        return []
+    if len(members) == 1:
+        (row, _), = members.items()
+        values = await asyncio.to_thread(sheets_manager.get_values, sheet_name="MEMBER", range_notation=f"O{row}:O{row}")
+        cells = {row: values[0][0] if values and values[0] else ""}
+    else:
+        values = await asyncio.to_thread(sheets_manager.get_values, sheet_name="MEMBER", range_notation="O:O")
+        cells = {
+            row: values[row - 1][0] if row <= len(values) and values[row - 1] else ""
+            for row in members
+        }
+
+    edits = [
+        (nickname, cells[row]) for row, nickname in members.items()
+        if penalty_store.is_manual_edit(nickname, cells[row])
+    ]
+    if edits:
+        logging.warning(f"직접 수정된 O열 값 {len(edits)}건 발견: {edits}")
+        if save:
+            await asyncio.to_thread(
+                penalty_store.add, [penalty_store.make_unparsed(nickname, value, SHEET_ISSUER) for nickname, value in edits]
+            )
+    return edits
+
+
+def plan_penalties(entries, issuer):
+    """
+    메모리의 멤버 인덱스/카탈로그로 모든 줄을 확인하고 적용할 기록을 멤버별로 모읍니다.
+    :return: (행 번호 -> [닉네임, 기존 O열 값, 새 O열 값], 추가할 기록 목록, 오류 메시지 목록)
+    """
+    pending = {}  # 행 번호 -> (닉네임, [기록])
+    errors = []
+    for line_no, nickname, product_number in entries:
+        member = member_index.find(nickname)
+        if not member:
+            errors.append(
+                f"{line_no}행: 닉네임 `{nickname}`을(를) 찾을 수 없습니다." + member_index.suggestion_text(nickname)
+            )
+            continue
+        product = catalog_service.find(WARN_CATALOG, product_number)
+        if not product:
+            errors.append(f"{line_no}행: 상품 번호 `{product_number}`을(를) 찾을 수 없습니다.")
+            continue
+        pending.setdefault(member.row, (member.nickname, []))[1].append(
+            penalty_store.make_record(member.nickname, product, issuer)
+        )
+
+    changes = {
+        row: [nickname, penalty_store.render(nickname), penalty_store.render(nickname, extra=records)]
+        for row, (nickname, records) in pending.items()
+    }
+    records = [record for _, records in pending.values() for record in records]
+    return changes, records, errors
+
+
+def format_penalty_diff(changes, errors):
+    """미리보기/결과 메시지용 변경 내역 줄 목록"""
+    lines = [
+        f"{nickname}: {existing_value or '없음'} -> {new_value}"
+        for nickname, existing_value, new_value in changes.values()
+        if new_value != existing_value
+    ]
+    return lines + [f"[오류] {error}" for error in errors]
+
 
 class ApplyModal(discord.ui.Modal, title="상품 적용"):
     def __init__(self):
@@ -56,6 +193,7 @@ class ApplyModal(discord.ui.Modal, title="상품 적용"):
         self.add_item(self.nickname)
         self.add_item(self.product_number)
 
+    @deadline_guard
     async def on_submit(self, interaction: discord.Interaction):
         try:
             # 입력된 값 정리
@@ -64,119 +202,88 @@ class ApplyModal(discord.ui.Modal, title="상품 적용"):
             logging.debug(f"입력된 닉네임: {self.nickname.value}, 정리된 닉네임: {nickname}")
             logging.debug(f"입력된 상품 번호: {self.product_number.value}, 정리된 상품 번호: {product_number}")
 
-            # 멤버 데이터 가져오기
-            member_data = sheets_manager.get_values(sheet_name="MEMBER", range_notation="D2:O1000")
-            logging.debug(f"멤버 데이터 가져옴: {member_data[:5]}")  # 데이터가 많으면 일부만 출력
-
-            # 상점 데이터 가져오기
-            shop_data = sheets_manager.get_values(sheet_name="상점", range_notation="F2:H100")
-            logging.debug(f"상점 데이터 가져옴: {shop_data[:5]}")  # 데이터가 많으면 일부만 출력
-
-            # 상품 번호로 상점에서 값 찾기
-            product_row = None
-            for row in shop_data:
-                if len(row) >= 3 and clean_value(row[0]) == product_number:
-                    product_row = row
-                    break
-
-            if not product_row:
-                await interaction.response.send_message(
+            # 현재 버전의 경고 상점 카탈로그에서 상품 찾기 (메모리 조회)
+            await catalog_service.ensure_loaded()
+            product = catalog_service.find(WARN_CATALOG, product_number)
+            if not product:
+                await respond(
+                    interaction,
                     f"상품 번호 {product_number}을(를) 상점에서 찾을 수 없습니다.",
                     ephemeral=True
                 )
                 return
 
-            product_value = clean_value(product_row[2])
-            logging.debug(f"상품 번호 {product_number}에 해당하는 값: {product_value}")
-
-            # 멤버 데이터에서 닉네임 찾기
-            member_found = False
-            for idx, row in enumerate(member_data):
-                if len(row) >= 1 and clean_value(row[0]) == nickname:
-                    member_found = True
-                    update_row = idx + 2
-
-                    # 기존 값 가져오기 (열 O는 인덱스 11)
-                    existing_value = row[11] if len(row) >= 12 else None
-                    logging.debug(f"기존 값: {existing_value}")
-
-                    # 값 병합
-                    new_value = merge_values(existing_value, product_value)
-                    logging.debug(f"병합된 새 값: {new_value}")
-
-                    # 숫자로 저장되도록 처리
-                    final_value = (
-                        float(new_value) if new_value.replace(".", "").lstrip("-").isdigit() 
-                        else new_value
-                    )
-                    logging.debug(f"최종 업데이트 값: {final_value}")
-
-                    # 업데이트 실행
-                    sheets_manager.update_cell(
-                        sheet_name="MEMBER",
-                        start_column="O",
-                        start_row=update_row,
-                        values=[[final_value]],
-                        value_input_option="USER_ENTERED"
-                    )
-                    logging.debug(f"데이터 업데이트 완료: {update_row}행, 값: {final_value}")
-
-                    await interaction.response.send_message(
-                        f"{nickname}님의 데이터가 업데이트되었습니다.\n"
-                        f"기존 값: {existing_value if existing_value else '없음'}\n"
-                        f"추가된 값: {product_value}\n"
-                        f"최종 값: {final_value}",
-                        ephemeral=True
-                    )
-                    break
-
-            if not member_found:
-                await interaction.response.send_message(
-                    f"닉네임 {nickname}을(를) 찾을 수 없습니다.",
+            logging.debug(f"상품 번호 {product_number}에 해당하는 값: {product.price}")
+
+            # 멤버 인덱스에서 닉네임 찾기 (태그가 있으면 닉네임#태그 완전 일치만)
+            member = member_index.find(nickname)
+            if not member:
+                # 응답 전이므로 시트를 다시 읽지 않고 이미 로드된 인덱스로만 추천
+                await respond(
+                    interaction,
+                    f"닉네임 {nickname}을(를) 찾을 수 없습니다." + member_index.suggestion_text(nickname),
                     ephemeral=True
                 )
+                return
+
+            await interaction_guard.defer(interaction, ephemeral=True)
+
+            async with penalty_lock:
+                imported = await ensure_penalties_imported()
+                edits = await preserve_manual_edits({member.row: member.nickname})
+                existing_value = penalty_store.render(member.nickname)
+
+                # 기록을 저장한 뒤 O열은 저장소에서 다시 만든 값으로 덮어씀
+                record = penalty_store.make_record(member.nickname, product, interaction.user)
+                await asyncio.to_thread(penalty_store.add, [record])
+                final_value = penalty_store.render(member.nickname)
+
+                await asyncio.to_thread(
+                    sheets_manager.update_cell,
+                    sheet_name="MEMBER",
+                    start_column="O",
+                    start_row=member.row,
+                    values=[[final_value]],
+                    value_input_option="USER_ENTERED"
+                )
+                await asyncio.to_thread(penalty_store.mark_written, {member.nickname: final_value})
+                logging.debug(f"데이터 업데이트 완료: {member.row}행, 값: {final_value}")
+
+            summary = penalty_store.summary(member.nickname)
+            message = (
+                f"{member.nickname}님의 데이터가 업데이트되었습니다.\n"
+                f"기존 값: {existing_value if existing_value else '없음'}\n"
+                f"추가된 값: {product.price}\n"
+                f"최종 값: {final_value} (누적 {summary.count}건)"
+            )
+            if edits:
+                message += f"\n시트에서 직접 수정된 값 `{edits[0][1]}`은(는) 미해석 기록으로 보관했습니다."
+            if edits or imported:
+                message += f"\n{O_COLUMN_NOTICE}"
+            await interaction.followup.send(message, ephemeral=True)
 
         except Exception as e:
             logging.error(f"적용 처리 중 오류 발생: {str(e)}", exc_info=True)
-            await interaction.response.send_message(
-                "데이터 적용 중 오류가 발생했습니다. 관리자에게 문의하세요.",
-                ephemeral=True
-            )
+            await respond(interaction, "데이터 적용 중 오류가 발생했습니다. 관리자에게 문의하세요.", ephemeral=True)
 
 
 
 class Warn_ShopView(discord.ui.View):
-    def __init__(self, shop_data):
+    def __init__(self):
         super().__init__(timeout=None)
-        self.shop_data = shop_data
-        self.page = 0
-        self.items_per_page = 5
-        self.max_pages = max((len(self.shop_data) - 1) // self.items_per_page + 1, 1)
 
-    async def generate_embed(self):
-        embed = discord.Embed(title="상품 목록", color=discord.Color.blue())
-
-        start_idx = self.page * self.items_per_page
-        end_idx = min(start_idx + self.items_per_page, len(self.shop_data))
-        page_items = self.shop_data[start_idx:end_idx]
-
-        if not page_items:
-            embed.description = "상품 정보가 없습니다."
-        else:
-            for row in page_items:
-                embed.add_field(
-                    name=f"상품 번호: {clean_value(row[0])}",
-                    value=f"상품 이름: {clean_value(row[1])}\n가격: {clean_value(row[2])}",
-                    inline=False
-                )
-
-        embed.set_footer(text=f"페이지 {self.page + 1}/{self.max_pages}")
-        return embed
+    @property
+    def shop_data(self):
+        """현재 버전의 경고 상점 상품 목록"""
+        return catalog_service.snapshot(WARN_CATALOG).products
 
     @discord.ui.button(label="상품 목록", style=discord.ButtonStyle.primary, custom_id="product_list_button")
+    @deadline_guard
     async def product_list_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        view = Warn_ShopPaginationView(self)
-        await interaction.response.send_message(embed=await self.generate_embed(), view=view, ephemeral=True)
+        # 페이지 상태는 버튼 custom_id에만 있으므로 사용자마다 따로 넘길 수 있음
+        await catalog_service.ensure_loaded()
+        embed, view = await first_page(WARN_CATALOG, interaction.guild)
+        await respond(interaction, embed=embed, view=view or discord.utils.MISSING, ephemeral=True)
 
     @discord.ui.button(label="적용", style=discord.ButtonStyle.secondary, custom_id="apply_button")
     async def apply_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -190,27 +297,6 @@ class Warn_ShopView(discord.ui.View):
                 ephemeral=True
             )
 
-class Warn_ShopPaginationView(discord.ui.View):
-    def __init__(self, shop_view: Warn_ShopView):
-        super().__init__(timeout=None)
-        self.shop_view = shop_view
-
-    @discord.ui.button(label="⬅️ 이전", style=discord.ButtonStyle.secondary, row=1)
-    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if self.shop_view.page > 0:
-            self.shop_view.page -= 1
-            await interaction.response.edit_message(embed=await self.shop_view.generate_embed(), view=self)
-        else:
-            await interaction.response.defer()
-
-    @discord.ui.button(label="➡️ 다음", style=discord.ButtonStyle.secondary, row=1)
-    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if self.shop_view.page < self.shop_view.max_pages - 1:
-            self.shop_view.page += 1
-            await interaction.response.edit_message(embed=await self.shop_view.generate_embed(), view=self)
-        else:
-            await interaction.response.defer()
-
 class Warn_ShopCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -218,17 +304,99 @@ class Warn_ShopCommands(commands.Cog):
     @commands.command(name="경고상점")
     async def warn_shop(self, ctx):
         try:
-            shop_data = sheets_manager.get_values(sheet_name="상점", range_notation="F2:H100")
-            if not shop_data:
+            await catalog_service.ensure_loaded()
+            if not catalog_service.snapshot(WARN_CATALOG):
                 await ctx.send("상품 정보가 없습니다.")
                 return
 
-            filtered_data = [row for row in shop_data if len(row) >= 3 and clean_value(row[0]).isdigit()]
-            view = Warn_ShopView(shop_data=filtered_data)
+            view = Warn_ShopView()
             await ctx.send("상품 목록을 확인하세요.", view=view)
         except Exception as e:
             logging.error(f"경고 상점 활성화 중 오류 발생: {str(e)}", exc_info=True)
             await ctx.send("경고 상점을 활성화하는 중 오류가 발생했습니다.")
 
+    @app_commands.command(name="경고일괄적용", description="CSV/XLSX 파일의 (닉네임, 상품 번호) 목록을 한 번에 적용합니다.")
+    @app_commands.describe(
+        파일="첫 열에 닉네임#태그, 둘째 열에 경고 상점 상품 번호가 있는 CSV 또는 XLSX 파일",
+        적용="False면 변경 내역만 미리 보여주고 시트에는 쓰지 않습니다."
+    )
+    async def bulk_apply(self, interaction: discord.Interaction, 파일: discord.Attachment, 적용: bool = False):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
+            return
+
+        try:
+            await interaction.response.defer(ephemeral=True)
+
+            if not 파일.filename.lower().endswith(BULK_FILE_EXTENSIONS):
+                await interaction.followup.send("CSV 또는 XLSX 파일만 사용할 수 있습니다.", ephemeral=True)
+                return
+
+            data = await 파일.read()
+            entries = await asyncio.to_thread(parse_penalty_file, 파일.filename, data)
+            if not entries:
+                await interaction.followup.send("적용할 (닉네임, 상품 번호) 줄이 없습니다.", ephemeral=True)
+                return
+
+            await member_index.ensure_loaded()
+            await catalog_service.ensure_loaded()
+
+            async with penalty_lock:
+                imported = await ensure_penalties_imported()
+                changes, records, errors = plan_penalties(entries, interaction.user)
+                # 직접 수정된 O열 값은 덮어쓰기 전에 보관 (미리보기에서는 찾기만 함)
+                edits = await preserve_manual_edits(
+                    {row: nickname for row, (nickname, _, _) in changes.items()}, save=적용
+                )
+                if edits and 적용:
+                    changes, records, errors = plan_penalties(entries, interaction.user)
+                updates = [
+                    (f"MEMBER!O{row}", [[new_value]])
+                    for row, (_, existing_value, new_value) in changes.items()
+                    if new_value != existing_value
+                ]
+                if 적용 and records:
+                    # 기록을 먼저 저장하고 O열은 저장소에서 만든 값으로 한 번에 기록
+                    await asyncio.to_thread(penalty_store.add, records)
+                    if updates:
+                        await asyncio.to_thread(sheets_manager.batch_update_values, updates, "USER_ENTERED")
+                        await asyncio.to_thread(penalty_store.mark_written, {
+                            nickname: new_value
+                            for nickname, existing_value, new_value in changes.values()
+                            if new_value != existing_value
+                        })
+
+            diff_lines = format_penalty_diff(changes, errors)
+            diff_lines += [f"[직접 수정] {nickname}: {value}" for nickname, value in edits]
+            mode = "적용 완료" if 적용 else "미리보기 (시트에 쓰지 않음)"
+            summary = (
+                f"**경고 일괄 적용 - {mode}**\n"
+                f"처리한 줄: {len(entries)} / 변경 멤버: {len(updates)} / 오류: {len(errors)}"
+            )
+            if edits:
+                summary += (
+                    f"\n시트에서 직접 수정된 O열 값 {len(edits)}건"
+                    + ("을 미해석 기록으로 보관했습니다." if 적용 else "은 적용 시 미해석 기록으로 보관됩니다.")
+                )
+            if edits or imported:
+                summary += f"\n{O_COLUMN_NOTICE}"
+            preview = "\n".join(diff_lines[:DIFF_PREVIEW_LINES])
+            if len(diff_lines) > DIFF_PREVIEW_LINES:
+                preview += f"\n... 외 {len(diff_lines) - DIFF_PREVIEW_LINES}줄 (첨부 파일 참고)"
+
+            file = discord.File(
+                io.BytesIO("\n".join(diff_lines).encode("utf-8")), filename="penalty_diff.txt"
+            ) if diff_lines else discord.utils.MISSING
+            await interaction.followup.send(
+                f"{summary}\n```\n{preview or '변경 없음'}\n```", file=file, ephemeral=True
+            )
+            logging.info(f"경고 일괄 적용 ({mode}) - 요청자: {interaction.user}, 변경: {len(updates)}, 오류: {len(errors)}")
+
+        except Exception as e:
+            logging.error(f"경고 일괄 적용 중 오류 발생: {e}", exc_info=True)
+            await interaction.followup.send("경고 일괄 적용 중 오류가 발생했습니다.", ephemeral=True)
+
 async def setup(bot: commands.Bot):
+    setup_pagination(bot)
+    catalog_service.start()
     await bot.add_cog(Warn_ShopCommands(bot))
\ No newline at end of file
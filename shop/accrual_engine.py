@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import AsyncExitStack
+from datetime import datetime
+
+import pytz
+
+from event.member_index import member_index
+from shop.balance_service import balance_service, parse_mileage
+from shop.mileage_ledger import mileage_ledger
+
+seoul_tz = pytz.timezone("Asia/Seoul")
+
+CONFIG_FILE = "mileage_accrual.json"
+
+# 설정 파일이 없거나 항목이 빠졌을 때 사용하는 기본값
+DEFAULT_CONFIG = {
+    "war_participation": 10,          # 내전 참가자 전원
+    "war_win": 10,                    # 승리팀 추가 지급
+    "attendance_milestones": {        # 출석 횟수 -> 지급 마일리지
+        "50": 30,
+        "100": 50,
+        "300": 100,
+    },
+}
+
+
+class AccrualEngine:
+    """
+    내전 정산/출석 달성 시 마일리지를 적립하는 클래스.
+    대상 멤버 전원의 잔액 락을 잡은 뒤 F열을 한 번 읽고, 한 번의 일괄 쓰기로 반영하며
+    지급 내역은 마일리지 원장(mileage_ledger)에 남깁니다.
+    """
+
+    def __init__(self, config_path=CONFIG_FILE, balances=balance_service, ledger=mileage_ledger):
+        self.config_path = config_path
+        self.balances = balances
+        self.ledger = ledger
+        self.config = dict(DEFAULT_CONFIG)
+        self.load_config()
+
+    def load_config(self):
+        """설정 파일을 다시 읽습니다. 없으면 기본값을 사용합니다."""
+        config = dict(DEFAULT_CONFIG)
+        if os.path.exists(self.config_path):
+            try:
+                with open(self.config_path, "r", encoding="utf-8") as f:
+                    config.update(json.load(f))
+            except (json.JSONDecodeError, OSError) as e:
+                logging.error(f"적립 설정 파일 읽기 오류, 기본값 사용: {e}")
+        config["attendance_milestones"] = {
+            int(count): int(amount) for count, amount in config["attendance_milestones"].items()
+        }
+        self.config = config
+
+    # ----- 지급 계산 -----
+
+    def war_grants(self, winners, losers):
+        """
+        :return: [(닉네임, 지급액, 사유)]
+        """
+        participation = int(self.config["war_participation"])
+        win_bonus = int(self.config["war_win"])
+        grants = [(nickname, participation + win_bonus, "내전 승리") for nickname in winners]
+        grants += [(nickname, participation, "내전 참가") for nickname in losers]
+        return [grant for grant in grants if grant[1] > 0]
+
+    def attendance_grant(self, count):
+        """출석 횟수가 마일리지 지급 구간이면 지급액, 아니면 0"""
+        return self.config["attendance_milestones"].get(int(count), 0)
+
+    # ----- 지급 -----
+
+    async def grant(self, key, grants):
+        """
+        여러 멤버에게 마일리지를 한 번에 지급합니다.
+        :param key: 지급 묶음 키 (예: "war:<정산 ID>"). 멤버별 거래 키는 "<key>:<닉네임#태그>"
+            행 번호는 멤버 추가/삭제로 바뀔 수 있으므로 키에 넣지 않습니다.
+        :param grants: [(닉네임, 지급액, 사유)]
+        :return: 지급된 원장 항목 목록
+        """
+        await member_index.ensure_loaded()
+
+        by_row = {}
+        for nickname, amount, reason in grants:
+            member = member_index.find(nickname)
+            if member is None:
+                logging.warning(f"마일리지 적립 대상 멤버를 찾을 수 없음: {nickname}")
+                continue
+            entry_key = f"{key}:{member.nickname}"
+            if self.ledger.seen(entry_key):
+                continue  # 이미 지급된 묶음 (재시도 등)
+            current = by_row.get(member.row)
+            by_row[member.row] = (member.nickname, (current[1] if current else 0) + amount, reason, entry_key)
+        if not by_row:
+            return []
+
+        async with AsyncExitStack() as stack:
+            # 구매와 같은 멤버별 락을 행 번호 순으로 잡아 교착을 피함
+            for row in sorted(by_row):
+                await stack.enter_async_context(self.balances.lock(row))
+
+            # 락을 기다리는 동안 같은 키로 먼저 지급된 경우를 다시 제외
+            by_row = {row: grant for row, grant in by_row.items() if not self.ledger.seen(grant[3])}
+            if not by_row:
+                return []
+
+            values = await asyncio.to_thread(
+                self.balances.sheets_manager.get_values, sheet_name="MEMBER", range_notation="F:F"
+            )
+            now = datetime.now(seoul_tz).strftime("%Y-%m-%d %H:%M:%S")
+            updates = []
+            entries = []
+            for row, (nickname, amount, reason, entry_key) in sorted(by_row.items()):
+                cell = values[row - 1] if row <= len(values) else []
+                balance = parse_mileage(cell[0]) if cell else 0
+                new_balance = balance + amount
+                updates.append((f"MEMBER!F{row}", [[str(new_balance)]]))
+                entries.append({
+                    "key": entry_key,
+                    "type": "accrual",
+                    "at": now,
+                    "user_id": "",
+                    "nickname": nickname,
+                    "row": row,
+                    "product_number": "",
+                    "product_name": reason,
+                    "amount": amount,
+                    "balance_before": balance,
+                    "balance_after": new_balance,
+                })
+
+            await asyncio.to_thread(self.balances.sheets_manager.batch_update_values, updates)
+            for entry in entries:
+                self.balances.set(entry["row"], entry["balance_after"])
+            try:
+                self.ledger.append_many(entries)
+            except Exception as e:
+                logging.error(f"적립 원장 기록 중 오류 발생: {e} / {entries}", exc_info=True)
+
+        logging.info(f"마일리지 적립 완료 - {key}: {len(entries)}명, 합계 {sum(e['amount'] for e in entries)}")
+        return entries
+
+    async def grant_war(self, key, winners, losers):
+        """내전 정산 시 참가/승리 마일리지 지급"""
+        return await self.grant(key, self.war_grants(winners, losers))
+
+    async def grant_attendance(self, nickname, user_id, count):
+        """출석 횟수가 지급 구간이면 마일리지 지급"""
+        amount = self.attendance_grant(count)
+        if amount <= 0:
+            return []
+        return await self.grant(f"attendance:{user_id}:{count}", [(nickname, amount, f"출석 {count}회 달성")])
+
+
+accrual_engine = AccrualEngine()
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+
+from event.GoogleSheetsManager import GoogleSheetsManager
+from event.member_bindings import member_bindings
+from event.member_index import member_index
+
+# Google Sheets 설정
+SERVICE_ACCOUNT_FILE = 'resources/service_account.json'
+SPREADSHEET_ID = '1AYSWQwLOA-EvMJzJ7ros27OEzrTd2hERlI2WJX32RBE'
+
+REFRESH_INTERVAL = 300  # 초
+
+
+def parse_mileage(value):
+    """시트 값을 정수 마일리지로 변환합니다. 비어 있거나 숫자가 아니면 0."""
+    try:
+        return int(float(str(value).replace(",", "").strip()))
+    except (TypeError, ValueError):
+        return 0
+
+
+class BalanceService:
+    """
+    MEMBER 시트 F열(마일리지)을 메모리에 보관하는 클래스.
+    사용자 -> MEMBER 행은 연결 테이블(member_bindings)로 찾고 잔액 조회는 메모리에서만 처리합니다.
+    구매/적립 시 갱신되며, 주기적으로 F열 전체를 한 번에 다시 읽습니다.
+    """
+
+    def __init__(self, sheets_manager=None):
+        self._sheets_manager = sheets_manager
+        self._balances = {}   # MEMBER 행 번호 -> 마일리지
+        self._locks = {}      # MEMBER 행 번호 -> asyncio.Lock (잔액 변경 직렬화)
+        self.loaded_at = None
+        self._refresh_task = None
+
+    @property
+    def sheets_manager(self):
+        if self._sheets_manager is None:
+            self._sheets_manager = GoogleSheetsManager(SERVICE_ACCOUNT_FILE, SPREADSHEET_ID)
+        return self._sheets_manager
+
+    # ----- 갱신 -----
+
+    def refresh(self):
+        """F열 전체를 읽어 잔액 표를 교체합니다. (블로킹)"""
+        values = self.sheets_manager.get_values(sheet_name="MEMBER", range_notation="F:F")
+        self._balances = {
+            row_idx: parse_mileage(row[0])
+            for row_idx, row in enumerate(values, start=1)
+            if row
+        }
+        self.loaded_at = time.time()
+        logging.info(f"마일리지 잔액 갱신 완료: {len(self._balances)}행")
+
+    async def refresh_async(self):
+        await asyncio.to_thread(self.refresh)
+
+    async def ensure_loaded(self):
+        if self.loaded_at is None:
+            await self.refresh_async()
+
+    def start(self, interval=REFRESH_INTERVAL):
+        """주기적 갱신 작업을 시작합니다. 여러 번 호출해도 한 번만 실행됩니다."""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop(interval))
+
+    async def _refresh_loop(self, interval):
+        while True:
+            try:
+                await self.refresh_async()
+            except Exception as e:
+                logging.error(f"마일리지 잔액 갱신 중 오류 발생: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    # ----- 조회/변경 -----
+
+    def row_for_user(self, user):
+        """
+        디스코드 사용자의 MEMBER 행 번호 (사용자 ID 연결 테이블 조회)
+        :return: 행 번호 또는 None
+        """
+        member = member_bindings.member_for(user)
+        return member.row if member else None
+
+    async def get_for_user(self, user):
+        """
+        :return: (행 번호, 마일리지) 또는 매칭되는 멤버가 없으면 (None, None)
+        """
+        await member_index.ensure_loaded()
+        await self.ensure_loaded()
+        row = self.row_for_user(user)
+        if row is None:
+            return None, None
+        return row, self._balances.get(row, 0)
+
+    def lock(self, row):
+        """
+        멤버별 잔액 변경 락. 같은 멤버의 구매/적립은 이 락 안에서 순서대로 처리하고,
+        다른 멤버끼리는 서로 기다리지 않습니다.
+        """
+        lock = self._locks.get(row)
+        if lock is None:
+            lock = self._locks[row] = asyncio.Lock()
+        return lock
+
+    def fetch(self, row):
+        """시트에서 한 멤버의 F열을 직접 읽어 캐시에 반영하고 반환합니다. (블로킹)"""
+        values = self.sheets_manager.get_values(sheet_name="MEMBER", range_notation=f"F{row}:F{row}")
+        balance = parse_mileage(values[0][0]) if values and values[0] else 0
+        self._balances[row] = balance
+        return balance
+
+    def write(self, row, balance):
+        """새 잔액을 시트 F열에 기록하고 캐시에 반영합니다. (블로킹)"""
+        self.sheets_manager.update_cell(
+            sheet_name="MEMBER",
+            start_column="F",
+            start_row=row,
+            values=[[str(int(balance))]]
+        )
+        self._balances[row] = int(balance)
+
+    def get(self, row):
+        return self._balances.get(row, 0)
+
+    def set(self, row, balance):
+        """시트에 기록한 잔액을 캐시에 반영합니다."""
+        self._balances[row] = int(balance)
+
+    def adjust(self, row, delta):
+        self._balances[row] = self._balances.get(row, 0) + int(delta)
+        return self._balances[row]
+
+
+balance_service = BalanceService()
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from typing import NamedTuple
+
+import discord
+
+from event.GoogleSheetsManager import GoogleSheetsManager
+from event.pagination import PageSource
+
+# Google Sheets 설정
+SERVICE_ACCOUNT_FILE = 'resources/service_account.json'
+SPREADSHEET_ID = '1AYSWQwLOA-EvMJzJ7ros27OEzrTd2hERlI2WJX32RBE'
+
+REFRESH_INTERVAL = 300  # 초
+ITEMS_PER_PAGE = 5
+
+# 카탈로그 이름 -> (시트, 범위, 첫 행 번호)
+MILEAGE_CATALOG = "mileage"
+WARN_CATALOG = "warn"
+CATALOG_RANGES = {
+    MILEAGE_CATALOG: ("상점", "J2:L100", 2),
+    WARN_CATALOG: ("상점", "F2:H100", 2),
+}
+
+
+def _clean(value):
+    """따옴표와 앞뒤 공백을 제거합니다."""
+    return str(value).replace("'", "").replace('"', "").strip()
+
+
+class Product(NamedTuple):
+    number: str   # 상품 번호
+    name: str     # 상품 이름
+    price: str    # 가격 (마일리지 상점: 구매 비용, 경고 상점: 적용 값)
+    row: int      # 시트 행 번호
+
+
+class CatalogSnapshot:
+    """한 시점의 상품 목록. 만든 뒤에는 바뀌지 않으므로 여러 곳에서 그대로 공유합니다."""
+
+    def __init__(self, name, version, products):
+        self.name = name
+        self.version = version
+        self.products = tuple(products)
+        self._by_number = {product.number: product for product in self.products}
+        self.loaded_at = time.time()
+
+    def get(self, number):
+        """상품 번호로 상품을 찾습니다. 없으면 None."""
+        return self._by_number.get(_clean(number))
+
+    def __len__(self):
+        return len(self.products)
+
+    def __iter__(self):
+        return iter(self.products)
+
+
+def parse_products(values, start_row):
+    """시트 값에서 번호가 숫자인 상품만 골라냅니다. 같은 번호가 여러 번 있으면 처음 것만 사용합니다."""
+    products = []
+    seen = set()
+    for offset, row in enumerate(values):
+        if len(row) < 3:
+            continue
+        number = _clean(row[0])
+        if not number.isdigit() or number in seen:
+            continue
+        seen.add(number)
+        products.append(Product(number, _clean(row[1]), _clean(row[2]), start_row + offset))
+    return products
+
+
+class CatalogService:
+    """
+    마일리지 상점/경고 상점 상품 목록을 버전이 붙은 스냅샷으로 보관하는 클래스.
+    두 범위를 한 번에 읽고, 내용이 바뀐 카탈로그만 새 버전으로 교체합니다.
+    """
+
+    def __init__(self, sheets_manager=None):
+        self._sheets_manager = sheets_manager
+        self._snapshots = {name: CatalogSnapshot(name, 0, []) for name in CATALOG_RANGES}
+        self.loaded_at = None
+        self._refresh_task = None
+
+    @property
+    def sheets_manager(self):
+        if self._sheets_manager is None:
+            self._sheets_manager = GoogleSheetsManager(SERVICE_ACCOUNT_FILE, SPREADSHEET_ID)
+        return self._sheets_manager
+
+    # ----- 갱신 -----
+
+    def refresh(self):
+        """
+        상점 시트를 읽어 스냅샷을 갱신합니다. (블로킹)
+        :return: 새 버전이 만들어진 카탈로그 이름 목록
+        """
+        names = list(CATALOG_RANGES)
+        ranges = [f"{sheet}!{range_notation}" for sheet, range_notation, _ in CATALOG_RANGES.values()]
+        results = self.sheets_manager.batch_get_values(ranges)
+
+        changed = []
+        for name, values in zip(names, results):
+            products = parse_products(values, CATALOG_RANGES[name][2])
+            current = self._snapshots[name]
+            if tuple(products) != current.products or current.version == 0:
+                self._snapshots[name] = CatalogSnapshot(name, current.version + 1, products)
+                changed.append(name)
+                logging.info(f"상점 카탈로그 '{name}' v{current.version + 1}: {len(products)}개 상품")
+        self.loaded_at = time.time()
+        return changed
+
+    async def refresh_async(self):
+        return await asyncio.to_thread(self.refresh)
+
+    async def ensure_loaded(self):
+        if self.loaded_at is None:
+            await self.refresh_async()
+
+    def start(self, interval=REFRESH_INTERVAL):
+        """주기적 갱신 작업을 시작합니다. 여러 번 호출해도 한 번만 실행됩니다."""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop(interval))
+
+    async def _refresh_loop(self, interval):
+        while True:
+            try:
+                await self.refresh_async()
+            except Exception as e:
+                logging.error(f"상점 카탈로그 갱신 중 오류 발생: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    # ----- 조회 -----
+
+    def snapshot(self, name):
+        """현재 버전의 스냅샷"""
+        return self._snapshots[name]
+
+    def find(self, name, number):
+        """현재 버전에서 상품 번호로 상품을 찾습니다."""
+        return self._snapshots[name].get(number)
+
+
+catalog_service = CatalogService()
+
+
+class CatalogPages(PageSource):
+    """
+    카탈로그 스냅샷을 페이지 Embed로 만드는 소스. 카탈로그 버전이 곧 페이지 버전입니다.
+    :param describe: Product -> 필드 값 문자열
+    """
+
+    def __init__(self, name, title, describe, service=catalog_service):
+        self.name = name
+        self.title = title
+        self.describe = describe
+        self.service = service
+
+    def version(self):
+        return self.service.snapshot(self.name).version
+
+    async def build_pages(self, guild):
+        products = self.service.snapshot(self.name).products
+        total = max((len(products) - 1) // ITEMS_PER_PAGE + 1, 1)
+        pages = []
+        for page in range(total):
+            embed = discord.Embed(title=self.title, color=discord.Color.blue())
+            page_items = products[page * ITEMS_PER_PAGE:(page + 1) * ITEMS_PER_PAGE]
+            if not page_items:
+                embed.description = "상품 정보가 없습니다."
+            for product in page_items:
+                embed.add_field(name=f"상품 번호: {product.number}", value=self.describe(product), inline=False)
+            embed.set_footer(text=f"페이지 {page + 1}/{total}")
+            pages.append(embed)
+        return pages
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+
+from event.GoogleSheetsManager import GoogleSheetsManager
+
+# Google Sheets 설정
+SERVICE_ACCOUNT_FILE = 'resources/service_account.json'
+SPREADSHEET_ID = '1AYSWQwLOA-EvMJzJ7ros27OEzrTd2hERlI2WJX32RBE'
+
+LEDGER_FILE = "mileage_ledger.jsonl"
+CURSOR_FILE = "mileage_ledger.cursor"   # 시트에 반영한 원장 줄 수
+MIRROR_SHEET = "구매기록"
+MIRROR_INTERVAL = 30  # 초
+MIRROR_BATCH = 500    # 한 번에 시트에 추가할 최대 행 수
+
+# 구매기록 시트 열 순서
+MIRROR_COLUMNS = (
+    "at", "type", "user_id", "nickname", "product_number", "product_name",
+    "amount", "balance_before", "balance_after", "key",
+)
+
+
+class MileageLedger:
+    """
+    마일리지 거래 원장. 로컬 JSONL 파일에 한 줄씩 추가만 하며,
+    아직 시트에 반영되지 않은 줄은 주기적으로 `구매기록` 시트에 한 번에 추가합니다.
+    거래 키(key)는 중복 처리 방지에 사용됩니다.
+    """
+
+    def __init__(self, path=LEDGER_FILE, cursor_path=CURSOR_FILE, sheets_manager=None):
+        self.path = path
+        self.cursor_path = cursor_path
+        self._sheets_manager = sheets_manager
+        self._keys = set()
+        self._count = 0
+        self._file_lock = threading.Lock()
+        self._mirror_offset = (0, 0)  # (반영한 줄 수, 그 줄 다음의 파일 위치) - 매번 처음부터 읽지 않도록
+        self._mirror_task = None
+        self.load()
+
+    @property
+    def sheets_manager(self):
+        if self._sheets_manager is None:
+            self._sheets_manager = GoogleSheetsManager(SERVICE_ACCOUNT_FILE, SPREADSHEET_ID)
+        return self._sheets_manager
+
+    def load(self):
+        """원장 파일에서 거래 키와 줄 수를 읽어옵니다."""
+        self._keys.clear()
+        self._count = 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"손상된 원장 줄을 건너뜁니다: {line[:100]}")
+                    continue
+                self._count += 1
+                if entry.get("key"):
+                    self._keys.add(entry["key"])
+
+    def seen(self, key):
+        """이미 처리된 거래 키인지 확인합니다."""
+        return str(key) in self._keys
+
+    def append(self, entry):
+        """거래 한 건을 원장 끝에 기록합니다. 디스크에 쓴 뒤 반환합니다."""
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        """거래 여러 건을 한 번에 원장 끝에 기록합니다."""
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        with self._file_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._count += len(entries)
+            self._keys.update(str(entry["key"]) for entry in entries if entry.get("key"))
+
+    # ----- 시트 미러링 -----
+
+    def _read_cursor(self):
+        try:
+            with open(self.cursor_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_cursor(self, value):
+        tmp_path = f"{self.cursor_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(value))
+        os.replace(tmp_path, self.cursor_path)
+
+    def _unmirrored(self, cursor, limit):
+        entries = []
+        with self._file_lock:
+            if self._count <= cursor or not os.path.exists(self.path):
+                return entries
+            # 지난번에 읽은 위치가 커서와 맞으면 그 위치부터 읽음
+            position, offset = self._mirror_offset if self._mirror_offset[0] <= cursor else (0, 0)
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                for raw in iter(f.readline, b""):
+                    if not raw.strip():
+                        offset += len(raw)
+                        continue
+                    if position >= cursor:
+                        if len(entries) >= limit:
+                            break
+                        try:
+                            entries.append(json.loads(raw))
+                        except json.JSONDecodeError:
+                            entries.append({})
+                    position += 1
+                    offset += len(raw)
+                    self._mirror_offset = (position, offset)
+        return entries
+
+    def mirror(self):
+        """
+        시트에 아직 없는 원장 줄을 `구매기록` 시트에 일괄 추가합니다. (블로킹)
+        :return: 추가한 행 수
+        """
+        mirrored = 0
+        while True:
+            cursor = self._read_cursor()
+            entries = self._unmirrored(cursor, MIRROR_BATCH)
+            if not entries:
+                return mirrored
+            rows = [[str(entry.get(column, "")) for column in MIRROR_COLUMNS] for entry in entries]
+            self.sheets_manager.append_rows(MIRROR_SHEET, rows)
+            self._write_cursor(cursor + len(entries))
+            mirrored += len(entries)
+
+    def start(self, interval=MIRROR_INTERVAL):
+        """주기적 미러링 작업을 시작합니다. 여러 번 호출해도 한 번만 실행됩니다."""
+        if self._mirror_task and not self._mirror_task.done():
+            return
+        self._mirror_task = asyncio.get_running_loop().create_task(self._mirror_loop(interval))
+
+    async def _mirror_loop(self, interval):
+        while True:
+            try:
+                mirrored = await asyncio.to_thread(self.mirror)
+                if mirrored:
+                    logging.info(f"구매기록 시트에 {mirrored}건 반영")
+            except Exception as e:
+                logging.error(f"구매기록 미러링 중 오류 발생: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+
+mileage_ledger = MileageLedger()
@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import pytz
+
+from event.member_index import member_index
+
+PENALTY_FILE = "penalties.jsonl"
+LEGACY_ISSUER = "legacy"
+SHEET_ISSUER = "sheet"          # 시트에서 직접 수정된 O열 값을 보관한 기록
+UNPARSED_NAME = "미해석"
+
+seoul_tz = pytz.timezone("Asia/Seoul")
+
+
+def parse_amount(value):
+    """숫자 값이면 float, 아니면 None"""
+    text = str(value).replace(",", "").strip()
+    try:
+        return float(text) if text else None
+    except ValueError:
+        return None
+
+
+def format_amount(amount):
+    return str(int(amount)) if float(amount).is_integer() else str(amount)
+
+
+def normalize_cell(value):
+    """O열 값 비교용. 공백과 쉼표, 시트 서식 차이(1,000)를 무시합니다."""
+    return "".join(str(value or "").replace(",", " ").split())
+
+
+class PenaltyRecord(NamedTuple):
+    member: str                 # 닉네임#태그
+    product_number: str         # 경고 상점 상품 번호 (기존 O열에서 가져온 기록은 빈 문자열)
+    product_name: str
+    amount: Optional[float]     # 숫자 값이면 누적 점수, 아니면 None
+    label: str                  # 숫자가 아닌 값 (예: "채팅금지"), 숫자면 빈 문자열
+    at: str                     # 기록 시각 (Asia/Seoul)
+    issuer: str                 # 적용한 관리자
+    unparsed: bool = False      # 해석하지 못했거나 시트에서 직접 수정된 O열 값을 원문 그대로 보관한 기록
+
+
+class PenaltySummary:
+    """멤버별 누적 값. 기록을 추가할 때 함께 갱신되므로 조회는 O(1)입니다."""
+
+    __slots__ = ("count", "total", "numeric_count", "labels", "last_at")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.numeric_count = 0
+        self.labels = Counter()
+        self.last_at = None
+
+    def add(self, record):
+        self.count += 1
+        if record.amount is not None:
+            self.total += record.amount
+            self.numeric_count += 1
+        if record.label:
+            self.labels[record.label] += 1
+        self.last_at = record.at
+
+
+class PenaltyStore:
+    """
+    경고/제재 기록 저장소. 멤버별 기록을 JSONL 파일에 한 줄씩 추가하고
+    누적 값은 메모리에 유지합니다. MEMBER 시트 O열은 이 저장소에서 만들어지는 표시용 값이며,
+    시트에서 직접 수정된 값은 덮어쓰기 전에 미해석 기록으로 보관합니다.
+    """
+
+    def __init__(self, path=PENALTY_FILE):
+        self.path = path
+        self._records = {}    # 닉네임#태그 -> [PenaltyRecord]
+        self._summaries = {}  # 닉네임#태그 -> PenaltySummary
+        self._sheet_values = {}  # 닉네임#태그 -> 마지막으로 O열에 쓴(또는 가져온) 값
+        self.legacy_imported = False
+        self._file_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self._records.clear()
+        self._summaries.clear()
+        self._sheet_values.clear()
+        self.legacy_imported = False
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"손상된 경고 기록 줄을 건너뜁니다: {line[:100]}")
+                    continue
+                if entry.get("type") == "legacy_import":
+                    self.legacy_imported = True
+                elif entry.get("type") == "rename":
+                    self._rename_in_memory(entry["old"], entry["new"])
+                elif entry.get("type") == "sheet":
+                    self._sheet_values[entry["member"]] = entry["value"]
+                else:
+                    entry.pop("type", None)
+                    self._add_in_memory(PenaltyRecord(**entry))
+
+    def _write(self, entries):
+        with self._file_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _add_in_memory(self, record):
+        self._records.setdefault(record.member, []).append(record)
+        self._summaries.setdefault(record.member, PenaltySummary()).add(record)
+
+    def _rename_in_memory(self, old, new):
+        if old == new or old not in self._records:
+            return
+        for record in self._records.pop(old):
+            self._add_in_memory(record._replace(member=new))
+        self._summaries.pop(old, None)
+        if old in self._sheet_values:
+            self._sheet_values[new] = self._sheet_values.pop(old)
+
+    @staticmethod
+    def make_record(member, product, issuer):
+        """경고 상점 상품(shop.catalog.Product)으로 기록을 만듭니다. 저장은 add()에서 합니다."""
+        amount = parse_amount(product.price)
+        return PenaltyRecord(
+            member=member,
+            product_number=product.number,
+            product_name=product.name,
+            amount=amount,
+            label="" if amount is not None else product.price.strip(),
+            at=datetime.now(seoul_tz).strftime("%Y-%m-%d %H:%M:%S"),
+            issuer=str(issuer),
+        )
+
+    @staticmethod
+    def make_unparsed(member, raw_value, issuer):
+        """해석하지 않은 O열 값을 원문 그대로 보관하는 기록을 만듭니다."""
+        return PenaltyRecord(
+            member=member,
+            product_number="",
+            product_name=UNPARSED_NAME,
+            amount=None,
+            label=str(raw_value).strip(),
+            at=datetime.now(seoul_tz).strftime("%Y-%m-%d %H:%M:%S"),
+            issuer=str(issuer),
+            unparsed=True,
+        )
+
+    def add(self, records):
+        """기록 여러 건을 한 번에 파일에 추가하고 누적 값을 갱신합니다."""
+        records = list(records)
+        self._write([{"type": "penalty", **record._asdict()} for record in records])
+        for record in records:
+            self._add_in_memory(record)
+
+    def mark_written(self, values):
+        """
+        O열에 쓴 값을 기록합니다. 다음 적용 때 시트 값과 비교해 직접 수정 여부를 판단합니다.
+        :param values: 닉네임#태그 -> O열에 쓴 값
+        """
+        if not values:
+            return
+        self._write([{"type": "sheet", "member": member, "value": value} for member, value in values.items()])
+        self._sheet_values.update(values)
+
+    def rename(self, old, new):
+        """멤버 닉네임 변경을 기록에 반영합니다."""
+        if old == new or old not in self._records:
+            return
+        self._write([{"type": "rename", "old": old, "new": new}])
+        self._rename_in_memory(old, new)
+
+    # ----- 기존 O열 가져오기 -----
+
+    def import_legacy(self, values_by_member, unparsed=()):
+        """
+        저장소 도입 전 O열 값(쉼표로 이어진 문자열 또는 숫자 합계)을 기록으로 한 번만 가져옵니다.
+        :param values_by_member: 닉네임#태그 -> 기존 O열 값
+        :param unparsed: 멤버(닉네임#태그)로 확인할 수 없는 행의 [(D열 값 또는 행 표시, O열 값)].
+            버리지 않고 원문 그대로 미해석 기록으로 보관합니다.
+        :return: 가져온 기록 수
+        """
+        if self.legacy_imported:
+            return 0
+        at = datetime.now(seoul_tz).strftime("%Y-%m-%d %H:%M:%S")
+        records = [
+            self.make_unparsed(member, value, LEGACY_ISSUER)._replace(at=at)
+            for member, value in unparsed
+            if member not in self._records and str(value or "").strip()
+        ]
+        for member, value in values_by_member.items():
+            if member in self._records:
+                continue
+            for part in str(value or "").replace("'", "").replace('"', "").split(","):
+                part = part.strip()
+                if not part:
+                    continue
+                amount = parse_amount(part)
+                records.append(PenaltyRecord(
+                    member=member, product_number="", product_name="", amount=amount,
+                    label="" if amount is not None else part, at=at, issuer=LEGACY_ISSUER,
+                ))
+        # 가져온 원래 O열 값을 "마지막으로 쓴 값"으로 남겨 가져오기 직후 직접 수정으로 오인하지 않게 함
+        sheet_values = {member: str(value) for member, value in values_by_member.items() if member not in self._records}
+        self._write(
+            [{"type": "penalty", **record._asdict()} for record in records]
+            + [{"type": "sheet", "member": member, "value": value} for member, value in sheet_values.items()]
+            + [{"type": "legacy_import", "at": at, "count": len(records)}]
+        )
+        for record in records:
+            self._add_in_memory(record)
+        self._sheet_values.update(sheet_values)
+        self.legacy_imported = True
+        logging.info(
+            f"기존 O열 경고 기록 {len(records)}건 가져오기 완료 "
+            f"(미해석 {sum(record.unparsed for record in records)}건). 이후 O열은 경고 기록에서 만들어집니다."
+        )
+        return len(records)
+
+    # ----- 조회 -----
+
+    def is_manual_edit(self, member, sheet_value):
+        """
+        시트 O열 값이 마지막으로 쓴 값(없으면 저장소에서 만든 값)과 다르면 True.
+        빈 칸은 보관할 값이 없으므로 False.
+        """
+        sheet = normalize_cell(sheet_value)
+        expected = self._sheet_values.get(member)
+        if expected is None:
+            expected = self.render(member)
+        return bool(sheet) and sheet != normalize_cell(expected)
+
+    def summary(self, member):
+        """멤버의 누적 값 (기록이 없으면 None)"""
+        return self._summaries.get(member)
+
+    def records(self, member, since=None):
+        """멤버의 기록 목록. since("YYYY-MM-DD ...")를 주면 그 이후 기록만 반환합니다."""
+        records = self._records.get(member, [])
+        if since is None:
+            return list(records)
+        return [record for record in records if record.at >= since]
+
+    def render(self, member, extra=()):
+        """
+        O열에 표시할 값. 숫자 기록은 합계로, 나머지는 중복 없이 정렬해 쉼표로 잇습니다.
+        extra에 아직 저장하지 않은 기록을 넘기면 적용 후 값을 미리 계산합니다.
+        """
+        summary = self._summaries.get(member)
+        total = summary.total if summary else 0.0
+        has_numeric = bool(summary and summary.numeric_count)
+        labels = set(summary.labels) if summary else set()
+        for record in extra:
+            if record.amount is not None:
+                total += record.amount
+                has_numeric = True
+            if record.label:
+                labels.add(record.label)
+
+        if has_numeric and not labels:
+            return format_amount(total)
+        if has_numeric:
+            labels.add(format_amount(total))
+        return ", ".join(sorted(labels))
+
+
+penalty_store = PenaltyStore()
+member_index.add_rename_listener(penalty_store.rename)
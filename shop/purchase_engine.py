@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import pytz
+
+from shop.balance_service import balance_service
+from shop.mileage_ledger import mileage_ledger
+
+seoul_tz = pytz.timezone("Asia/Seoul")
+
+STATUS_OK = "ok"
+STATUS_DUPLICATE = "duplicate"        # 같은 거래 키가 이미 처리됨
+STATUS_INSUFFICIENT = "insufficient"  # 잔액 부족
+
+
+class PurchaseResult(NamedTuple):
+    status: str
+    balance: int                  # 처리 후(또는 확인 시점) 잔액
+    cost: int
+    entry: Optional[dict] = None  # 원장에 기록된 거래 (성공 시)
+
+
+class PurchaseEngine:
+    """
+    마일리지 구매 처리. 멤버별 락 안에서 시트 잔액을 새로 읽고, 차감하고, 원장에 기록합니다.
+    같은 멤버의 구매는 순서대로, 다른 멤버의 구매는 병렬로 처리됩니다.
+    거래 키(상호작용 ID)가 이미 원장에 있으면 다시 차감하지 않습니다.
+    """
+
+    def __init__(self, balances=balance_service, ledger=mileage_ledger):
+        self.balances = balances
+        self.ledger = ledger
+
+    async def purchase(self, key, user, row, nickname, product_number, product_name, cost):
+        """
+        :param key: 거래 키 (구매 모달을 열 때 만든 "purchase:<사용자 ID>:<nonce>")
+        :param user: 구매한 디스코드 사용자
+        :param row: MEMBER 시트 행 번호
+        :return: PurchaseResult
+        """
+        key = str(key)
+        cost = int(cost)
+
+        async with self.balances.lock(row):
+            # 같은 키의 중복 요청도 같은 멤버 락을 기다리므로 여기서 한 번만 확인하면 됩니다.
+            if self.ledger.seen(key):
+                logging.warning(f"중복 구매 요청 무시 - 키: {key}, 사용자: {nickname}")
+                return PurchaseResult(STATUS_DUPLICATE, self.balances.get(row), cost)
+
+            # 관리자가 시트를 직접 고쳤을 수 있으므로 캐시 대신 시트 값을 기준으로 차감
+            balance = await asyncio.to_thread(self.balances.fetch, row)
+            if balance < cost:
+                return PurchaseResult(STATUS_INSUFFICIENT, balance, cost)
+
+            new_balance = balance - cost
+            await asyncio.to_thread(self.balances.write, row, new_balance)
+
+            entry = {
+                "key": key,
+                "type": "purchase",
+                "at": datetime.now(seoul_tz).strftime("%Y-%m-%d %H:%M:%S"),
+                "user_id": str(user.id),
+                "nickname": nickname,
+                "row": row,
+                "product_number": str(product_number),
+                "product_name": product_name,
+                "amount": -cost,
+                "balance_before": balance,
+                "balance_after": new_balance,
+            }
+            try:
+                self.ledger.append(entry)
+            except Exception as e:
+                # 차감은 이미 시트에 반영되었으므로 구매는 성공으로 처리하고 기록 실패만 남깁니다.
+                logging.error(f"구매 원장 기록 중 오류 발생: {e} / {entry}", exc_info=True)
+
+            logging.info(f"구매 완료 - {nickname}: {product_name} (-{cost}, 잔액 {new_balance})")
+            return PurchaseResult(STATUS_OK, new_balance, cost, entry)
+
+
+purchase_engine = PurchaseEngine()